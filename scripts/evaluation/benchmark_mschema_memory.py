@@ -0,0 +1,156 @@
+"""
+Script to benchmark the memory held by the M-Schemas of many databases, as in a long-lived worker
+serving the full BIRD dev and train sets.
+
+The schemas are read from M-Schema JSON files saved with `MSchema.save` or, without a directory,
+generated with the shape of BIRD databases. The script measures with tracemalloc the memory retained
+by the dictionary form (the dumped schema, as MSchema held it before the compact records) and by
+MSchema with its compact MSchemaTable/MSchemaField records and shared ExamplePool, and checks that
+both render the same M-Schema.
+"""
+import argparse
+import gc
+import json
+import os
+import random
+import time
+import tracemalloc
+from typing import Any, Callable, Dict, List, Tuple
+
+from components.schema.m_schema import ExamplePool, MSchema
+
+# Column types and values repeated across the synthetic databases, like in BIRD
+SYNTHETIC_TYPES = ["INTEGER", "TEXT", "REAL", "DATE", "VARCHAR(255)", "BIGINT", "NUMERIC(10, 2)", "BOOLEAN"]
+SYNTHETIC_WORDS = ["id", "name", "code", "date", "type", "status", "amount", "city", "country", "year",
+                   "score", "title", "price", "count", "rate", "category", "region", "school", "player", "team"]
+
+
+def load_schema_dicts(schemas_dir: str) -> List[str]:
+    """
+    Returns the JSON texts of the M-Schema files of a directory.
+    """
+    texts = []
+    for file_name in sorted(os.listdir(schemas_dir)):
+        if file_name.endswith(".json"):
+            with open(os.path.join(schemas_dir, file_name), "r", encoding="utf-8") as f:
+                texts.append(f.read())
+    return texts
+
+
+def generate_schema_dicts(num_databases: int, seed: int) -> List[str]:
+    """
+    Returns the JSON texts of synthetic M-Schemas with 5 to 15 tables of 5 to 40 columns.
+    """
+    rng = random.Random(seed)
+    texts = []
+    for db_index in range(num_databases):
+        mschema = MSchema(db_id=f"db_{db_index}", pool=ExamplePool())
+        for table_index in range(rng.randint(5, 15)):
+            table_name = f"{rng.choice(SYNTHETIC_WORDS)}_{table_index}"
+            mschema.add_table(table_name, comment=rng.choice(["", "", f"The {table_name} records"]))
+            for column_index in range(rng.randint(5, 40)):
+                field_type = rng.choice(SYNTHETIC_TYPES)
+                if field_type in ("INTEGER", "BIGINT", "REAL", "NUMERIC(10, 2)"):
+                    examples = [str(rng.randint(0, 100)) for _ in range(rng.randint(0, 5))]
+                elif field_type == "BOOLEAN":
+                    examples = ["0", "1"]
+                else:
+                    examples = [f"{rng.choice(SYNTHETIC_WORDS)} {rng.randint(0, 20)}" for _ in range(rng.randint(0, 5))]
+                mschema.add_field(table_name, f"{rng.choice(SYNTHETIC_WORDS)}_{column_index}", field_type,
+                                  primary_key=column_index == 0, comment=rng.choice(["", "", "", "A description"]),
+                                  examples=examples)
+        texts.append(json.dumps(mschema.dump()))
+    return texts
+
+
+def measure(build: Callable[[str], Any], texts: List[str]) -> Tuple[List[Any], int, float]:
+    """
+    Builds a schema from every JSON text and returns them with the retained bytes and the build seconds.
+    """
+    gc.collect()
+    tracemalloc.start()
+    baseline = tracemalloc.get_traced_memory()[0]
+    start = time.perf_counter()
+    schemas = [build(text) for text in texts]
+    seconds = time.perf_counter() - start
+    gc.collect()
+    retained = tracemalloc.get_traced_memory()[0] - baseline
+    tracemalloc.stop()
+    return schemas, retained, seconds
+
+
+def main(schemas_dir: str, num_databases: int, seed: int, output_path: str) -> None:
+    texts = load_schema_dicts(schemas_dir) if schemas_dir else generate_schema_dicts(num_databases, seed)
+    num_fields = sum(len(table["fields"]) for text in texts for table in json.loads(text)["tables"].values())
+    print(f"Measuring {len(texts)} schemas with {num_fields} fields.")
+
+    dict_schemas, dict_bytes, dict_seconds = measure(json.loads, texts)
+
+    pool = ExamplePool()
+
+    def build_compact(text: str) -> MSchema:
+        mschema = MSchema(pool=pool)
+        mschema.load_dict(json.loads(text))
+        return mschema
+
+    compact_schemas, compact_bytes, compact_seconds = measure(build_compact, texts)
+
+    # The compact form must render the same M-Schema and dump the same dictionary
+    for data, mschema in zip(dict_schemas, compact_schemas):
+        dict_mschema = MSchema(pool=ExamplePool())
+        dict_mschema.load_dict(data)
+        if mschema.dump() != data or mschema.to_mschema() != dict_mschema.to_mschema():
+            raise ValueError(f"The compact form of {data.get('db_id')} differs from its dictionary form.")
+
+    report: Dict[str, Any] = {
+        "databases": len(texts),
+        "fields": num_fields,
+        "dict_bytes": dict_bytes,
+        "compact_bytes": compact_bytes,
+        "saving": 1 - compact_bytes / dict_bytes if dict_bytes else 0.0,
+        "dict_bytes_per_field": dict_bytes / max(num_fields, 1),
+        "compact_bytes_per_field": compact_bytes / max(num_fields, 1),
+        "dict_load_seconds": dict_seconds,
+        "compact_load_seconds": compact_seconds,
+        "pooled_entries": len(pool)
+    }
+    print(f"{'form':<10}{'MiB':>10}{'bytes/field':>14}{'load s':>10}")
+    print(f"{'dict':<10}{dict_bytes / 2 ** 20:>10.2f}{report['dict_bytes_per_field']:>14.0f}{dict_seconds:>10.2f}")
+    print(f"{'compact':<10}{compact_bytes / 2 ** 20:>10.2f}{report['compact_bytes_per_field']:>14.0f}{compact_seconds:>10.2f}")
+    print(f"The compact form saves {report['saving']:.0%} of the memory.")
+
+    if output_path:
+        os.makedirs(os.path.dirname(output_path) or ".", exist_ok=True)
+        with open(output_path, "w") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the memory of the compact M-Schema against its dictionary form.")
+    parser.add_argument(
+        "--schemas_dir",
+        type=str,
+        default=None,
+        help="A directory of M-Schema JSON files saved with MSchema.save. Synthetic schemas are generated without it."
+    )
+    parser.add_argument(
+        "--num_databases",
+        type=int,
+        default=500,
+        help="The number of synthetic schemas."
+    )
+    parser.add_argument(
+        "--seed",
+        type=int,
+        default=0,
+        help="The seed of the synthetic schemas."
+    )
+    parser.add_argument(
+        "--output_path",
+        type=str,
+        default=None,
+        help="The path of the JSON report, not written by default."
+    )
+    args = parser.parse_args()
+
+    main(schemas_dir=args.schemas_dir, num_databases=args.num_databases, seed=args.seed, output_path=args.output_path)
@@ -0,0 +1,344 @@
+"""
+Script to benchmark the schema linking (column retrieval) of the InformationRetriever.
+
+The columns referenced by each gold SQL query are extracted with sqlglot and compared with the
+columns returned by `InformationRetriever.retrieve_context` for a grid of `k` values, retrieval
+modes (dense, lexical, hybrid) and vector store backends. For every configuration the script
+reports the column recall@k, the size in tokens of the schema rendered from the retrieved columns
+and the p50/p95 retrieval latency, and recommends the smallest `k` that keeps the recall.
+
+Keywords are extracted once per task with the reasoning model and cached, so that the grid only
+measures retrieval and reruns do not need the model.
+"""
+import argparse
+import json
+import logging
+import os
+import time
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional, Set
+
+import numpy as np
+
+from components.schema.m_schema import MSchema
+from components.schema.schema_engine_factory import SchemaEngineFactory
+from executor.task_model import Task
+from infrastructure.database.database_manager import DatabaseManager
+from infrastructure.vector_db.vector_store_factory import VectorStoreFactory
+from pipeline.steps.information_retrieval.executor.information_retriever import InformationRetriever
+from util.constants import HuggingFaceModelConstants, LexicalIndexConstants
+from util.db.sql_column_extractor import extract_referenced_columns
+
+# --- Logging Setup ---
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+
+@dataclass
+class BenchmarkTask:
+    """
+    A task with everything the retrieval grid needs: its gold columns, keywords and database schema.
+    """
+    task: Task
+    gold_columns: Set[str]
+    keywords: List[str]
+    mschema: MSchema
+
+
+@dataclass
+class ConfigurationResult:
+    """
+    The measurements of one (backend, mode, k) configuration over all tasks.
+    """
+    backend: str
+    mode: str
+    k: int
+    recalls: List[float] = field(default_factory=list)
+    schema_tokens: List[int] = field(default_factory=list)
+    latencies_seconds: List[float] = field(default_factory=list)
+    lexical_fast_path_hits: int = 0
+
+    def to_dict(self) -> Dict[str, Any]:
+        latencies_ms = np.asarray(self.latencies_seconds, dtype=np.float64) * 1000.0
+        return {
+            "backend": self.backend,
+            "mode": self.mode,
+            "k": self.k,
+            "tasks": len(self.recalls),
+            "column_recall": float(np.mean(self.recalls)) if self.recalls else 0.0,
+            "full_recall_share": float(np.mean([r == 1.0 for r in self.recalls])) if self.recalls else 0.0,
+            "mean_schema_tokens": float(np.mean(self.schema_tokens)) if self.schema_tokens else 0.0,
+            "p50_latency_ms": float(np.percentile(latencies_ms, 50)) if len(latencies_ms) else 0.0,
+            "p95_latency_ms": float(np.percentile(latencies_ms, 95)) if len(latencies_ms) else 0.0,
+            "lexical_fast_path_hits": self.lexical_fast_path_hits,
+        }
+
+
+def render_retrieved_schema(mschema: MSchema, retrieved_context: Dict[str, List[Dict[str, Any]]]) -> str:
+    """
+    Renders the M-Schema of the retrieved columns, as the SchemaFilterExecutor puts it into its prompt.
+    """
+    selected_tables: List[str] = []
+    selected_columns: List[str] = []
+    for keyword_contexts in retrieved_context.values():
+        for column_info in keyword_contexts:
+            table_name, column_name = column_info.get("table_name"), column_info.get("column_name")
+            if table_name and table_name not in selected_tables:
+                selected_tables.append(table_name)
+            if table_name and column_name and f"{table_name}.{column_name}" not in selected_columns:
+                selected_columns.append(f"{table_name}.{column_name}")
+    return mschema.to_mschema(selected_tables=selected_tables, selected_columns=selected_columns)
+
+
+def load_keywords(retriever: InformationRetriever, tasks: List[Task], cache_path: str) -> Dict[str, List[str]]:
+    """
+    Returns the keywords of every task, extracting the missing ones with the reasoning model and updating the cache.
+    """
+    cached: Dict[str, List[str]] = {}
+    if os.path.isfile(cache_path):
+        with open(cache_path, "r") as f:
+            cached = json.load(f)
+
+    missing = [task for task in tasks if str(task.question_id) not in cached]
+    for i, task in enumerate(missing, start=1):
+        cached[str(task.question_id)] = retriever.extract_keywords(user_query=task.question).get("keywords", [])
+        logging.info(f"Extracted keywords of {i}/{len(missing)} tasks.")
+    if missing:
+        os.makedirs(os.path.dirname(cache_path) or ".", exist_ok=True)
+        with open(cache_path, "w") as f:
+            json.dump(cached, f, indent=2)
+    return cached
+
+
+def load_benchmark_tasks(tasks: List[Task], keywords: Dict[str, List[str]]) -> List[BenchmarkTask]:
+    """
+    Loads the schema of every database and extracts the gold columns of every task.
+    Tasks without a gold query, without keywords or whose gold columns cannot be resolved are skipped.
+    """
+    db_manager = DatabaseManager()
+    schema_factory = SchemaEngineFactory()
+    mschemas: Dict[str, Optional[MSchema]] = {}
+    benchmark_tasks: List[BenchmarkTask] = []
+
+    for task in tasks:
+        if task.db_id not in mschemas:
+            engine = db_manager.create_engine(task.db_id)
+            schema_engine = schema_factory.create_schema_engine(engine=engine, db_name=task.db_id) if engine is not None else None
+            mschemas[task.db_id] = schema_engine.mschema if schema_engine is not None else None
+            if engine is not None:
+                db_manager.close_connections(engine)
+        mschema = mschemas[task.db_id]
+        if mschema is None or not task.SQL or not keywords.get(str(task.question_id)):
+            continue
+
+        schema_columns = {table_name: list(table_info["fields"].keys()) for table_name, table_info in mschema.tables.items()}
+        gold_columns = extract_referenced_columns(task.SQL, schema_columns)
+        if not gold_columns:
+            logging.warning(f"No gold columns resolved for question_id {task.question_id}, skipping it.")
+            continue
+        benchmark_tasks.append(BenchmarkTask(task=task, gold_columns=gold_columns, keywords=keywords[str(task.question_id)], mschema=mschema))
+    return benchmark_tasks
+
+
+def run_configuration(retriever: InformationRetriever, benchmark_tasks: List[BenchmarkTask], backend: str, mode: str, k: int,
+                      count_tokens: Callable[[str], int]) -> ConfigurationResult:
+    """
+    Runs the retrieval of every task with one configuration.
+    """
+    result = ConfigurationResult(backend=backend, mode=mode, k=k)
+    retriever.retrieval_mode = mode
+    fast_path_hits_before = retriever.lexical_fast_path_hits
+
+    for benchmark_task in benchmark_tasks:
+        start = time.perf_counter()
+        retrieved_context = retriever.retrieve_context(keywords=benchmark_task.keywords, task=benchmark_task.task, k=k)
+        result.latencies_seconds.append(time.perf_counter() - start)
+
+        retrieved_columns = {
+            f"{column_info['table_name']}.{column_info['column_name']}".lower()
+            for keyword_contexts in retrieved_context.values()
+            for column_info in keyword_contexts
+        }
+        result.recalls.append(len(benchmark_task.gold_columns & retrieved_columns) / len(benchmark_task.gold_columns))
+        result.schema_tokens.append(count_tokens(render_retrieved_schema(benchmark_task.mschema, retrieved_context)))
+
+    result.lexical_fast_path_hits = retriever.lexical_fast_path_hits - fast_path_hits_before
+    return result
+
+
+def recommend_k(results: List[Dict[str, Any]], recall_tolerance: float) -> Dict[str, Optional[int]]:
+    """
+    Returns, per backend and mode, the smallest k whose recall is within `recall_tolerance` of the best recall.
+    """
+    recommendations: Dict[str, Optional[int]] = {}
+    for key in {(r["backend"], r["mode"]) for r in results}:
+        rows = sorted((r for r in results if (r["backend"], r["mode"]) == key), key=lambda r: r["k"])
+        best_recall = max(r["column_recall"] for r in rows)
+        recommendations[f"{key[0]}/{key[1]}"] = next(
+            (r["k"] for r in rows if r["column_recall"] >= best_recall - recall_tolerance), None
+        )
+    return recommendations
+
+
+def print_summary_table(results: List[Dict[str, Any]]) -> None:
+    """
+    Prints a formatted summary table of the benchmark results.
+    """
+    print(f"{'Backend':<8} | {'Mode':<8} | {'k':>3} | {'Recall':>7} | {'Full recall':>11} | {'Schema tokens':>13} | {'p50 ms':>8} | {'p95 ms':>8}")
+    print("-" * 91)
+    for r in results:
+        print(f"{r['backend']:<8} | {r['mode']:<8} | {r['k']:>3} | {r['column_recall']:>7.3f} | {r['full_recall_share']:>11.3f} | "
+              f"{r['mean_schema_tokens']:>13.1f} | {r['p50_latency_ms']:>8.2f} | {r['p95_latency_ms']:>8.2f}")
+
+
+def main(dataset_path: str, k_values: List[int], modes: List[str], vector_backends: List[Optional[str]], max_tasks: Optional[int],
+         keywords_cache_path: str, tokenizer_name: str, output_path: str, recall_tolerance: float,
+         disable_embedding_cache: bool) -> None:
+    """
+    Runs the schema linking benchmark grid and writes its report.
+
+    Args:
+        dataset_path (str): The path to the JSON dataset with the gold SQL queries.
+        k_values (List[int]): The numbers of columns retrieved per keyword.
+        modes (List[str]): The retrieval modes ("dense", "lexical", "hybrid").
+        vector_backends (List[Optional[str]]): The vector store backends, None for the configured one.
+        max_tasks (Optional[int]): Only benchmark the first tasks of the dataset.
+        keywords_cache_path (str): The JSON file caching the extracted keywords per question_id.
+        tokenizer_name (str): The tokenizer counting the schema tokens.
+        output_path (str): The path of the JSON report.
+        recall_tolerance (float): The recall loss accepted when recommending the smallest k.
+        disable_embedding_cache (bool): Embed every query, so that latencies do not depend on the grid order.
+    """
+    # Imported here, loading the tokenizer is only needed to run the benchmark
+    from transformers import AutoTokenizer
+
+    with open(dataset_path, "r") as f:
+        tasks = [Task(**task_data) for task_data in json.load(f)]
+    tasks = tasks[:max_tasks] if max_tasks else tasks
+
+    retriever = InformationRetriever()
+    keywords = load_keywords(retriever, tasks, keywords_cache_path)
+    benchmark_tasks = load_benchmark_tasks(tasks, keywords)
+    logging.info(f"Benchmarking schema linking over {len(benchmark_tasks)} of {len(tasks)} tasks.")
+
+    tokenizer = AutoTokenizer.from_pretrained(tokenizer_name)
+    token_counts: Dict[str, int] = {}
+
+    def count_tokens(text: str) -> int:
+        # The same schema is rendered for many configurations
+        if text not in token_counts:
+            token_counts[text] = len(tokenizer.encode(text, add_special_tokens=False))
+        return token_counts[text]
+
+    results: List[Dict[str, Any]] = []
+    for backend in vector_backends:
+        backend_name = backend or "configured"
+        retriever.vector_store = VectorStoreFactory().create_vector_store(embedding_facade=retriever.embedding_facade, backend=backend)
+        if disable_embedding_cache:
+            retriever.vector_store.embedding_cache = None
+        for mode in modes:
+            # The lexical ranking does not depend on the vector store
+            if mode == LexicalIndexConstants.RETRIEVAL_MODE_LEXICAL and any(r["mode"] == mode for r in results):
+                continue
+            for k in k_values:
+                result = run_configuration(retriever, benchmark_tasks, backend_name, mode, k, count_tokens).to_dict()
+                logging.info(f"{backend_name}/{mode}/k={k}: recall {result['column_recall']:.3f}, "
+                             f"{result['mean_schema_tokens']:.0f} schema tokens, p95 {result['p95_latency_ms']:.1f} ms.")
+                results.append(result)
+
+    print_summary_table(results)
+    recommendations = recommend_k(results, recall_tolerance)
+    print(f"Smallest k within {recall_tolerance:.3f} of the best recall: {recommendations}")
+
+    os.makedirs(os.path.dirname(output_path) or ".", exist_ok=True)
+    with open(output_path, "w") as f:
+        json.dump({
+            "dataset_path": dataset_path,
+            "tasks": len(benchmark_tasks),
+            "tokenizer": tokenizer_name,
+            "recall_tolerance": recall_tolerance,
+            "recommended_k": recommendations,
+            "results": results,
+        }, f, indent=4)
+    logging.info(f"Wrote the schema linking benchmark to {output_path}.")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the column recall, schema size and latency of the schema linking.")
+    parser.add_argument(
+        "--dataset_path",
+        type=str,
+        default="./dataset/dev/bird_subset.json",
+        help="Path to the JSON dataset containing the gold SQL queries."
+    )
+    parser.add_argument(
+        "--k_values",
+        type=int,
+        nargs="+",
+        default=[1, 3, 5, 10, 20],
+        help="Numbers of columns retrieved per keyword."
+    )
+    parser.add_argument(
+        "--modes",
+        type=str,
+        nargs="+",
+        default=[LexicalIndexConstants.RETRIEVAL_MODE_DENSE, LexicalIndexConstants.RETRIEVAL_MODE_LEXICAL, LexicalIndexConstants.RETRIEVAL_MODE_HYBRID],
+        choices=[LexicalIndexConstants.RETRIEVAL_MODE_DENSE, LexicalIndexConstants.RETRIEVAL_MODE_LEXICAL, LexicalIndexConstants.RETRIEVAL_MODE_HYBRID],
+        help="Retrieval modes to compare."
+    )
+    parser.add_argument(
+        "--vector_backends",
+        type=str,
+        nargs="+",
+        default=[None],
+        help="Vector store backends to compare (e.g. chroma local). Defaults to the backend configured in chroma_db.yaml."
+    )
+    parser.add_argument(
+        "--max_tasks",
+        type=int,
+        default=None,
+        help="Only benchmark the first N tasks."
+    )
+    parser.add_argument(
+        "--keywords_cache",
+        type=str,
+        default="./results/schema_linking_keywords.json",
+        help="JSON file caching the keywords extracted per question_id."
+    )
+    parser.add_argument(
+        "--tokenizer",
+        type=str,
+        default=HuggingFaceModelConstants.DEFAULT_REASONING_MODEL_PATH,
+        help="Tokenizer counting the schema tokens, by default the one of the model reading the schema filter prompt."
+    )
+    parser.add_argument(
+        "--output_path",
+        type=str,
+        default=f"./results/schema_linking_benchmark_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json",
+        help="Path of the JSON report."
+    )
+    parser.add_argument(
+        "--recall_tolerance",
+        type=float,
+        default=0.01,
+        help="Recall loss accepted when recommending the smallest k."
+    )
+    parser.add_argument(
+        "--disable_embedding_cache",
+        action="store_true",
+        help="Embed every query instead of reusing the embeddings of previous grid configurations."
+    )
+    args = parser.parse_args()
+
+    main(
+        dataset_path=args.dataset_path,
+        k_values=sorted(set(args.k_values)),
+        modes=args.modes,
+        vector_backends=args.vector_backends,
+        max_tasks=args.max_tasks,
+        keywords_cache_path=args.keywords_cache,
+        tokenizer_name=args.tokenizer,
+        output_path=args.output_path,
+        recall_tolerance=args.recall_tolerance,
+        disable_embedding_cache=args.disable_embedding_cache
+    )
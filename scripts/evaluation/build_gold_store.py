@@ -0,0 +1,134 @@
+"""
+Script to precompute the results of the gold SQL queries of an evaluation dataset.
+
+Every gold query is executed once, grouped per db_id and in parallel across databases.
+The row-hash digest, row count and a short preview of each result are stored in a compact
+memory-mappable store keyed by question_id and database fingerprint, which the
+EvaluationExecutor uses to avoid re-executing the gold queries on every run.
+"""
+import argparse
+import json
+import logging
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Dict, List
+
+from common.config.config_helper import ConfigurationHelper
+from executor.task_model import Task
+from infrastructure.database.database_manager import DatabaseManager
+from infrastructure.evaluation.gold_result_store import GoldResult, GoldResultStore, GOLD_STATUS_ERROR
+from util.constants import EvaluationConstants
+from util.db.execute import execute_sql_digest
+from util.db.result_digest import fingerprint_database
+
+# --- Logging Setup ---
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+
+def build_gold_results_for_database(db_id: str, tasks: List[Task]) -> List[GoldResult]:
+    """
+    Executes the gold queries of all tasks targeting one database.
+
+    Args:
+        db_id (str): The database the tasks run on.
+        tasks (List[Task]): The tasks of that database.
+
+    Returns:
+        List[GoldResult]: One gold result per task. Failed queries are stored with an error status.
+    """
+    db_manager = DatabaseManager()
+    engine = db_manager.create_engine(db_id)
+    if engine is None:
+        logging.error(f"Skipping {len(tasks)} tasks of {db_id}: could not create a database engine.")
+        return []
+
+    gold_results = []
+    try:
+        fingerprint = fingerprint_database(engine)
+        for task in tasks:
+            try:
+                result_digest = execute_sql_digest(task.SQL, engine)
+                gold_results.append(GoldResult(
+                    question_id=task.question_id,
+                    db_id=db_id,
+                    fingerprint=fingerprint,
+                    digest=result_digest.digest,
+                    row_count=result_digest.row_count,
+                    preview=result_digest.preview
+                ))
+            except Exception as e:
+                logging.error(f"Gold query of question_id {task.question_id} failed on {db_id}: {e}")
+                gold_results.append(GoldResult(
+                    question_id=task.question_id,
+                    db_id=db_id,
+                    fingerprint=fingerprint,
+                    digest="",
+                    row_count=0,
+                    status=GOLD_STATUS_ERROR
+                ))
+    finally:
+        db_manager.close_connections(engine)
+    return gold_results
+
+
+def main(dataset_path: str, output_path: str, max_workers: int) -> None:
+    """
+    Builds the gold result store for a dataset.
+
+    Args:
+        dataset_path (str): The path to the JSON dataset with the gold SQL queries.
+        output_path (str): The path of the `.npy` store to write.
+        max_workers (int): The number of databases processed in parallel.
+    """
+    with open(dataset_path, "r") as f:
+        tasks = [Task(**task_data) for task_data in json.load(f)]
+
+    tasks_per_db: Dict[str, List[Task]] = defaultdict(list)
+    for task in tasks:
+        if task.SQL:
+            tasks_per_db[task.db_id].append(task)
+    logging.info(f"Executing {sum(len(t) for t in tasks_per_db.values())} gold queries over {len(tasks_per_db)} databases.")
+
+    start = time.perf_counter()
+    gold_results: List[GoldResult] = []
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        futures = {
+            pool.submit(build_gold_results_for_database, db_id, db_tasks): db_id
+            for db_id, db_tasks in tasks_per_db.items()
+        }
+        for future in as_completed(futures):
+            db_results = future.result()
+            gold_results.extend(db_results)
+            logging.info(f"Finished {futures[future]}: {len(db_results)} gold results.")
+
+    written = GoldResultStore.write(output_path, gold_results)
+    failed = sum(1 for r in gold_results if not r.is_valid)
+    logging.info(f"Wrote {written} gold results ({failed} failed) to {output_path} in {time.perf_counter() - start:.1f}s.")
+
+
+if __name__ == "__main__":
+    evaluation_config = ConfigurationHelper().get_config("evaluation.yaml", "evaluation") or {}
+
+    parser = argparse.ArgumentParser(description="Precompute the gold query results of an evaluation dataset.")
+    parser.add_argument(
+        "--dataset_path",
+        type=str,
+        default="./dataset/dev/bird_subset.json",
+        help="Path to the JSON dataset containing the gold SQL queries."
+    )
+    parser.add_argument(
+        "--output_path",
+        type=str,
+        default=evaluation_config.get("gold_store_path", EvaluationConstants.DEFAULT_GOLD_STORE_PATH),
+        help="Path of the .npy gold result store to write."
+    )
+    parser.add_argument(
+        "--max_workers",
+        type=int,
+        default=8,
+        help="Number of databases whose gold queries are executed in parallel."
+    )
+    args = parser.parse_args()
+
+    main(dataset_path=args.dataset_path, output_path=args.output_path, max_workers=args.max_workers)
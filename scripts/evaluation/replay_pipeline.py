@@ -0,0 +1,43 @@
+"""
+Script to rerun the pipeline from a given step on the contexts saved by a previous run.
+
+A run with `save_context_snapshots` enabled in pipeline.yaml saves the context of every task,
+including its retrieved and selected schema and its executed candidate queries. Replaying from
+e.g. QuerySelectionStep restores these contexts and runs only the query selection and the
+evaluation, concurrently over the tasks, so a new selection prompt can be evaluated without
+running the retrieval and generation models again.
+"""
+import argparse
+
+from executor.running_manager import RunningManager
+
+
+def main(snapshots_path: str, from_step: str, max_tasks: int = None):
+    manager = RunningManager(dataset_path=snapshots_path)
+    manager.run_replay(snapshots_path, from_step, max_tasks=max_tasks)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Rerun the pipeline from a given step on saved task contexts.")
+    parser.add_argument(
+        "--snapshots_path",
+        type=str,
+        required=True,
+        help="The context_snapshots_<timestamp>.jsonl file saved by a previous run."
+    )
+    parser.add_argument(
+        "--from_step",
+        type=str,
+        default="QuerySelectionStep",
+        choices=[step_class.__name__ for step_class in RunningManager.PIPELINE_STEP_CLASSES],
+        help="The first step to run, the earlier steps are skipped."
+    )
+    parser.add_argument(
+        "--max_tasks",
+        type=int,
+        default=None,
+        help="The maximum number of tasks to replay, all by default."
+    )
+    args = parser.parse_args()
+
+    main(snapshots_path=args.snapshots_path, from_step=args.from_step, max_tasks=args.max_tasks)
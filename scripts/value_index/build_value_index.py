@@ -0,0 +1,100 @@
+"""
+Script to build the MinHash LSH value indexes of the SQLite databases.
+
+For every database, the distinct values of the text columns are hashed into MinHash signatures
+and saved under `<value_index.path>/<db_id>`, where the InformationRetriever looks them up to
+map the phrases of a question to the columns containing similar values.
+"""
+import argparse
+import logging
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Dict
+
+from common.config.config_helper import ConfigurationHelper
+from infrastructure.database.database_manager import DatabaseManager
+from infrastructure.value_index.value_index import ValueIndex
+from util.constants import ValueIndexConstants
+from util.similarity_measures.lsh import LSHUtil
+
+# --- Logging Setup ---
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+
+def build_value_index_for_database(db_id: str, output_dir: str, config: Dict) -> int:
+    """
+    Builds and saves the value index of one database.
+
+    Args:
+        db_id (str): The database to index.
+        output_dir (str): The root directory of the value indexes.
+        config (Dict): The 'value_index' configuration section.
+
+    Returns:
+        int: The number of indexed values.
+    """
+    db_manager = DatabaseManager()
+    engine = db_manager.create_engine(db_id)
+    if engine is None:
+        raise RuntimeError("could not create a database engine")
+    try:
+        lsh = LSHUtil(
+            num_perm=int(config.get("num_perm", ValueIndexConstants.DEFAULT_NUM_PERM)),
+            bands=int(config.get("bands", ValueIndexConstants.DEFAULT_BANDS)),
+            shingle_size=int(config.get("shingle_size", ValueIndexConstants.DEFAULT_SHINGLE_SIZE))
+        )
+        value_index = ValueIndex.build(
+            engine,
+            lsh=lsh,
+            max_values_per_column=int(config.get("max_values_per_column", ValueIndexConstants.MAX_VALUES_PER_COLUMN)),
+            max_value_length=int(config.get("max_value_length", ValueIndexConstants.MAX_VALUE_LENGTH))
+        )
+        value_index.save(os.path.join(output_dir, db_id))
+        return len(value_index)
+    finally:
+        db_manager.close_connections(engine)
+
+
+def main(output_dir: str, max_workers: int) -> None:
+    """
+    Builds the value indexes of all SQLite databases.
+
+    Args:
+        output_dir (str): The root directory of the value indexes.
+        max_workers (int): The number of databases indexed in parallel.
+    """
+    config = ConfigurationHelper().get_config("value_index.yaml", "value_index") or {}
+    db_ids = DatabaseManager.list_sqlite_databases()
+    logging.info(f"Building value indexes of {len(db_ids)} databases into {output_dir}.")
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        futures = {pool.submit(build_value_index_for_database, db_id, output_dir, config): db_id for db_id in db_ids}
+        for future in as_completed(futures):
+            try:
+                logging.info(f"Indexed {future.result()} values of {futures[future]}.")
+            except Exception as e:
+                logging.error(f"Failed to build the value index of {futures[future]}: {e}")
+    logging.info(f"Built value indexes in {time.perf_counter() - start:.1f}s.")
+
+
+if __name__ == "__main__":
+    value_index_config = ConfigurationHelper().get_config("value_index.yaml", "value_index") or {}
+
+    parser = argparse.ArgumentParser(description="Build the MinHash LSH value indexes of the SQLite databases.")
+    parser.add_argument(
+        "--output_dir",
+        type=str,
+        default=value_index_config.get("path", ValueIndexConstants.DEFAULT_INDEX_PATH),
+        help="Root directory of the value indexes (one sub-directory per database)."
+    )
+    parser.add_argument(
+        "--max_workers",
+        type=int,
+        default=4,
+        help="Number of databases indexed in parallel."
+    )
+    args = parser.parse_args()
+
+    main(output_dir=args.output_dir, max_workers=args.max_workers)
@@ -1,27 +1,32 @@
 """
-Script to preprocess database column information and populate a ChromaDB collection.
+Script to preprocess database column information and populate a vector store collection.
 
-This script connects to a database, extracts schema information (tables and columns),
+This script discovers the SQLite databases, extracts schema information (tables and columns),
 and then stores representations of these columns (name or description) into
-a ChromaDB vector store. This allows for semantic searching of database columns.
+the configured vector store. This allows for semantic searching of database columns.
 """
 import os
 os.environ['PYTORCH_NVML_BASED_CUDA_CHECK'] = "1"
 
+import hashlib
+import json
 import logging
 import argparse
-from typing import List, Dict, Any
-import sys
-import torch
-from sqlalchemy import create_engine, text
+import queue
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import List, Dict, Any, Optional, Tuple
 
-from infrastructure.vector_db.chroma_client import ChromaClient
+from common.config.config_helper import ConfigurationHelper
+from infrastructure.lexical_index.column_lexical_index import ColumnLexicalIndex
+from infrastructure.vector_db.vector_store import VectorStore
+from infrastructure.vector_db.vector_store_factory import VectorStoreFactory
 from infrastructure.database.database_manager import DatabaseManager
 from components.schema.schema_engine import SchemaEngine
 from components.schema.schema_engine_factory import SchemaEngineFactory
-from common.config.config_helper import ConfigurationHelper
 from components.models.embedding_model_facade import HuggingFaceEmbeddingFacade
-from util.constants import PreprocessingConstants, DatabaseConfigKeys
+from util.constants import LexicalIndexConstants, PreprocessingConstants
 
 # --- Logging Setup ---
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
@@ -32,68 +37,96 @@ logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(
 
 os.environ['CHROMA_TELEMETRY_ANALYTICS'] = 'False'
 
-def main(chroma_config_file: str = "chroma_db.yaml", chroma_config_path_in_file: str = "chroma_db") -> None:
+# Metadata key holding the hash of a column document and its metadata
+CONTENT_HASH_KEY = "content_hash"
+
+def content_hash(document: str, metadata: Dict[str, Any]) -> str:
+    """
+    Hashes a column document together with its metadata, so that a change of either is detected.
+    """
+    payload = json.dumps({"document": document, "metadata": metadata}, sort_keys=True)
+    return hashlib.blake2b(payload.encode("utf-8"), digest_size=16).hexdigest()
+
+
+def sync_collection(vector_store: VectorStore, collection_name: str, documents: List[str], metadatas: List[Dict[str, Any]],
+                    ids: List[str], full_reindex: bool = False) -> Tuple[int, int, int]:
     """
-    Main function to extract database column information and populate ChromaDB.
+    Brings a collection in line with the current columns of a database: new or changed columns
+    are embedded and upserted, columns that no longer exist are deleted and unchanged columns
+    are left alone, so an unchanged database costs no embedding time.
 
     Args:
-        chroma_config_file (str, optional): Name of the ChromaDB configuration file.
-        chroma_config_path_in_file (str, optional): Path within the ChromaDB config file to its settings.
+        vector_store (VectorStore): The vector store holding the collection.
+        collection_name (str): The name of the collection.
+        documents (List[str]): The column documents.
+        metadatas (List[Dict[str, Any]]): The column metadatas. A 'content_hash' entry is added to each.
+        ids (List[str]): The column document ids.
+        full_reindex (bool): Re-embed every column, even the unchanged ones.
+
+    Returns:
+        Tuple[int, int, int]: The number of upserted, deleted and unchanged columns.
     """
-    os.environ['PYTORCH_NVML_BASED_CUDA_CHECK'] = "1"
-    logging.info("Starting database column preprocessing for ChromaDB population.")
-
-    cfg_helper = ConfigurationHelper()
-    db_config = cfg_helper.get_config("database.yaml", "database")
-    
-    # --- Database Connection Setup ---
-    host = db_config.get(DatabaseConfigKeys.HOST)
-    port = db_config.get(DatabaseConfigKeys.PORT)
-    user = db_config.get(DatabaseConfigKeys.USERNAME)
-    password = db_config.get(DatabaseConfigKeys.PASSWORD)
-    db_url = f"postgresql://{user}:{password}@{host}:{port}/postgres"
-    engine = create_engine(db_url)
-    
-    with engine.connect() as connection:
-        result = connection.execute(text("SELECT datname FROM pg_database WHERE datistemplate = false;"))
-        db_names = [row[0] for row in result]
-
-    # --- ChromaDB and Embedding Model Setup ---
-    chroma_settings = cfg_helper.get_config(chroma_config_file, chroma_config_path_in_file)
-    chroma_host = chroma_settings.get("host", PreprocessingConstants.DEFAULT_CHROMA_HOST)
-    chroma_port = int(chroma_settings.get("port", PreprocessingConstants.DEFAULT_CHROMA_PORT))
-    
-    embedding_facade = HuggingFaceEmbeddingFacade()
-    chroma_client = ChromaClient(host=chroma_host, port=chroma_port, embedding_facade=embedding_facade)
-    schema_factory = SchemaEngineFactory()
+    existing_hashes = {
+        doc_id: metadata.get(CONTENT_HASH_KEY)
+        for doc_id, metadata in vector_store.get_document_metadatas(collection_name).items()
+    }
+
+    upsert_documents, upsert_metadatas, upsert_ids = [], [], []
+    for document, metadata, doc_id in zip(documents, metadatas, ids):
+        metadata[CONTENT_HASH_KEY] = content_hash(document, metadata)
+        if full_reindex or existing_hashes.get(doc_id) != metadata[CONTENT_HASH_KEY]:
+            upsert_documents.append(document)
+            upsert_metadatas.append(metadata)
+            upsert_ids.append(doc_id)
+
+    dropped_ids = sorted(set(existing_hashes) - set(ids))
+    if upsert_ids:
+        vector_store.upsert_documents(
+            collection_name=collection_name,
+            documents=upsert_documents,
+            metadatas=upsert_metadatas,
+            ids=upsert_ids
+        )
+    vector_store.delete_documents(collection_name=collection_name, ids=dropped_ids)
+    return len(upsert_ids), len(dropped_ids), len(ids) - len(upsert_ids)
 
-    for db_name in db_names:
-        if db_name in ["govdata", "postgres"]:
-            continue
 
-        logging.info(f"Processing database: {db_name}")
-        
-        db_manager = DatabaseManager()
-        db_engine = db_manager.create_engine(db_name)
+@dataclass
+class ColumnBatch:
+    """
+    The column documents of one database, produced by a schema extraction worker.
+    """
+    db_name: str
+    documents: List[str] = field(default_factory=list)
+    metadatas: List[Dict[str, Any]] = field(default_factory=list)
+    ids: List[str] = field(default_factory=list)
+    extraction_seconds: float = 0.0
+    error: Optional[str] = None
+
+
+def extract_column_documents(db_name: str, schema_factory: SchemaEngineFactory, databases_dir: Optional[str] = None) -> ColumnBatch:
+    """
+    Extracts the column documents of a database. Runs in the schema extraction thread pool.
+
+    Args:
+        db_name (str): The database to extract.
+        schema_factory (SchemaEngineFactory): The factory used to build the SchemaEngine.
+        databases_dir (Optional[str]): The SQLite databases directory. Defaults to DatabaseConstants.SQLITE_PATH.
 
+    Returns:
+        ColumnBatch: The documents, metadatas and ids of every column, or the error that occurred.
+    """
+    start = time.perf_counter()
+    batch = ColumnBatch(db_name=db_name)
+    db_manager = DatabaseManager()
+    db_engine = db_manager.create_engine(db_name, databases_dir)
+    if db_engine is None:
+        batch.error = "could not create a database engine"
+        return batch
+
+    try:
         schema_engine: SchemaEngine = schema_factory.create_schema_engine(engine=db_engine, db_name=db_name)
-        collection_name = f"{PreprocessingConstants.COLUMN_COLLECTION_NAME}_{db_name}"
-        
-        chroma_client.get_or_create_collection(collection_name=collection_name)
-
-        try:
-            table_names: List[str] = schema_engine.get_table_names()
-        except Exception as e:
-            logging.error(f"Failed to fetch table names for {db_name}: {e}")
-            db_manager.close_connections(db_engine)
-            continue
-
-        if not table_names:
-            logging.info(f"No tables found in database {db_name}.")
-            db_manager.close_connections(db_engine)
-            continue
-
-        documents_to_add, metadatas_to_add, ids_to_add = [], [], []
+        table_names: List[str] = schema_engine.get_table_names()
         for table_name in table_names:
             try:
                 columns_data: List[Dict[str, Any]] = schema_engine.get_columns(table_name)
@@ -104,33 +137,121 @@ def main(chroma_config_file: str = "chroma_db.yaml", chroma_config_path_in_file:
             for col_data in columns_data:
                 comment = col_data.get('comment')
                 document_text = comment.strip() if comment else col_data['name']
-                documents_to_add.append(document_text)
-                metadatas_to_add.append({
+                batch.documents.append(document_text)
+                batch.metadatas.append({
                     "table_name": table_name,
                     "column_name": col_data['name'],
                     "column_type": str(col_data['type'])
                 })
-                ids_to_add.append(f"{db_name}_{table_name}_{col_data['name']}")
+                batch.ids.append(f"{db_name}_{table_name}_{col_data['name']}")
+    except Exception as e:
+        batch.error = str(e)
+    finally:
+        db_manager.close_connections(db_engine)
+        batch.extraction_seconds = time.perf_counter() - start
+    return batch
+
+
+def _produce_batch(db_name: str, schema_factory: SchemaEngineFactory, batches: "queue.Queue[ColumnBatch]",
+                   databases_dir: Optional[str] = None) -> None:
+    try:
+        batch = extract_column_documents(db_name, schema_factory, databases_dir)
+    except Exception as e:
+        # Every database must yield a batch, the embedding worker waits for exactly one per database
+        batch = ColumnBatch(db_name=db_name, error=str(e))
+    # Blocks while the queue is full, so extraction never runs far ahead of the embedding worker
+    batches.put(batch)
+
+
+def main(chroma_config_file: str = "chroma_db.yaml", chroma_config_path_in_file: str = "chroma_db", full_reindex: bool = False,
+         databases_dir: Optional[str] = None, max_workers: int = 8, queue_size: int = 4) -> None:
+    """
+    Main function to extract database column information and populate the vector store.
 
-        if documents_to_add:
+    The SQLite databases are discovered from the dev_databases directory. Their schemas are extracted
+    in a thread pool and handed over through a bounded queue to a single embedding worker, which keeps
+    the embedding model loaded for the whole run. Only new or changed columns are embedded unless
+    `full_reindex` is set. The BM25 lexical index of each database is rebuilt alongside its collection.
+
+    Args:
+        chroma_config_file (str, optional): Name of the ChromaDB configuration file.
+        chroma_config_path_in_file (str, optional): Path within the ChromaDB config file to its settings.
+        full_reindex (bool, optional): Re-embed every column instead of only the new or changed ones.
+        databases_dir (Optional[str], optional): The SQLite databases directory. Defaults to DatabaseConstants.SQLITE_PATH.
+        max_workers (int, optional): The number of schema extraction threads.
+        queue_size (int, optional): The maximum number of extracted databases waiting to be embedded.
+    """
+    os.environ['PYTORCH_NVML_BASED_CUDA_CHECK'] = "1"
+    logging.info("Starting database column preprocessing for vector store population.")
+
+    db_names = DatabaseManager.list_sqlite_databases(databases_dir)
+    if not db_names:
+        logging.warning("No SQLite databases found, nothing to ingest.")
+        return
+    logging.info(f"Discovered {len(db_names)} SQLite databases.")
+
+    # --- Vector Store and Embedding Model Setup ---
+    embedding_facade = HuggingFaceEmbeddingFacade()
+    vector_store = VectorStoreFactory().create_vector_store(
+        embedding_facade=embedding_facade,
+        config_file=chroma_config_file,
+        config_path=chroma_config_path_in_file
+    )
+    schema_factory = SchemaEngineFactory()
+    lexical_index_config = ConfigurationHelper().get_config("lexical_index.yaml", "lexical_index") or {}
+    lexical_index_path = lexical_index_config.get("path", LexicalIndexConstants.DEFAULT_INDEX_PATH)
+
+    batches: "queue.Queue[ColumnBatch]" = queue.Queue(maxsize=queue_size)
+    start = time.perf_counter()
+    total_columns, total_upserted, failed = 0, 0, 0
+
+    with ThreadPoolExecutor(max_workers=max_workers) as pool, embedding_facade.keep_loaded():
+        for db_name in db_names:
+            pool.submit(_produce_batch, db_name, schema_factory, batches, databases_dir)
+
+        # The embedding worker: consumes one extracted database at a time
+        for processed in range(1, len(db_names) + 1):
+            batch = batches.get()
+            if batch.error is not None:
+                failed += 1
+                logging.error(f"[{processed}/{len(db_names)}] Skipping {batch.db_name}: {batch.error}")
+                continue
+
+            collection_name = f"{PreprocessingConstants.COLUMN_COLLECTION_NAME}_{batch.db_name}"
             try:
-                chroma_client.add_documents(
+                vector_store.get_or_create_collection(collection_name=collection_name)
+                upserted, deleted, unchanged = sync_collection(
+                    vector_store=vector_store,
                     collection_name=collection_name,
-                    documents=documents_to_add,
-                    metadatas=metadatas_to_add,
-                    ids=ids_to_add
+                    documents=batch.documents,
+                    metadatas=batch.metadatas,
+                    ids=batch.ids,
+                    full_reindex=full_reindex
                 )
-                logging.info(f"Successfully added/updated documents in ChromaDB for {db_name}.")
+                if lexical_index_config.get("enabled", False):
+                    ColumnLexicalIndex.from_documents(batch.documents, batch.metadatas).save(lexical_index_path, batch.db_name)
             except Exception as e:
-                logging.error(f"Failed to add/update documents in ChromaDB for {db_name}: {e}")
-        
-        db_manager.close_connections(db_engine)
+                failed += 1
+                logging.error(f"[{processed}/{len(db_names)}] Failed to add/update documents in the vector store for {batch.db_name}: {e}")
+                continue
 
-    logging.info("Database column preprocessing and ChromaDB population finished.")
+            total_columns += len(batch.ids)
+            total_upserted += upserted
+            elapsed = time.perf_counter() - start
+            logging.info(
+                f"[{processed}/{len(db_names)}] {batch.db_name}: {upserted} upserted, {deleted} deleted, {unchanged} unchanged "
+                f"(extracted in {batch.extraction_seconds:.1f}s). Throughput: {total_columns / elapsed:.1f} columns/s."
+            )
+
+    elapsed = time.perf_counter() - start
+    logging.info(
+        f"Database column preprocessing finished in {elapsed:.1f}s: {len(db_names) - failed} databases, "
+        f"{total_columns} columns ({total_upserted} embedded), {failed} failed."
+    )
 
 
 if __name__ == "__main__":
-    parser = argparse.ArgumentParser(description="Populate ChromaDB with database column information.")
+    parser = argparse.ArgumentParser(description="Populate the vector store with database column information.")
     parser.add_argument(
         "--chroma_config_file",
         type=str,
@@ -143,6 +264,36 @@ if __name__ == "__main__":
         default="chroma_db", # Default path to chroma settings within its config file
         help="Dot-separated path to the ChromaDB configuration section within its config file (e.g., 'chroma_db')."
     )
+    parser.add_argument(
+        "--full_reindex",
+        action="store_true",
+        help="Re-embed every column, instead of only the new or changed ones."
+    )
+    parser.add_argument(
+        "--databases_dir",
+        type=str,
+        default=None,
+        help="Directory of the SQLite databases (<db>/<db>.sqlite). Defaults to the dev_databases directory of DatabaseConstants.SQLITE_PATH."
+    )
+    parser.add_argument(
+        "--max_workers",
+        type=int,
+        default=8,
+        help="Number of threads extracting database schemas in parallel."
+    )
+    parser.add_argument(
+        "--queue_size",
+        type=int,
+        default=4,
+        help="Maximum number of extracted databases waiting for the embedding worker."
+    )
     args = parser.parse_args()
 
-    main(chroma_config_file=args.chroma_config_file, chroma_config_path_in_file=args.chroma_config_path)
\ No newline at end of file
+    main(
+        chroma_config_file=args.chroma_config_file,
+        chroma_config_path_in_file=args.chroma_config_path,
+        full_reindex=args.full_reindex,
+        databases_dir=args.databases_dir,
+        max_workers=args.max_workers,
+        queue_size=args.queue_size
+    )
\ No newline at end of file
@@ -5,7 +5,10 @@ os.environ['PYTORCH_NVML_BASED_CUDA_CHECK'] = "1"
 import torch
 from transformers import AutoTokenizer, AutoModelForCausalLM
 from abc import ABC, abstractmethod
-from util.constants import HuggingFaceModelConstants
+from util.constants import HuggingFaceModelConstants, ResourceConstants
+from util.instrumentation import record_llm_usage
+from util.latency_budget import current_latency_budget
+from util.resource_limits import resource_slot
 import copy
 
 import gc
@@ -26,6 +29,7 @@ class BaseHuggingFaceFacade(ABC):
         self.model_repo = model_repo
         self._model = None
         self._tokenizer = None
+        self._counting_tokenizer = None
         self.device_map_config = None
 
         # Initialize default generation parameters
@@ -69,6 +73,16 @@ class BaseHuggingFaceFacade(ABC):
             self._load_model_and_tokenizer()
         return self._tokenizer
 
+    @property
+    def counting_tokenizer(self):
+        """
+        The tokenizer alone, e.g. to count prompt tokens. Unlike `tokenizer`, it does not load the model
+        and is kept when the model is unloaded.
+        """
+        if self._counting_tokenizer is None:
+            self._counting_tokenizer = self._tokenizer or AutoTokenizer.from_pretrained(self.model_name)
+        return self._counting_tokenizer
+
     def _load_model_and_tokenizer(self):
         """Loads the model and tokenizer on demand."""
         if self._model is not None and self._tokenizer is not None:
@@ -190,75 +204,81 @@ class BaseHuggingFaceFacade(ABC):
         Returns:
             str | list[str]: The model's generated response(s).
         """
-        try:
-            # Explicitly load model and tokenizer
-            self._load_model_and_tokenizer()
-            for i in range(torch.cuda.device_count()):
-                print(f"GPU {i} allocated: {torch.cuda.memory_allocated(i) / 1024**3:.2f} GB")
-                print(f"GPU {i} reserved: {torch.cuda.memory_reserved(i) / 1024**3:.2f} GB")
+        # Loading, generating and unloading all hold the GPU, so concurrent tasks take turns
+        with resource_slot(ResourceConstants.GPU):
+            try:
+                # Explicitly load model and tokenizer
+                self._load_model_and_tokenizer()
 
-            model_inputs = self._prepare_model_inputs(prompt, system_prompt)
+                model_inputs = self._prepare_model_inputs(prompt, system_prompt)
             
-            # Build final generation parameters:
-            # 1. Start with a copy of instance's base default parameters
-            final_params = copy.deepcopy(self.default_generation_params)
-            # 2. Layer task-specific defaults from subclass
-            final_params.update(self._get_task_specific_generation_params())
-            # 3. Layer call-specific overrides
-            final_params.update(generation_kwargs)
+                # Build final generation parameters:
+                # 1. Start with a copy of instance's base default parameters
+                final_params = copy.deepcopy(self.default_generation_params)
+                # 2. Layer task-specific defaults from subclass
+                final_params.update(self._get_task_specific_generation_params())
+                # 3. Layer call-specific overrides
+                final_params.update(generation_kwargs)
+                # A task with a latency budget stops generating once its budget is spent
+                budget = current_latency_budget()
+                if budget is not None and "max_time" not in final_params:
+                    final_params["max_time"] = budget.cap_timeout(float("inf"))
             
-            # Ensure pad_token_id and eos_token_id are set from tokenizer if not in params
-            if "pad_token_id" not in final_params:
-                final_params["pad_token_id"] = self.tokenizer.pad_token_id
-            if "eos_token_id" not in final_params:
-                final_params["eos_token_id"] = self.tokenizer.eos_token_id
+                # Ensure pad_token_id and eos_token_id are set from tokenizer if not in params
+                if "pad_token_id" not in final_params:
+                    final_params["pad_token_id"] = self.tokenizer.pad_token_id
+                if "eos_token_id" not in final_params:
+                    final_params["eos_token_id"] = self.tokenizer.eos_token_id
 
-            num_return_sequences = final_params.get("num_return_sequences", 1)
+                num_return_sequences = final_params.get("num_return_sequences", 1)
 
-            for i in range(torch.cuda.device_count()):
-                print(f"GPU {i} allocated: {torch.cuda.memory_allocated(i) / 1024**3:.2f} GB")
-                print(f"GPU {i} reserved: {torch.cuda.memory_reserved(i) / 1024**3:.2f} GB")
-            with torch.no_grad():
-                generated_ids_full = self.model.generate(
-                    **model_inputs,
-                    **final_params
-                )
-                if isinstance(generated_ids_full, torch.Tensor):
-                    generated_ids_full = generated_ids_full.cpu()
+                with torch.no_grad():
+                    generated_ids_full = self.model.generate(
+                        **model_inputs,
+                        **final_params
+                    )
+                    if isinstance(generated_ids_full, torch.Tensor):
+                        generated_ids_full = generated_ids_full.cpu()
 
             
-            input_ids_len = model_inputs["input_ids"].shape[1]
+                input_ids_len = model_inputs["input_ids"].shape[1]
+                # Token usage of the call, recorded in the metrics of the running pipeline step
+                completion_ids = generated_ids_full[:, input_ids_len:]
+                record_llm_usage(
+                    prompt_tokens=model_inputs["input_ids"].numel(),
+                    completion_tokens=int((completion_ids != final_params["pad_token_id"]).sum())
+                )
             
-            responses = []
-            for i in range(num_return_sequences):
-                current_sequence_ids = generated_ids_full[i, input_ids_len:]
+                responses = []
+                for i in range(num_return_sequences):
+                    current_sequence_ids = generated_ids_full[i, input_ids_len:]
                 
-                # Decode the full response
-                full_response_text = self.tokenizer.decode(current_sequence_ids, skip_special_tokens=True)
+                    # Decode the full response
+                    full_response_text = self.tokenizer.decode(current_sequence_ids, skip_special_tokens=True)
                 
-                # Attempt to find and remove the thinking part
-                # The token ID for '</think>' is 151668 in Qwen models.
-                # This part is specific to models that output thinking tags.
-                output_ids = current_sequence_ids.tolist()
-                try:
-                    # Find the index of the last '</think>' token
-                    # We search from the end to handle multiple thinking blocks if they exist
-                    index_end_think_token = len(output_ids) - output_ids[::-1].index(151668)
+                    # Attempt to find and remove the thinking part
+                    # The token ID for '</think>' is 151668 in Qwen models.
+                    # This part is specific to models that output thinking tags.
+                    output_ids = current_sequence_ids.tolist()
+                    try:
+                        # Find the index of the last '</think>' token
+                        # We search from the end to handle multiple thinking blocks if they exist
+                        index_end_think_token = len(output_ids) - output_ids[::-1].index(151668)
                     
-                    # The content after '</think>' is the actual response
-                    # We add 1 to the index to start decoding *after* the '</think>' token
-                    response_text = self.tokenizer.decode(output_ids[index_end_think_token:], skip_special_tokens=True).strip()
-                except ValueError:
-                    # If '</think>' is not found, use the full response
-                    response_text = full_response_text.strip()
+                        # The content after '</think>' is the actual response
+                        # We add 1 to the index to start decoding *after* the '</think>' token
+                        response_text = self.tokenizer.decode(output_ids[index_end_think_token:], skip_special_tokens=True).strip()
+                    except ValueError:
+                        # If '</think>' is not found, use the full response
+                        response_text = full_response_text.strip()
 
-                responses.append(response_text)
+                    responses.append(response_text)
 
-            return responses if num_return_sequences > 1 else responses[0]
+                return responses if num_return_sequences > 1 else responses[0]
 
-        except Exception as e:
-            print(f"Error during model query for '{self.model_name}': {e}")
-            return f"Error generating response: {e}"
-        finally:
-            # Explicitly unload model and tokenizer
-            self.unload_model()
\ No newline at end of file
+            except Exception as e:
+                print(f"Error during model query for '{self.model_name}': {e}")
+                return f"Error generating response: {e}"
+            finally:
+                # Explicitly unload model and tokenizer
+                self.unload_model()
\ No newline at end of file
@@ -0,0 +1,241 @@
+"""
+This module defines an embedding cache placed in front of the embedding model facades.
+
+Entries are keyed by (model, prompt_name, normalize flag, text hash). A bounded in-memory LRU
+serves repeated texts within a process; an optional on-disk store keeps every computed embedding
+in a memory-mapped float32 file so that reruns and other pipeline variants can reuse them.
+"""
+import hashlib
+import json
+import logging
+import os
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Dict, List, Optional
+
+import numpy as np
+
+from util.constants import EmbeddingCacheConstants
+
+if TYPE_CHECKING:
+    from components.models.embedding_model_facade import BaseEmbeddingModelFacade
+
+logger = logging.getLogger(__name__)
+
+_KEYS_FILE = "keys.bin"
+_VECTORS_FILE = "vectors.f32"
+_META_FILE = "meta.json"
+
+
+@dataclass
+class EmbeddingCacheStats:
+    """
+    Lookup counters of an EmbeddingCache.
+    """
+    memory_hits: int = 0
+    disk_hits: int = 0
+    misses: int = 0
+
+    @property
+    def lookups(self) -> int:
+        return self.memory_hits + self.disk_hits + self.misses
+
+    @property
+    def hit_rate(self) -> float:
+        return (self.memory_hits + self.disk_hits) / self.lookups if self.lookups else 0.0
+
+    def to_dict(self) -> Dict[str, float]:
+        return {
+            "lookups": self.lookups,
+            "memory_hits": self.memory_hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "hit_rate": self.hit_rate,
+        }
+
+
+class _DiskEmbeddingStore:
+    """
+    Append-only store of embeddings of a single dimension.
+
+    `keys.bin` holds one 16 byte key per row and `vectors.f32` the matching float32 rows.
+    The vectors file is memory-mapped for reads and remapped when rows were appended.
+    """
+    def __init__(self, path: str):
+        self.path = path
+        os.makedirs(path, exist_ok=True)
+        self._rows: Dict[bytes, int] = {}
+        self._dimension: Optional[int] = None
+        self._vectors: Optional[np.memmap] = None
+        # The rows present in both files, keys and vectors are aligned by position
+        self._row_count = 0
+
+        meta_path = os.path.join(path, _META_FILE)
+        if os.path.isfile(meta_path):
+            with open(meta_path, "r") as f:
+                self._dimension = json.load(f)["dimension"]
+            # A crash right after the first batch wrote meta.json leaves no keys file: the store is empty
+            keys_path = os.path.join(path, _KEYS_FILE)
+            keys = b""
+            if os.path.isfile(keys_path):
+                with open(keys_path, "rb") as f:
+                    keys = f.read()
+            row_count = min(len(keys) // EmbeddingCacheConstants.KEY_SIZE, self._stored_vector_rows())
+            for row in range(row_count):
+                self._rows[keys[row * EmbeddingCacheConstants.KEY_SIZE:(row + 1) * EmbeddingCacheConstants.KEY_SIZE]] = row
+            # A crash between the two writes of put_many leaves vectors without keys (or a partial row):
+            # drop them, so the next rows are appended at the same position in both files
+            self._truncate(row_count)
+            self._row_count = row_count
+            logger.info(f"Opened embedding cache at {path} with {row_count} entries.")
+
+    def _truncate(self, row_count: int) -> None:
+        for file_name, row_size in ((_KEYS_FILE, EmbeddingCacheConstants.KEY_SIZE), (_VECTORS_FILE, self._dimension * 4)):
+            file_path = os.path.join(self.path, file_name)
+            if os.path.isfile(file_path) and os.path.getsize(file_path) > row_count * row_size:
+                with open(file_path, "r+b") as f:
+                    f.truncate(row_count * row_size)
+
+    def _stored_vector_rows(self) -> int:
+        vectors_path = os.path.join(self.path, _VECTORS_FILE)
+        if self._dimension is None or not os.path.isfile(vectors_path):
+            return 0
+        return os.path.getsize(vectors_path) // (self._dimension * 4)
+
+    def get(self, key: bytes) -> Optional[np.ndarray]:
+        row = self._rows.get(key)
+        if row is None:
+            return None
+        if self._vectors is None or row >= self._vectors.shape[0]:
+            self._vectors = np.memmap(os.path.join(self.path, _VECTORS_FILE), dtype=np.float32, mode="r",
+                                      shape=(self._stored_vector_rows(), self._dimension))
+        return np.array(self._vectors[row])
+
+    def put_many(self, keys: List[bytes], vectors: np.ndarray) -> None:
+        if self._dimension is None:
+            self._dimension = int(vectors.shape[1])
+            with open(os.path.join(self.path, _META_FILE), "w") as f:
+                json.dump({"dimension": self._dimension}, f)
+        elif vectors.shape[1] != self._dimension:
+            logger.warning(f"Not caching embeddings of dimension {vectors.shape[1]} in a store of dimension {self._dimension}.")
+            return
+
+        new = [(key, vector) for key, vector in zip(keys, vectors) if key not in self._rows]
+        if not new:
+            return
+        first_row = self._row_count
+        # Vectors are written before keys, so a crash never leaves a key without its vector. Both are written
+        # at the offset of first_row, overwriting the vectors left without keys by a failed earlier write.
+        self._write_at(_VECTORS_FILE, first_row * self._dimension * 4,
+                       np.ascontiguousarray([vector for _, vector in new], dtype=np.float32).tobytes())
+        self._write_at(_KEYS_FILE, first_row * EmbeddingCacheConstants.KEY_SIZE, b"".join(key for key, _ in new))
+        for offset, (key, _) in enumerate(new):
+            self._rows[key] = first_row + offset
+        self._row_count = first_row + len(new)
+
+    def _write_at(self, file_name: str, offset: int, data: bytes) -> None:
+        file_path = os.path.join(self.path, file_name)
+        with open(file_path, "r+b" if os.path.isfile(file_path) else "wb") as f:
+            f.seek(offset)
+            f.write(data)
+            f.truncate()
+
+
+class EmbeddingCache:
+    """
+    Two-level (memory LRU, optional disk) cache of text embeddings.
+    """
+    def __init__(self, max_entries: int = EmbeddingCacheConstants.DEFAULT_MAX_ENTRIES, disk_path: Optional[str] = None):
+        """
+        Initializes the EmbeddingCache.
+
+        Args:
+            max_entries (int): The maximum number of embeddings kept in memory.
+            disk_path (Optional[str]): A directory for the persistent store, or None to cache in memory only.
+        """
+        self.max_entries = max_entries
+        self.disk_path = disk_path
+        self.stats = EmbeddingCacheStats()
+        self._memory: "OrderedDict[bytes, np.ndarray]" = OrderedDict()
+        self._disk_stores: Dict[str, _DiskEmbeddingStore] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def make_key(model: str, prompt_name: Optional[str], normalize_embeddings: bool, text: str) -> bytes:
+        text_hash = hashlib.blake2b(text.encode("utf-8"), digest_size=EmbeddingCacheConstants.KEY_SIZE).digest()
+        key_material = f"{model}\x00{prompt_name or ''}\x00{int(normalize_embeddings)}\x00".encode("utf-8") + text_hash
+        return hashlib.blake2b(key_material, digest_size=EmbeddingCacheConstants.KEY_SIZE).digest()
+
+    def _disk_store(self, model: str) -> Optional[_DiskEmbeddingStore]:
+        # One store per model, because embedding dimensions differ between models
+        if self.disk_path is None:
+            return None
+        if model not in self._disk_stores:
+            model_dir = hashlib.blake2b(model.encode("utf-8"), digest_size=8).hexdigest()
+            self._disk_stores[model] = _DiskEmbeddingStore(os.path.join(self.disk_path, model_dir))
+        return self._disk_stores[model]
+
+    def _remember(self, key: bytes, vector: np.ndarray) -> None:
+        self._memory[key] = vector
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+    def encode(self, facade: 'BaseEmbeddingModelFacade', texts: List[str], prompt_name: Optional[str] = None,
+               normalize_embeddings: bool = True) -> List[List[float]]:
+        """
+        Returns the embeddings of the texts, encoding only the ones that are not cached.
+        All missing texts are encoded in a single facade call.
+
+        Args:
+            facade (BaseEmbeddingModelFacade): The facade used for cache misses.
+            texts (List[str]): The texts to embed.
+            prompt_name (Optional[str]): The prompt name passed to the facade.
+            normalize_embeddings (bool): Whether the embeddings are normalized.
+
+        Returns:
+            List[List[float]]: One embedding per text, in order.
+        """
+        model = facade.model_name_or_path
+        keys = [self.make_key(model, prompt_name, normalize_embeddings, text) for text in texts]
+        vectors: List[Optional[np.ndarray]] = [None] * len(texts)
+        missing: Dict[bytes, List[int]] = OrderedDict()
+
+        with self._lock:
+            disk_store = self._disk_store(model)
+            for i, key in enumerate(keys):
+                if key in self._memory:
+                    self._memory.move_to_end(key)
+                    vectors[i] = self._memory[key]
+                    self.stats.memory_hits += 1
+                    continue
+                vector = disk_store.get(key) if disk_store is not None else None
+                if vector is not None:
+                    self._remember(key, vector)
+                    vectors[i] = vector
+                    self.stats.disk_hits += 1
+                else:
+                    if key in missing:
+                        # Duplicate text in the same call, served by the first encoding
+                        self.stats.memory_hits += 1
+                    else:
+                        self.stats.misses += 1
+                    missing.setdefault(key, []).append(i)
+
+        if missing:
+            missing_texts = [texts[positions[0]] for positions in missing.values()]
+            encoded = np.asarray(facade.encode(
+                missing_texts,
+                prompt_name=prompt_name,
+                normalize_embeddings=normalize_embeddings
+            ), dtype=np.float32)
+            with self._lock:
+                for (key, positions), vector in zip(missing.items(), encoded):
+                    self._remember(key, vector)
+                    for i in positions:
+                        vectors[i] = vector
+                if disk_store is not None:
+                    disk_store.put_many(list(missing.keys()), encoded)
+
+        return [vector.tolist() for vector in vectors]
@@ -5,10 +5,12 @@ os.environ['PYTORCH_NVML_BASED_CUDA_CHECK'] = "1"
 import torch
 from transformers import AutoTokenizer, AutoModel
 from abc import ABC, abstractmethod
+from contextlib import contextmanager
 from typing import List, Union, Optional, Dict
 import logging
 from huggingface_hub import snapshot_download
-from util.constants import HuggingFaceModelConstants
+from util.constants import HuggingFaceModelConstants, ResourceConstants
+from util.resource_limits import resource_slot
 import gc
 import torch.nn.functional as F
 from torch import Tensor
@@ -103,6 +105,8 @@ class HuggingFaceEmbeddingFacade(BaseEmbeddingModelFacade):
         """
         effective_model_name = model_name_or_path or HuggingFaceModelConstants.DEFAULT_EMBEDDING_MODEL_PATH
         super().__init__(model_name_or_path=effective_model_name, device=device, **kwargs)
+        # When set, encode calls keep the model loaded instead of unloading it after each call
+        self._keep_loaded = False
 
         # Use default model and path
         default_model_repo_id = HuggingFaceModelConstants.DEFAULT_EMBEDDING_MODEL
@@ -227,10 +231,32 @@ class HuggingFaceEmbeddingFacade(BaseEmbeddingModelFacade):
             print(f"GPU {i} reserved after loading the model: {torch.cuda.memory_reserved(i) / 1024**3:.2f} GB")
         logger.info(f"Embedding model '{self.model_name_or_path}' unloaded successfully.")
 
+    @contextmanager
+    def keep_loaded(self):
+        """
+        Keeps the model resident across encode calls inside the block. The model is still loaded
+        lazily on the first encode call, and unloaded when the block exits.
+        """
+        self._keep_loaded = True
+        try:
+            yield self
+        finally:
+            self._keep_loaded = False
+            self.unload_model()
+
+    def _ensure_model_loaded(self) -> None:
+        if self._model is None or self._tokenizer is None:
+            self._load_model(model_kwargs=self.model_kwargs.get('model_kwargs'), tokenizer_kwargs=self.model_kwargs.get('tokenizer_kwargs'), trust_remote_code=self.model_kwargs.get('trust_remote_code', True))
+
+    def _release_model(self) -> None:
+        if not self._keep_loaded:
+            self.unload_model()
+
     def encode(self, texts: List[str], batch_size: int = 32, normalize_embeddings: bool = True, **kwargs) -> List[List[float]]:
         """
         Generates embeddings for a list of texts using the Hugging Face model.
-        The model and tokenizer are loaded at the beginning of this method and unloaded at the end.
+        The model and tokenizer are loaded at the beginning of this method and unloaded at the end,
+        unless the call happens inside `keep_loaded()`.
 
         Args:
             texts (List[str]): A list of texts to embed.
@@ -241,55 +267,57 @@ class HuggingFaceEmbeddingFacade(BaseEmbeddingModelFacade):
         Returns:
             List[List[float]]: A list of embeddings.
         """
-        try:
-            self._load_model(model_kwargs=self.model_kwargs.get('model_kwargs'), tokenizer_kwargs=self.model_kwargs.get('tokenizer_kwargs'), trust_remote_code=self.model_kwargs.get('trust_remote_code', True))
-            logger.debug(f"Encoding {len(texts)} texts with batch_size={batch_size}, normalize={normalize_embeddings}")
+        with resource_slot(ResourceConstants.GPU):
+            try:
+                self._ensure_model_loaded()
+                logger.debug(f"Encoding {len(texts)} texts with batch_size={batch_size}, normalize={normalize_embeddings}")
             
-            all_embeddings = []
-            for i in range(0, len(texts), batch_size):
-                batch_texts = texts[i:i + batch_size]
-
-                # Tokenize the input texts
-                batch_dict = self.tokenizer(
-                    batch_texts,
-                    padding=True,
-                    truncation=True,
-                    max_length=kwargs.get("max_length", 8192), # Default max_length
-                    return_tensors="pt",
-                )
+                all_embeddings = []
+                for i in range(0, len(texts), batch_size):
+                    batch_texts = texts[i:i + batch_size]
+
+                    # Tokenize the input texts
+                    batch_dict = self.tokenizer(
+                        batch_texts,
+                        padding=True,
+                        truncation=True,
+                        max_length=kwargs.get("max_length", 8192), # Default max_length
+                        return_tensors="pt",
+                    )
                 
-                # Move batch to model's device
-                if self.model.device.type == 'cuda':
-                    batch_dict = {k: v.to(self.model.device) for k, v in batch_dict.items()}
+                    # Move batch to model's device
+                    if self.model.device.type == 'cuda':
+                        batch_dict = {k: v.to(self.model.device) for k, v in batch_dict.items()}
 
-                with torch.no_grad():
-                    outputs = self.model(**batch_dict)
+                    with torch.no_grad():
+                        outputs = self.model(**batch_dict)
                 
-                # Apply pooling
-                embeddings = last_token_pool(outputs.last_hidden_state, batch_dict['attention_mask'])
+                    # Apply pooling
+                    embeddings = last_token_pool(outputs.last_hidden_state, batch_dict['attention_mask'])
 
-                # Normalize embeddings
-                if normalize_embeddings:
-                    embeddings = F.normalize(embeddings, p=2, dim=1)
+                    # Normalize embeddings
+                    if normalize_embeddings:
+                        embeddings = F.normalize(embeddings, p=2, dim=1)
 
-                # Move embeddings to CPU and convert to list of lists
-                if isinstance(embeddings, torch.Tensor):
-                    all_embeddings.extend(embeddings.cpu().tolist())
+                    # Move embeddings to CPU and convert to list of lists
+                    if isinstance(embeddings, torch.Tensor):
+                        all_embeddings.extend(embeddings.cpu().tolist())
 
-                # Clear batch_dict from GPU memory
-                del batch_dict
-                if torch.cuda.is_available():
-                    torch.cuda.empty_cache()
+                    # Clear batch_dict from GPU memory
+                    del batch_dict
+                    if torch.cuda.is_available():
+                        torch.cuda.empty_cache()
 
-            return all_embeddings
-        finally:
-            self.unload_model()
+                return all_embeddings
+            finally:
+                self._release_model()
 
 
     def encode_single(self, text: str, normalize_embeddings: bool = True, **kwargs) -> List[float]:
         """
         Generates an embedding for a single text using the Hugging Face model.
-        The model and tokenizer are loaded at the beginning of this method and unloaded at the end.
+        The model and tokenizer are loaded at the beginning of this method and unloaded at the end,
+        unless the call happens inside `keep_loaded()`.
 
         Args:
             text (str): The text to embed.
@@ -299,39 +327,40 @@ class HuggingFaceEmbeddingFacade(BaseEmbeddingModelFacade):
         Returns:
             List[float]: The embedding for the text.
         """
-        try:
-            self._load_model(model_kwargs=self.model_kwargs.get('model_kwargs'), tokenizer_kwargs=self.model_kwargs.get('tokenizer_kwargs'), trust_remote_code=self.model_kwargs.get('trust_remote_code', True))
-            logger.debug(f"Encoding single text, normalize={normalize_embeddings}")
-
-            # Tokenize the input text
-            batch_dict = self.tokenizer(
-                [text], # encode expects a list
-                padding=True,
-                truncation=True,
-                max_length=kwargs.get("max_length", 8192), # Default max_length
-                return_tensors="pt",
-            )
+        with resource_slot(ResourceConstants.GPU):
+            try:
+                self._ensure_model_loaded()
+                logger.debug(f"Encoding single text, normalize={normalize_embeddings}")
+
+                # Tokenize the input text
+                batch_dict = self.tokenizer(
+                    [text], # encode expects a list
+                    padding=True,
+                    truncation=True,
+                    max_length=kwargs.get("max_length", 8192), # Default max_length
+                    return_tensors="pt",
+                )
 
-            # Move batch to model's device
-            if self.model.device.type == 'cuda':
-                batch_dict = {k: v.to(self.model.device) for k, v in batch_dict.items()}
+                # Move batch to model's device
+                if self.model.device.type == 'cuda':
+                    batch_dict = {k: v.to(self.model.device) for k, v in batch_dict.items()}
 
-            with torch.no_grad():
-                outputs = self.model(**batch_dict)
+                with torch.no_grad():
+                    outputs = self.model(**batch_dict)
             
-            # Apply pooling
-            embedding = last_token_pool(outputs.last_hidden_state, batch_dict['attention_mask'])
-
-            # Normalize embedding
-            if normalize_embeddings:
-                embedding = F.normalize(embedding, p=2, dim=1)
+                # Apply pooling
+                embedding = last_token_pool(outputs.last_hidden_state, batch_dict['attention_mask'])
 
-            # Move embedding to CPU and convert to list, then take the first element
-            if isinstance(embedding, torch.Tensor):
-                embedding = embedding.cpu().tolist()
-            return embedding[0]
-        finally:
-            self.unload_model()
+                # Normalize embedding
+                if normalize_embeddings:
+                    embedding = F.normalize(embedding, p=2, dim=1)
+
+                # Move embedding to CPU and convert to list, then take the first element
+                if isinstance(embedding, torch.Tensor):
+                    embedding = embedding.cpu().tolist()
+                return embedding[0]
+            finally:
+                self._release_model()
 
     def similarity(self, embeddings1: Union[torch.Tensor, List[List[float]]], embeddings2: Union[torch.Tensor, List[List[float]]]) -> torch.Tensor:
         """
@@ -1,5 +1,5 @@
 from .base_model_facade import BaseHuggingFaceFacade
-from util.constants import HuggingFaceModelConstants
+from util.constants import HuggingFaceModelConstants, LatencyBudgetConstants
 
 class ReasoningModelFacade(BaseHuggingFaceFacade):
     """
@@ -24,6 +24,20 @@ class ReasoningModelFacade(BaseHuggingFaceFacade):
         )
         return self.tokenizer([templated_text], return_tensors="pt").to(self.model.device)
 
+    def query(self, prompt: str, system_prompt: str = None, enable_thinking: bool = True, **generation_kwargs) -> str | list[str]:
+        """
+        Queries the model, see BaseHuggingFaceFacade.query.
+
+        Args:
+            enable_thinking (bool): If False, the model answers without a thinking block and
+                                    with a shorter default generation limit, e.g. when the latency budget is short.
+        """
+        if not enable_thinking:
+            # Qwen3 soft switch disabling the thinking mode for this turn
+            prompt = f"{prompt} /no_think"
+            generation_kwargs.setdefault("max_new_tokens", LatencyBudgetConstants.NO_THINKING_MAX_NEW_TOKENS)
+        return super().query(prompt, system_prompt, **generation_kwargs)
+
     def _get_task_specific_generation_params(self) -> dict:
         """
         Returns task-specific default generation parameters for reasoning.
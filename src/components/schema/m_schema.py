@@ -1,32 +1,265 @@
+import sys
+import threading
+from collections import OrderedDict
+from collections.abc import Mapping
+from dataclasses import dataclass, field
+from util.constants import MSchemaConstants
 from util.utils import examples_to_str, read_json, write_json
-from typing import Any, Dict, Iterable, List, Optional, Tuple, Union
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple, Union
+
+
+@dataclass
+class BudgetedMSchema:
+    """
+    An M-Schema rendered within a token budget, and what was pruned to fit it.
+    """
+    text: str
+    token_count: int
+    max_tokens: int
+    # Examples shown per column, lower than requested if examples were pruned
+    example_num: int
+    requested_example_num: int
+    comments_dropped: bool = False
+    # "table.column" of the pruned columns, lowest ranked first
+    dropped_columns: List[str] = field(default_factory=list)
+
+    @property
+    def fits(self) -> bool:
+        return self.token_count <= self.max_tokens
+
+    @property
+    def pruned(self) -> bool:
+        return self.example_num < self.requested_example_num or self.comments_dropped or len(self.dropped_columns) > 0
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "token_count": self.token_count,
+            "max_tokens": self.max_tokens,
+            "fits": self.fits,
+            "example_num": self.example_num,
+            "requested_example_num": self.requested_example_num,
+            "comments_dropped": self.comments_dropped,
+            "dropped_columns": self.dropped_columns
+        }
+
+
+def count_tokens(tokenizer: Any, text: str) -> int:
+    """
+    Counts the tokens of a text with a tokenizer exposing `encode` (Hugging Face, tiktoken) or a callable returning tokens.
+    """
+    if hasattr(tokenizer, "encode"):
+        return len(tokenizer.encode(text))
+    return len(tokenizer(text))
+
+
+class ExamplePool:
+    """
+    Interns the example values of the M-Schemas, so that equal values and equal example lists are stored once
+    per process, however many databases hold them. Example lists are stored as tuples.
+    """
+    def __init__(self):
+        self._values: Dict[tuple, Any] = {}
+        self._examples: Dict[tuple, tuple] = {}
+
+    def __len__(self) -> int:
+        return len(self._values) + len(self._examples)
+
+    def intern_value(self, value: Any) -> Any:
+        if isinstance(value, str):
+            return sys.intern(value)
+        try:
+            # Keyed by type as well, 1, 1.0 and True are equal but rendered differently
+            return self._values.setdefault((type(value), value), value)
+        except TypeError:
+            return value
+
+    def intern_examples(self, examples: Iterable[Any]) -> tuple:
+        examples = tuple(self.intern_value(example) for example in examples)
+        if not examples:
+            return ()
+        if all(type(example) is str for example in examples):
+            return self._examples.setdefault(examples, examples)
+        return examples
+
+    def clear(self) -> None:
+        self._values.clear()
+        self._examples.clear()
+
+
+# The pool shared by the M-Schemas of the process
+_example_pool = ExamplePool()
+
+
+def _intern(value: Any) -> Any:
+    return sys.intern(value) if type(value) is str else value
+
+
+class MSchemaField(Mapping):
+    """
+    A field of an M-Schema table. It reads like the field dictionary it replaces
+    (field_info['type'], field_info.get('examples', [])), but without a dictionary per field:
+    the attributes are slots, the strings are interned and the examples come from the shared ExamplePool.
+    """
+    KEYS = ("type", "primary_key", "nullable", "default", "autoincrement", "comment", "examples")
+    _KEY_SET = frozenset(KEYS)
+    __slots__ = KEYS + ("extra",)
+
+    def __init__(self, field_type: str = "", primary_key: bool = False, nullable: bool = True, default: Any = None,
+                 autoincrement: bool = False, comment: str = "", examples: Iterable[Any] = (),
+                 pool: ExamplePool = _example_pool, **kwargs):
+        self.type = _intern(field_type)
+        self.primary_key = primary_key
+        self.nullable = nullable
+        self.default = _intern(default)
+        self.autoincrement = autoincrement
+        self.comment = _intern(comment)
+        self.examples = pool.intern_examples(examples)
+        # Attributes beyond the standard ones, None when there are none
+        self.extra = kwargs or None
+
+    @classmethod
+    def from_dict(cls, field_info: Dict[str, Any], pool: ExamplePool = _example_pool) -> 'MSchemaField':
+        field_info = dict(field_info)
+        return cls(field_info.pop("type", ""), pool=pool, **field_info)
+
+    def __getitem__(self, key: str) -> Any:
+        if key in self._KEY_SET:
+            return getattr(self, key)
+        if self.extra is not None:
+            return self.extra[key]
+        raise KeyError(key)
+
+    def __iter__(self):
+        yield from self.KEYS
+        if self.extra is not None:
+            yield from self.extra
+
+    def __len__(self) -> int:
+        return len(self.KEYS) + (len(self.extra) if self.extra is not None else 0)
+
+    def to_dict(self) -> Dict[str, Any]:
+        field_info = {key: getattr(self, key) for key in self.KEYS}
+        field_info["examples"] = list(self.examples)
+        if self.extra is not None:
+            field_info.update(self.extra)
+        return field_info
+
+
+class MSchemaTable(Mapping):
+    """
+    A table of an M-Schema, reading like the table dictionary it replaces (table_info['fields']).
+    """
+    KEYS = ("fields", "examples", "comment")
+    _KEY_SET = frozenset(KEYS)
+    __slots__ = KEYS + ("extra",)
+
+    def __init__(self, fields: Optional[Dict[str, MSchemaField]] = None, examples: Iterable[Any] = (),
+                 comment: Optional[str] = None, pool: ExamplePool = _example_pool, **kwargs):
+        self.fields: Dict[str, MSchemaField] = fields if fields is not None else {}
+        self.examples = pool.intern_examples(examples)
+        self.comment = _intern(comment)
+        self.extra = kwargs or None
+
+    @classmethod
+    def from_dict(cls, table_info: Dict[str, Any], pool: ExamplePool = _example_pool) -> 'MSchemaTable':
+        table_info = dict(table_info)
+        fields = {
+            sys.intern(field_name): field_info if isinstance(field_info, MSchemaField) else MSchemaField.from_dict(field_info, pool)
+            for field_name, field_info in table_info.pop("fields", {}).items()
+        }
+        return cls(fields, pool=pool, **table_info)
+
+    def __getitem__(self, key: str) -> Any:
+        if key in self._KEY_SET:
+            return getattr(self, key)
+        if self.extra is not None:
+            return self.extra[key]
+        raise KeyError(key)
+
+    def __iter__(self):
+        yield from self.KEYS
+        if self.extra is not None:
+            yield from self.extra
+
+    def __len__(self) -> int:
+        return len(self.KEYS) + (len(self.extra) if self.extra is not None else 0)
+
+    def to_dict(self) -> Dict[str, Any]:
+        table_info = {
+            "fields": {field_name: field.to_dict() for field_name, field in self.fields.items()},
+            "examples": list(self.examples),
+            "comment": self.comment
+        }
+        if self.extra is not None:
+            table_info.update(self.extra)
+        return table_info
 
 
 class MSchema:
-    def __init__(self, db_id: str = 'Anonymous', schema: Optional[str] = None):
+    """
+    The M-Schema of a database: its tables, their fields and the foreign keys.
+
+    Tables and fields are held as compact MSchemaTable and MSchemaField records that read like the
+    dictionaries of the dumped form, so that many databases fit in one long-lived process.
+
+    The same schema is rendered several times per task (schema filter, SQL generation, query selection), so
+    lookups go through case-insensitive index maps and rendering is memoized: per table header, per field
+    line and per selection. The indexes and caches are rebuilt lazily after add_table, add_field,
+    add_foreign_key and load; code changing `tables` or `foreign_keys` directly must call invalidate_caches.
+    """
+    def __init__(self, db_id: str = 'Anonymous', schema: Optional[str] = None, pool: Optional[ExamplePool] = None):
         self.db_id = db_id
         self.schema = schema
-        self.tables = {}
+        self.tables: Dict[str, MSchemaTable] = {}
         self.foreign_keys = []
+        self.pool = pool if pool is not None else _example_pool
+        self._lock = threading.Lock()
+        self.invalidate_caches()
+
+    def invalidate_caches(self) -> None:
+        """
+        Drops the lookup indexes and the rendered fragments, after the tables or foreign keys changed.
+        """
+        # lowercase table name -> table name
+        self._table_index: Optional[Dict[str, str]] = None
+        # lowercase "table.column" -> (table name, field name) of the fields matching it
+        self._column_index: Optional[Dict[str, List[Tuple[str, str]]]] = None
+        self._fragment_cache: Dict[tuple, str] = {}
+        self._render_cache: OrderedDict = OrderedDict()
+
+    def _indexes(self) -> Tuple[Dict[str, str], Dict[str, List[Tuple[str, str]]]]:
+        table_index, column_index = self._table_index, self._column_index
+        if table_index is None or column_index is None:
+            table_index, column_index = {}, {}
+            for table_name, table_info in self.tables.items():
+                table_index.setdefault(table_name.lower(), table_name)
+                for field_name in table_info['fields']:
+                    column_index.setdefault(f"{table_name}.{field_name}".lower(), []).append((table_name, field_name))
+            self._table_index, self._column_index = table_index, column_index
+        return table_index, column_index
 
     def add_table(self, name, fields={}, comment=None):
-        self.tables[name] = {"fields": fields.copy(), 'examples': [], 'comment': comment}
+        self.tables[sys.intern(name)] = MSchemaTable.from_dict({"fields": fields, 'comment': comment}, self.pool)
+        self.invalidate_caches()
 
     def add_field(self, table_name: str, field_name: str, field_type: str = "",
             primary_key: bool = False, nullable: bool = True, default: Any = None,
             autoincrement: bool = False, comment: str = "", examples: list = [], **kwargs):
-        self.tables[table_name]["fields"][field_name] = {
-            "type": field_type,
-            "primary_key": primary_key,
-            "nullable": nullable,
-            "default": default if default is None else f'{default}',
-            "autoincrement": autoincrement,
-            "comment": comment,
-            "examples": examples.copy(),
-            **kwargs}
+        self.tables[table_name]["fields"][sys.intern(field_name)] = MSchemaField(
+            field_type,
+            primary_key=primary_key,
+            nullable=nullable,
+            default=default if default is None else f'{default}',
+            autoincrement=autoincrement,
+            comment=comment,
+            examples=examples,
+            pool=self.pool,
+            **kwargs)
+        self.invalidate_caches()
 
     def add_foreign_key(self, table_name, field_name, ref_schema, ref_table_name, ref_field_name):
-        self.foreign_keys.append([table_name, field_name, ref_schema, ref_table_name, ref_field_name])
+        self.foreign_keys.append([_intern(value) for value in (table_name, field_name, ref_schema, ref_table_name, ref_field_name)])
+        self.invalidate_caches()
 
     def get_field_type(self, field_type, simple_mode=True)->str:
         if not simple_mode:
@@ -49,110 +282,177 @@ class MSchema:
         else:
             return False
 
-    def get_field_info(self, table_name: str, field_name: str) -> Dict:
+    def resolve_table(self, table_name: str) -> Optional[str]:
+        """
+        Returns the name of the table matching table_name case-insensitively, or None.
+        """
+        return self._indexes()[0].get(table_name.lower())
+
+    def resolve_column(self, table_name: str, field_name: str) -> Optional[Tuple[str, str]]:
+        """
+        Returns the (table, field) names of the column matching case-insensitively, or None.
+        """
+        matches = self._indexes()[1].get(f"{table_name}.{field_name}".lower())
+        return matches[0] if matches else None
+
+    def get_field_info(self, table_name: str, field_name: str) -> Mapping:
         try:
             return self.tables[table_name]['fields'][field_name]
         except:
             return {}
 
-    def single_table_mschema(self, table_name: str, selected_columns: List = None,
-                             example_num=5, show_type_detail=False) -> str:
-        table_info = self.tables.get(table_name, {})
-        output = []
-        table_comment = table_info.get('comment', '')
+    def get_example_values(self) -> Dict[str, List[str]]:
+        """
+        Returns the example values of every field, keyed by "table.column".
+        """
+        return {
+            f"{table_name}.{field_name}": [str(example) for example in field_info.get('examples', []) if example is not None]
+            for table_name, table_info in self.tables.items()
+            for field_name, field_info in table_info['fields'].items()
+        }
+
+    def _table_header(self, table_name: str, table_info: Dict, show_comment: bool) -> str:
+        key = ("table", table_name, self.schema, show_comment)
+        header = self._fragment_cache.get(key)
+        if header is not None:
+            return header
+
+        table_comment = table_info.get('comment', '') if show_comment else None
         if table_comment is not None and table_comment != 'None' and len(table_comment) > 0:
             if self.schema is not None and len(self.schema) > 0:
-                output.append(f"# Table: {self.schema}.{table_name}, {table_comment}")
+                header = f"# Table: {self.schema}.{table_name}, {table_comment}"
             else:
-                output.append(f"# Table: {table_name}, {table_comment}")
+                header = f"# Table: {table_name}, {table_comment}"
         else:
             if self.schema is not None and len(self.schema) > 0:
-                output.append(f"# Table: {self.schema}.{table_name}")
+                header = f"# Table: {self.schema}.{table_name}"
             else:
-                output.append(f"# Table: {table_name}")
+                header = f"# Table: {table_name}"
+        self._fragment_cache[key] = header
+        return header
 
-        field_lines = []
-        # 处理表中的每一个字段
-        for field_name, field_info in table_info['fields'].items():
-            if selected_columns is not None and field_name.lower() not in selected_columns:
-                continue
-
-            raw_type = self.get_field_type(field_info['type'], not show_type_detail)
-            field_line = f"({field_name}:{raw_type.upper()}"
-            if field_info['comment'] != '':
-                field_line += f", {field_info['comment'].strip()}"
-            else:
-                pass
+    def _field_line(self, table_name: str, field_name: str, field_info: Dict,
+                    example_num: int, show_type_detail: bool, show_comment: bool) -> str:
+        key = ("field", table_name, field_name, example_num, show_type_detail, show_comment)
+        field_line = self._fragment_cache.get(key)
+        if field_line is not None:
+            return field_line
+
+        raw_type = self.get_field_type(field_info['type'], not show_type_detail)
+        field_line = f"({field_name}:{raw_type.upper()}"
+        if show_comment and field_info['comment'] != '':
+            field_line += f", {field_info['comment'].strip()}"
+        else:
+            pass
 
-            ## 打上主键标识
-            is_primary_key = field_info.get('primary_key', False)
-            if is_primary_key:
-                field_line += f", Primary Key"
+        ## 打上主键标识
+        is_primary_key = field_info.get('primary_key', False)
+        if is_primary_key:
+            field_line += f", Primary Key"
 
-            # 如果有示例，添加上
-            if len(field_info.get('examples', [])) > 0 and example_num > 0:
-                examples = field_info['examples']
-                examples = [s for s in examples if s is not None]
-                examples = examples_to_str(examples)
-                if len(examples) > example_num:
-                    examples = examples[:example_num]
+        # 如果有示例，添加上
+        if len(field_info.get('examples', [])) > 0 and example_num > 0:
+            examples = field_info['examples']
+            examples = [s for s in examples if s is not None]
+            examples = examples_to_str(examples)
+            if len(examples) > example_num:
+                examples = examples[:example_num]
 
-                if raw_type in ['DATE', 'TIME', 'DATETIME', 'TIMESTAMP']:
-                    examples = [examples[0]]
-                elif len(examples) > 0 and max([len(s) for s in examples]) > 20:
-                    if max([len(s) for s in examples]) > 50:
-                        examples = []
-                    else:
-                        examples = [examples[0]]
+            if raw_type in ['DATE', 'TIME', 'DATETIME', 'TIMESTAMP']:
+                examples = [examples[0]]
+            elif len(examples) > 0 and max([len(s) for s in examples]) > 20:
+                if max([len(s) for s in examples]) > 50:
+                    examples = []
                 else:
-                    pass
-                if len(examples) > 0:
-                    example_str = ', '.join([str(example) for example in examples])
-                    field_line += f", Examples: [{example_str}]"
-                else:
-                    pass
+                    examples = [examples[0]]
             else:
-                field_line += ""
-            field_line += ")"
+                pass
+            if len(examples) > 0:
+                example_str = ', '.join([str(example) for example in examples])
+                field_line += f", Examples: [{example_str}]"
+            else:
+                pass
+        else:
+            field_line += ""
+        field_line += ")"
 
-            field_lines.append(field_line)
-        output.append('[')
-        output.append(',\n'.join(field_lines))
-        output.append(']')
+        self._fragment_cache[key] = field_line
+        return field_line
 
-        return '\n'.join(output)
+    def _render_table(self, table_name: str, selected_fields: Optional[Iterable[str]],
+                      example_num: int, show_type_detail: bool, show_comment: bool) -> str:
+        table_info = self.tables.get(table_name, {})
+        fields = table_info['fields']
+        # 处理表中的每一个字段
+        field_names = fields if selected_fields is None else [f for f in fields if f in selected_fields]
+        field_lines = [
+            self._field_line(table_name, field_name, fields[field_name], example_num, show_type_detail, show_comment)
+            for field_name in field_names
+        ]
+        return '\n'.join([self._table_header(table_name, table_info, show_comment), '[', ',\n'.join(field_lines), ']'])
+
+    def single_table_mschema(self, table_name: str, selected_columns: List = None,
+                             example_num=5, show_type_detail=False, show_comment=True) -> str:
+        """
+        Renders one table. selected_columns are the lowercase names of the columns to include, None for all.
+        """
+        selected_fields = None
+        if selected_columns is not None:
+            selected_columns = set(selected_columns)
+            selected_fields = {f for f in self.tables.get(table_name, {})['fields'] if f.lower() in selected_columns}
+        return self._render_table(table_name, selected_fields, example_num, show_type_detail, show_comment)
 
     def to_mschema(self, selected_tables: List = None, selected_columns: List = None,
-                   example_num=3, show_type_detail=False) -> str:
+                   example_num=3, show_type_detail=False, show_comment=True) -> str:
         """
         convert to a MSchema string.
         selected_tables: Selected tables to be included in the MSchema
         selected_columns: Select columns to be included in the MSchema
+        show_comment: Whether table and column comments are included
+
+        The result is cached per selection, so rendering the same selection again costs a dictionary lookup.
         """
+        if selected_tables is not None:
+            selected_tables = frozenset(s.lower() for s in selected_tables)
+        if selected_columns is not None:
+            selected_columns = frozenset(s.lower() for s in selected_columns)
+            selected_tables = frozenset(s.split('.')[0] for s in selected_columns)
+
+        key = (self.db_id, self.schema, selected_tables, selected_columns, example_num, show_type_detail, show_comment)
+        with self._lock:
+            rendered = self._render_cache.get(key)
+            if rendered is not None:
+                self._render_cache.move_to_end(key)
+                return rendered
+
+            rendered = self._render(selected_tables, selected_columns, example_num, show_type_detail, show_comment)
+            self._render_cache[key] = rendered
+            if len(self._render_cache) > MSchemaConstants.RENDER_CACHE_SIZE:
+                self._render_cache.popitem(last=False)
+        return rendered
+
+    def _render(self, selected_tables: Optional[frozenset], selected_columns: Optional[frozenset],
+                example_num: int, show_type_detail: bool, show_comment: bool) -> str:
         output = []
 
         output.append(f"【DB_ID】 {self.db_id}")
         output.append(f"【Schema】")
 
-        if selected_tables is not None:
-            selected_tables = [s.lower() for s in selected_tables]
+        # The selected fields per table, resolved through the column index
+        fields_per_table: Dict[str, set] = {}
         if selected_columns is not None:
-            selected_columns = [s.lower() for s in selected_columns]
-            selected_tables = [s.split('.')[0].lower() for s in selected_columns]
+            column_index = self._indexes()[1]
+            for column in selected_columns:
+                for table_name, field_name in column_index.get(column, []):
+                    fields_per_table.setdefault(table_name, set()).add(field_name)
 
         # 依次处理每一个表
-        for table_name, table_info in self.tables.items():
+        for table_name in self.tables:
             if selected_tables is None or table_name.lower() in selected_tables:
-                cur_table_type = table_info.get('type', 'table')
-                column_names = list(table_info['fields'].keys())
-                if selected_columns is not None:
-                    cur_selected_columns = [c.lower() for c in column_names if f"{table_name}.{c}".lower() in selected_columns]
-                else:
-                    cur_selected_columns = selected_columns
-                output.append(self.single_table_mschema(table_name, cur_selected_columns, example_num, show_type_detail))
+                selected_fields = fields_per_table.get(table_name, set()) if selected_columns is not None else None
+                output.append(self._render_table(table_name, selected_fields, example_num, show_type_detail, show_comment))
 
         # 添加外键信息，选择table_type为view时不展示外键
-        print('FOREIGN KEYS', self.foreign_keys)
         if self.foreign_keys:
             output.append("【Foreign keys】")
             for fk in self.foreign_keys:
@@ -165,12 +465,98 @@ class MSchema:
 
         return '\n'.join(output)
 
+    def _key_columns(self) -> set:
+        """
+        The lowercase "table.column" of the primary and foreign key columns, needed to join the tables.
+        """
+        key_columns = {
+            f"{table_name}.{field_name}".lower()
+            for table_name, table_info in self.tables.items()
+            for field_name, field_info in table_info['fields'].items()
+            if field_info.get('primary_key', False)
+        }
+        for table1, column1, _, table2, column2 in self.foreign_keys:
+            key_columns.add(f"{table1}.{column1}".lower())
+            key_columns.add(f"{table2}.{column2}".lower())
+        return key_columns
+
+    def to_mschema_within_budget(self, tokenizer: Any, max_tokens: int, selected_tables: List = None,
+                                 selected_columns: List = None, column_ranking: Optional[Sequence[str]] = None,
+                                 example_num=3, show_type_detail=False) -> BudgetedMSchema:
+        """
+        Renders the M-Schema like to_mschema, pruning it until it fits max_tokens. In order, it
+        reduces the examples to one per column and then none, drops the comments, and finally drops
+        the lowest ranked columns. Primary and foreign key columns are never dropped, so the result
+        may still exceed the budget.
+
+        Args:
+            tokenizer: The tokenizer of the model the schema is rendered for, see count_tokens.
+            max_tokens: The maximum number of tokens of the rendered schema.
+            selected_tables: Selected tables to be included, see to_mschema.
+            selected_columns: Selected "table.column" to be included, see to_mschema.
+            column_ranking: "table.column" from most to least relevant. Columns missing from it rank
+                            last, in schema order, and are dropped first.
+            example_num: The maximum number of examples per column.
+            show_type_detail: Whether to show the detailed column types.
+
+        Returns:
+            BudgetedMSchema: The rendered schema and the pruning report.
+        """
+        def render(num_examples: int, show_comment: bool, columns: Optional[List[str]]) -> Tuple[str, int]:
+            text = self.to_mschema(selected_tables, columns, num_examples, show_type_detail, show_comment)
+            return text, count_tokens(tokenizer, text)
+
+        # 1. Fewer examples
+        for num_examples in sorted({example_num, min(example_num, 1), 0}, reverse=True):
+            text, token_count = render(num_examples, True, selected_columns)
+            if token_count <= max_tokens:
+                return BudgetedMSchema(text, token_count, max_tokens, num_examples, example_num)
+
+        # 2. No comments
+        text, token_count = render(0, False, selected_columns)
+        if token_count <= max_tokens:
+            return BudgetedMSchema(text, token_count, max_tokens, 0, example_num, comments_dropped=True)
+
+        # 3. Fewer columns: keep the longest prefix of the ranked columns that fits
+        if selected_columns is not None:
+            candidate_columns = list(dict.fromkeys(c.lower() for c in selected_columns))
+        else:
+            wanted_tables = {t.lower() for t in selected_tables} if selected_tables is not None else None
+            candidate_columns = [
+                f"{table_name}.{field_name}".lower()
+                for table_name, table_info in self.tables.items()
+                if wanted_tables is None or table_name.lower() in wanted_tables
+                for field_name in table_info['fields']
+            ]
+        key_columns = self._key_columns()
+        rank = {column.lower(): i for i, column in reversed(list(enumerate(column_ranking or [])))}
+        protected = [c for c in candidate_columns if c in key_columns]
+        droppable = sorted((c for c in candidate_columns if c not in key_columns),
+                           key=lambda c: rank.get(c, len(rank)))
+
+        low, high = 0, len(droppable)
+        best = None
+        while low <= high:
+            keep = (low + high) // 2
+            text, token_count = render(0, False, protected + droppable[:keep])
+            if token_count <= max_tokens:
+                best = (keep, text, token_count)
+                low = keep + 1
+            else:
+                high = keep - 1
+        if best is None:
+            # Even the key columns alone exceed the budget, the last render kept only them
+            best = (0, text, token_count)
+        keep, text, token_count = best
+        return BudgetedMSchema(text, token_count, max_tokens, 0, example_num, comments_dropped=True,
+                               dropped_columns=list(reversed(droppable[keep:])))
+
     def dump(self):
         schema_dict = {
             "db_id": self.db_id,
             "schema": self.schema,
-            "tables": self.tables,
-            "foreign_keys": self.foreign_keys
+            "tables": {table_name: table_info.to_dict() for table_name, table_info in self.tables.items()},
+            "foreign_keys": [list(fk) for fk in self.foreign_keys]
         }
         return schema_dict
 
@@ -178,9 +564,18 @@ class MSchema:
         schema_dict = self.dump()
         write_json(file_path, schema_dict)
 
-    def load(self, file_path: str):
-        data = read_json(file_path)
+    def load_dict(self, data: Dict[str, Any]):
+        """
+        Loads a schema in the form returned by dump.
+        """
         self.db_id = data.get("db_id", "Anonymous")
         self.schema = data.get("schema", None)
-        self.tables = data.get("tables", {})
-        self.foreign_keys = data.get("foreign_keys", [])
\ No newline at end of file
+        self.tables = {
+            sys.intern(table_name): MSchemaTable.from_dict(table_info, self.pool)
+            for table_name, table_info in data.get("tables", {}).items()
+        }
+        self.foreign_keys = [[_intern(value) for value in fk] for fk in data.get("foreign_keys", [])]
+        self.invalidate_caches()
+
+    def load(self, file_path: str):
+        self.load_dict(read_json(file_path))
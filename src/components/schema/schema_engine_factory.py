@@ -1,11 +1,21 @@
+import threading
+from typing import Dict
 from sqlalchemy.engine import Engine
+from components.schema.m_schema import MSchema
 from components.schema.schema_engine import SchemaEngine
 from common.config.config_helper import ConfigurationHelper
 
 class SchemaEngineFactory:
     """
     Factory for creating SchemaEngine instances based on configuration.
+
+    With share_mschema enabled, the M-Schema of a database is built once per process and shared by the
+    schema engines of all its tasks, so its rendered fragments are reused across tasks and the example
+    values are sampled once.
     """
+    _shared_mschemas: Dict[str, MSchema] = {}
+    _shared_mschemas_lock = threading.Lock()
+
     def __init__(self):
         self._config_helper = ConfigurationHelper()
 
@@ -36,9 +46,10 @@ class SchemaEngineFactory:
         custom_table_info = schema_engine_config.get("custom_table_info", {})
         view_support = schema_engine_config.get("view_support", False)
         max_string_length = schema_engine_config.get("max_string_length", 300)
+        share_mschema = schema_engine_config.get("share_mschema", False)
 
         # Instantiate SchemaEngine with configured parameters
-        return SchemaEngine(
+        schema_engine = SchemaEngine(
             engine=engine,
             # schema=schema,
             ignore_tables=ignore_tables,
@@ -48,9 +59,14 @@ class SchemaEngineFactory:
             custom_table_info=custom_table_info,
             view_support=view_support,
             max_string_length=max_string_length,
-            db_name=db_name 
+            db_name=db_name,
             # mschema is handled internally by SchemaEngine if not provided
+            mschema=self._shared_mschemas.get(db_name) if share_mschema else None
         )
+        if share_mschema:
+            with self._shared_mschemas_lock:
+                schema_engine._mschema = self._shared_mschemas.setdefault(db_name, schema_engine.mschema)
+        return schema_engine
 
 # Example Usage (optional, for testing)
 # if __name__ == "__main__":
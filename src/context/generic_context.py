@@ -1,6 +1,8 @@
 from sqlalchemy.engine import Engine
 from components.schema.schema_engine import SchemaEngine
-from typing import Optional
+from typing import Any, Dict, List, Optional, Sequence
+
+from util.instrumentation import StepMetrics
 
 class GenericContext:
     """
@@ -16,5 +18,40 @@ class GenericContext:
         """
         self.db_engine = db_engine
         self.schema_engine = schema_engine
+        # Resources used by every executed (or skipped) pipeline step, in execution order
+        self.step_metrics: List[StepMetrics] = []
+
+    def record_step_metrics(self, metrics: StepMetrics) -> None:
+        """
+        Stores the metrics of a pipeline step execution.
+        """
+        self.step_metrics.append(metrics)
+
+    def export_fields(self, fields: Sequence[str]) -> Dict[str, Any]:
+        """
+        Returns the given attributes in a JSON-compatible form that restore_fields can load back.
+        Contexts holding attributes that are not JSON-compatible override both methods.
+        """
+        return {field: getattr(self, field) for field in fields}
+
+    def restore_fields(self, state: Dict[str, Any]) -> None:
+        """
+        Sets the attributes exported by export_fields.
+        """
+        for field, value in state.items():
+            setattr(self, field, value)
+
+    @property
+    def trace_id(self) -> Optional[str]:
+        """
+        The identifier of the traced unit of work, used to sample traces. None if the context is not traced.
+        """
+        return None
+
+    def to_trace_dict(self, fields: Optional[Sequence[str]] = None, max_rows: int = 0) -> Dict[str, Any]:
+        """
+        Returns a compact snapshot of the selected fields for tracing (see util/tracing.py).
+        """
+        return {}
 
     # You can add other generic resources or methods here
\ No newline at end of file
@@ -1,5 +1,8 @@
-from typing import Optional, Any, List
+from dataclasses import asdict
+from typing import Optional, Any, Dict, List, Sequence
 from util.db.execute import SQLExecInfo # Import locally to avoid circular dependency
+from util.constants import TracingConstants
+from util.latency_budget import LatencyBudget
 
 from .generic_context import GenericContext
 from executor.task_model import Task
@@ -13,6 +16,10 @@ class PipelineContext(GenericContext):
     Context specific to the pipeline, extending GenericContext.
     Stores information relevant to the pipeline execution, including the last executed step.
     """
+    # The attributes produced by the pipeline steps, saved in snapshots to replay later steps
+    SNAPSHOT_FIELDS = ("db_schema_per_keyword", "selected_schema", "generated_sql_queries",
+                       "selected_sql_query", "selection_method", "selection_latency_seconds")
+
     def __init__(self, task: Task, db_engine=None, schema_engine=None):
         """
         Initializes the PipelineContext.
@@ -33,7 +40,11 @@ class PipelineContext(GenericContext):
         self.hint: Optional[str] = task.evidence
         self.generated_sql_queries: List[SQLExecInfo] = []
         self.selected_sql_query: Optional[SQLExecInfo] = None
+        self.selection_method: Optional[str] = None
+        self.selection_latency_seconds: Optional[float] = None
         self.evaluation_result: Optional[Any] = None
+        # Time the task may spend in the pipeline, None for no limit
+        self.latency_budget: Optional[LatencyBudget] = None
 
 
     def set_last_executed_step(self, step: Any) -> None: # Use Any for type hint
@@ -60,5 +71,112 @@ class PipelineContext(GenericContext):
             "db_schema_per_keyword": self.db_schema_per_keyword,
             "selected_schema": self.selected_schema,
             "generated_sql_queries": [gen_sql.to_dict() for gen_sql in self.generated_sql_queries],
-            "selected_sql_query": self.selected_sql_query.to_dict() if self.selected_sql_query else None
-        }
\ No newline at end of file
+            "selected_sql_query": self.selected_sql_query.to_dict() if self.selected_sql_query else None,
+            "selection_method": self.selection_method
+        }
+
+    @property
+    def db_id(self) -> str:
+        return self.task.db_id
+
+    def export_fields(self, fields: Sequence[str]) -> Dict[str, Any]:
+        """
+        Returns the given attributes in a JSON-compatible form that restore_fields can load back,
+        e.g. to store step outputs on disk. SQL execution outcomes keep all their rows.
+
+        Args:
+            fields: The attribute names.
+        """
+        state: Dict[str, Any] = {}
+        for field in fields:
+            value = getattr(self, field)
+            if field == "generated_sql_queries":
+                value = [gen_sql.to_state() for gen_sql in value or []]
+            elif field == "selected_sql_query":
+                value = value.to_state() if value is not None else None
+            state[field] = value
+        return state
+
+    def restore_fields(self, state: Dict[str, Any]) -> None:
+        """
+        Sets the attributes exported by export_fields.
+        """
+        for field, value in state.items():
+            if field == "generated_sql_queries":
+                value = [SQLExecInfo.from_state(gen_sql) for gen_sql in value or []]
+            elif field == "selected_sql_query":
+                value = SQLExecInfo.from_state(value) if value is not None else None
+            setattr(self, field, value)
+
+    @property
+    def budget_fallbacks(self) -> Optional[List[str]]:
+        """
+        The fallbacks caused by the latency budget so far, None if the task has no budget.
+        """
+        return list(self.latency_budget.fallbacks) if self.latency_budget is not None else None
+
+    def column_ranking(self) -> List[str]:
+        """
+        The retrieved "table.column", from most to least relevant: by their best rank for any
+        keyword, ties in keyword order.
+        """
+        best_rank: Dict[str, int] = {}
+        for column_contexts in (self.db_schema_per_keyword or {}).values():
+            for rank, column_info in enumerate(column_contexts):
+                column = f"{column_info.get('table_name')}.{column_info.get('column_name')}"
+                best_rank.setdefault(column, rank)
+                best_rank[column] = min(best_rank[column], rank)
+        return sorted(best_rank, key=best_rank.get)
+
+    def to_snapshot(self) -> Dict[str, Any]:
+        """
+        Returns the task and the step outputs of the context in a JSON-compatible form, see from_snapshot.
+        """
+        return {"task": asdict(self.task), **self.export_fields(self.SNAPSHOT_FIELDS)}
+
+    @classmethod
+    def from_snapshot(cls, snapshot: Dict[str, Any], db_engine=None, schema_engine=None) -> 'PipelineContext':
+        """
+        Restores a context saved with to_snapshot, e.g. to run only the steps after those that produced it.
+
+        Args:
+            snapshot: The output of to_snapshot.
+            db_engine: The database engine of the task.
+            schema_engine: The SchemaEngine of the task's database.
+        """
+        context = cls(task=Task(**snapshot["task"]), db_engine=db_engine, schema_engine=schema_engine)
+        context.restore_fields({field: snapshot[field] for field in cls.SNAPSHOT_FIELDS if field in snapshot})
+        return context
+
+    @property
+    def trace_id(self) -> Optional[str]:
+        return str(self.task.question_id)
+
+    def to_trace_dict(self, fields: Optional[Sequence[str]] = None,
+                      max_rows: int = TracingConstants.DEFAULT_MAX_ROWS) -> Dict[str, Any]:
+        """
+        Returns a compact snapshot of the selected fields. Unlike to_dict, result sets are
+        rendered with at most max_rows rows and unknown fields are ignored.
+
+        Args:
+            fields: The fields to include, defaults to TracingConstants.DEFAULT_FIELDS.
+            max_rows: The maximum number of rows rendered per SQL query.
+        """
+        snapshot: Dict[str, Any] = {}
+        for field in fields or TracingConstants.DEFAULT_FIELDS:
+            if field == "generated_sql_queries":
+                snapshot[field] = [gen_sql.to_dict(max_rows) for gen_sql in self.generated_sql_queries]
+            elif field == "selected_sql_query":
+                snapshot[field] = self.selected_sql_query.to_dict(max_rows) if self.selected_sql_query else None
+            elif field == "db_schema_per_keyword":
+                # Copied, the steps keep mutating the context while the writer thread encodes the snapshot
+                snapshot[field] = {keyword: list(schema) if isinstance(schema, (list, tuple)) else schema
+                                   for keyword, schema in self.db_schema_per_keyword.items()}
+            elif field == "selected_schema":
+                snapshot[field] = dict(self.selected_schema) if self.selected_schema else None
+            elif field == "latency_budget":
+                snapshot[field] = {"remaining_seconds": self.latency_budget.remaining(),
+                                   "fallbacks": self.budget_fallbacks} if self.latency_budget is not None else None
+            elif field in ("user_query", "hint", "selection_method", "selection_latency_seconds"):
+                snapshot[field] = getattr(self, field)
+        return snapshot
@@ -1,14 +1,17 @@
+import asyncio
 import json
 import multiprocessing
-from typing import List
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Tuple
 from sqlalchemy.engine import Engine
 from datetime import datetime
 
 from components.schema.schema_engine_factory import SchemaEngineFactory
 from context.pipeline_context import PipelineContext
 from pipeline.pipeline import Pipeline
+from pipeline.pipeline_step import PipelineStep
+from pipeline.memoized_step import MemoizedStep, StepOutputStore
 from pipeline.steps.information_retrieval.information_retrieval_step import InformationRetrievalStep
-from pipeline.steps.print_output.print_output_step import PrintOutputStep
 from pipeline.steps.schema_filter.schema_filter_step import SchemaFilterStep
 from pipeline.steps.sql_generation.sql_generation_step import SQLGenerationStep
 from pipeline.steps.query_selection.query_selection_step import QuerySelectionStep
@@ -16,9 +19,16 @@ from executor.task_model import Task
 from executor.statistics_manager import StatisticsManager
 from pipeline.steps.evaluation.evaluation_step import EvaluationStep
 from infrastructure.database.database_manager import DatabaseManager
+from common.config.config_helper import ConfigurationHelper
+from util.constants import LatencyBudgetConstants, MemoizationConstants, PipelineExecutionConstants
+from util.latency_budget import LatencyBudget
+from util.resource_limits import configure_resource_limits
+from util.tracing import configure_tracing, shutdown_tracing
 
 class RunningManager:
     RESULT_ROOT_PATH = "./results"
+    # The steps of the pipeline, in execution order
+    PIPELINE_STEP_CLASSES = (InformationRetrievalStep, SchemaFilterStep, SQLGenerationStep, QuerySelectionStep, EvaluationStep)
 
     """
     Manages the process of loading tasks and running the evaluation pipeline for each.
@@ -33,6 +43,13 @@ class RunningManager:
         self.dataset_path = dataset_path
         self.tasks: List[Task] = []
         self.statistics_manager = StatisticsManager()
+        memoization_config = ConfigurationHelper().get_config("memoization.yaml", "memoization") or {}
+        self.memoized_step_names = set(memoization_config.get("steps") or []) if memoization_config.get("enabled", False) else set()
+        self.step_output_store = StepOutputStore(memoization_config.get("path", MemoizationConstants.DEFAULT_PATH)) \
+            if self.memoized_step_names else None
+        self.latency_budget_config = (ConfigurationHelper().get_config("pipeline.yaml", "pipeline") or {}).get("latency_budget") or {}
+        # Snapshots of the finished contexts, collected when pipeline.yaml enables save_context_snapshots
+        self.context_snapshots: Optional[List[Dict[str, Any]]] = None
 
     def load_tasks(self):
         """
@@ -48,58 +65,201 @@ class RunningManager:
         except json.JSONDecodeError:
             print(f"Error: Could not decode JSON from {self.dataset_path}.")
 
-    def run_pipeline_for_task(self, task: Task):
+    def _memoize(self, step: PipelineStep) -> PipelineStep:
         """
-        Initializes and runs the SQL generation pipeline for a single task.
-        This method is designed to be run in a separate process.
+        Wraps the step in a MemoizedStep if memoization.yaml enables it for the step.
         """
-        print(f"Running pipeline for question_id: {task.question_id} on db_id: {task.db_id}")
+        if self.step_output_store is None or step.name not in self.memoized_step_names:
+            return step
+        return MemoizedStep(step, self.step_output_store)
+
+    def _prepare_task(self, task: Task, snapshot: Optional[Dict[str, Any]] = None,
+                      from_step: Optional[str] = None) -> Optional[Tuple[PipelineContext, Pipeline[PipelineContext]]]:
+        """
+        Creates the context and the pipeline of a task.
+
+        Args:
+            task: The task.
+            snapshot: A context snapshot of the task to start from, see PipelineContext.to_snapshot.
+            from_step: The name of the first step to run, the earlier steps are left out of the pipeline.
 
+        Returns:
+            The context and the pipeline, or None if the database or schema engine could not be created.
+        """
         db_manager = DatabaseManager()
         database_engine = db_manager.create_engine(task.db_id)
         
         if not database_engine:
             print(f"Failed to create database engine for db_id: {task.db_id}. Skipping task.")
-            return
+            return None
 
         schema_factory = SchemaEngineFactory()
         schema_engine = schema_factory.create_schema_engine(engine=database_engine, db_name=task.db_id)
 
         if not schema_engine:
             print(f"Failed to create SchemaEngine for db_id: {task.db_id}. Skipping task.")
-            return
+            return None
 
-        context = PipelineContext(
-            task=task,
-            db_engine=database_engine,
-            schema_engine=schema_engine
-        )
-
-        pipeline = Pipeline[PipelineContext].Builder() \
-            .add_step(InformationRetrievalStep()) \
-            .add_step(PrintOutputStep()) \
-            .add_step(SchemaFilterStep()) \
-            .add_step(PrintOutputStep()) \
-            .add_step(SQLGenerationStep()) \
-            .add_step(PrintOutputStep()) \
-            .add_step(QuerySelectionStep()) \
-            .add_step(PrintOutputStep()) \
-            .add_step(EvaluationStep()) \
-            .build()
+        if snapshot is None:
+            context = PipelineContext(
+                task=task,
+                db_engine=database_engine,
+                schema_engine=schema_engine
+            )
+        else:
+            context = PipelineContext.from_snapshot(snapshot, db_engine=database_engine, schema_engine=schema_engine)
 
-        pipeline.run(context)
-        
+        if self.latency_budget_config.get("enabled", False):
+            context.latency_budget = LatencyBudget(
+                total_seconds=float(self.latency_budget_config.get("seconds", LatencyBudgetConstants.DEFAULT_TOTAL_SECONDS)),
+                short_seconds=float(self.latency_budget_config.get("short_seconds", LatencyBudgetConstants.DEFAULT_SHORT_SECONDS)),
+                min_call_seconds=float(self.latency_budget_config.get("min_call_seconds", LatencyBudgetConstants.DEFAULT_MIN_CALL_SECONDS))
+            )
+
+        # Only the steps that run are created, their constructors may load models
+        step_classes = self.PIPELINE_STEP_CLASSES[self._step_index(from_step):] if from_step else self.PIPELINE_STEP_CLASSES
+        builder = Pipeline[PipelineContext].Builder()
+        for step_class in step_classes:
+            builder.add_step(self._memoize(step_class()))
+        pipeline = builder.build()
+
+        return context, pipeline
+
+    def _step_index(self, step_name: str) -> int:
+        step_names = [step_class.__name__ for step_class in self.PIPELINE_STEP_CLASSES]
+        if step_name not in step_names:
+            raise ValueError(f"Unknown pipeline step '{step_name}', expected one of {step_names}.")
+        return step_names.index(step_name)
+
+    def _finish_task(self, task: Task, context: PipelineContext):
         self.statistics_manager.add_result(context.evaluation_result)
+        self.statistics_manager.add_step_metrics(task.question_id, context.step_metrics)
+        if self.context_snapshots is not None:
+            self.context_snapshots.append(context.to_snapshot())
         print(f"Finished pipeline for question_id: {task.question_id}")
 
+    def run_pipeline_for_task(self, task: Task):
+        """
+        Initializes and runs the SQL generation pipeline for a single task.
+        This method is designed to be run in a separate process.
+        """
+        print(f"Running pipeline for question_id: {task.question_id} on db_id: {task.db_id}")
+
+        prepared = self._prepare_task(task)
+        if prepared is None:
+            return
+        context, pipeline = prepared
+
+        pipeline.run(context)
+        
+        self._finish_task(task, context)
+
+    async def _run_pipeline_for_task_async(self, task: Task, in_flight: asyncio.Semaphore, snapshot: Optional[Dict[str, Any]] = None,
+                                           from_step: Optional[str] = None) -> Optional[PipelineContext]:
+        async with in_flight:
+            print(f"Running pipeline for question_id: {task.question_id} on db_id: {task.db_id}")
+            # Creating the engines reflects the database schema, so it runs off the event loop as well
+            prepared = await asyncio.to_thread(self._prepare_task, task, snapshot, from_step)
+            if prepared is None:
+                return None
+            context, pipeline = prepared
+            await pipeline.run_async(context)
+            return context
+
+    async def run_tasks_async(self, tasks: List[Task], max_in_flight: int, snapshots: Optional[List[Dict[str, Any]]] = None,
+                              from_step: Optional[str] = None):
+        """
+        Runs the pipelines of the tasks concurrently, keeping at most max_in_flight task contexts in flight.
+        The steps run in worker threads; the resource limits decide which calls of different tasks overlap.
+        Results are recorded in task order, so the reports match those of the sequential mode.
+
+        Args:
+            tasks: The tasks to run.
+            max_in_flight: The maximum number of tasks whose pipeline runs at the same time.
+            snapshots: The context snapshot to start from for every task, in task order.
+            from_step: The name of the first step to run.
+        """
+        in_flight = asyncio.Semaphore(max(1, max_in_flight))
+        loop = asyncio.get_running_loop()
+        # Every task in flight may have a step and its parallel branches in a worker thread
+        executor = ThreadPoolExecutor(max_workers=max(1, max_in_flight) * 4, thread_name_prefix="pipeline-task")
+        loop.set_default_executor(executor)
+        snapshots = snapshots if snapshots is not None else [None] * len(tasks)
+        try:
+            contexts = await asyncio.gather(*(
+                self._run_pipeline_for_task_async(task, in_flight, snapshot, from_step) for task, snapshot in zip(tasks, snapshots)
+            ))
+        finally:
+            executor.shutdown(wait=True)
+
+        for task, context in zip(tasks, contexts):
+            if context is not None:
+                self._finish_task(task, context)
+
+    def _run_concurrently(self, pipeline_config: Dict[str, Any], tasks: List[Task], snapshots: Optional[List[Dict[str, Any]]] = None,
+                          from_step: Optional[str] = None):
+        max_in_flight = int(pipeline_config.get("max_in_flight", PipelineExecutionConstants.DEFAULT_MAX_IN_FLIGHT))
+        configure_resource_limits(pipeline_config.get("resource_limits"))
+        try:
+            asyncio.run(self.run_tasks_async(tasks, max_in_flight, snapshots, from_step))
+        finally:
+            configure_resource_limits(None)
+
+    def _save_reports(self, timestamp: str):
+        self.statistics_manager.save_results(f"{self.RESULT_ROOT_PATH}/evaluation_results_{timestamp}.json")
+        self.statistics_manager.save_selection_report(f"{self.RESULT_ROOT_PATH}/selection_report_{timestamp}.json")
+        self.statistics_manager.save_latency_report(f"{self.RESULT_ROOT_PATH}/step_metrics_{timestamp}.json")
+        if self.context_snapshots:
+            snapshots_path = f"{self.RESULT_ROOT_PATH}/context_snapshots_{timestamp}.jsonl"
+            with open(snapshots_path, "w", encoding="utf-8") as f:
+                for snapshot in self.context_snapshots:
+                    f.write(json.dumps(snapshot, default=str) + "\n")
+            print(f"Saved {len(self.context_snapshots)} context snapshots to {snapshots_path}")
+
+    @staticmethod
+    def load_context_snapshots(snapshots_path: str) -> List[Dict[str, Any]]:
+        """
+        Loads the context snapshots saved by a previous run, one JSON object per line.
+        """
+        with open(snapshots_path, "r", encoding="utf-8") as f:
+            return [json.loads(line) for line in f if line.strip()]
+
+    def run_replay(self, snapshots_path: str, from_step: str, max_tasks: Optional[int] = None):
+        """
+        Runs the pipeline from the given step for the tasks of saved context snapshots, e.g. only
+        QuerySelectionStep and EvaluationStep on the generated queries of a previous run.
+        The earlier steps are skipped and the tasks run concurrently, with the limits of pipeline.yaml.
+
+        Args:
+            snapshots_path: The context snapshots saved by a run with save_context_snapshots enabled.
+            from_step: The name of the first step to run, e.g. "QuerySelectionStep".
+            max_tasks: The maximum number of snapshots to replay, all if None.
+        """
+        self._step_index(from_step)
+        snapshots = self.load_context_snapshots(snapshots_path)[:max_tasks]
+        tasks = [Task(**snapshot["task"]) for snapshot in snapshots]
+        print(f"Replaying {len(tasks)} tasks from {from_step}")
+
+        pipeline_config = ConfigurationHelper().get_config("pipeline.yaml", "pipeline") or {}
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        self._run_concurrently(pipeline_config, tasks, snapshots, from_step)
+        self._save_reports(timestamp)
+
     def run_evaluation(self):
         """
-        Iterates through the loaded tasks and runs the pipeline for each in a separate process.
+        Runs the pipeline for the loaded tasks, one after the other or concurrently
+        depending on the mode set in pipeline.yaml, and saves the reports.
         """
         if not self.tasks:
             print("No tasks to run. Please load tasks first.")
             return
 
+        pipeline_config = ConfigurationHelper().get_config("pipeline.yaml", "pipeline") or {}
+        mode = pipeline_config.get("mode", PipelineExecutionConstants.DEFAULT_MODE)
+        max_tasks = int(pipeline_config.get("max_tasks", PipelineExecutionConstants.DEFAULT_MAX_TASKS))
+        if pipeline_config.get("save_context_snapshots", False):
+            self.context_snapshots = []
+
         # for task in self.tasks:
         #     result_queue = multiprocessing.Queue()
         #     process = multiprocessing.Process(
@@ -114,10 +274,19 @@ class RunningManager:
         #     result = result_queue.get()
         #     self.statistics_manager.add_result(result)
 
-        in_processing_tasks = self.tasks[:50]
-
-        for task in in_processing_tasks:
-            self.run_pipeline_for_task(task)
+        in_processing_tasks = self.tasks[:max_tasks]
 
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        self.statistics_manager.save_results(f"{self.RESULT_ROOT_PATH}/evaluation_results_{timestamp}.json")
\ No newline at end of file
+        tracing_config = ConfigurationHelper().get_config("tracing.yaml", "tracing") or {}
+        configure_tracing(tracing_config, f"{tracing_config.get('path', self.RESULT_ROOT_PATH)}/trace_{timestamp}.jsonl")
+
+        try:
+            if mode == PipelineExecutionConstants.MODE_ASYNC:
+                self._run_concurrently(pipeline_config, in_processing_tasks)
+            else:
+                for task in in_processing_tasks:
+                    self.run_pipeline_for_task(task)
+        finally:
+            shutdown_tracing()
+
+        self._save_reports(timestamp)
@@ -1,8 +1,10 @@
 import json
 from dataclasses import dataclass, field, asdict
-from typing import List, Optional
+from typing import Any, Dict, List, Optional
 
+from util.constants import QuerySelectionConstants
 from util.db.execute import SQLExecStatus
+from util.instrumentation import StepMetrics, latency_histogram
 
 
 @dataclass
@@ -16,6 +18,9 @@ class EvaluationResult:
     gold_sql: str
     comparison_status: int  # 1 for equivalent, 0 for not equivalent
     execution_status: SQLExecStatus
+    selection_method: Optional[str] = None
+    selection_latency_seconds: Optional[float] = None  # Time spent in the LLM selection call, if any
+    budget_fallbacks: Optional[List[str]] = None  # Cheaper paths and cancellations caused by the latency budget
 
 
 @dataclass
@@ -24,6 +29,7 @@ class StatisticsManager:
     Manages and aggregates evaluation results for all processed tasks.
     """
     results: List[EvaluationResult] = field(default_factory=list)
+    step_metrics: Dict[int, List[StepMetrics]] = field(default_factory=dict)
 
     def add_result(self, result: EvaluationResult):
         """
@@ -31,6 +37,85 @@ class StatisticsManager:
         """
         self.results.append(result)
 
+    def add_step_metrics(self, question_id: int, step_metrics: List[StepMetrics]):
+        """
+        Adds the per-step metrics of a task's pipeline run.
+        """
+        self.step_metrics[question_id] = list(step_metrics)
+
+    def build_latency_report(self) -> Dict[str, Any]:
+        """
+        Aggregates the per-step metrics of all tasks into latency histograms per step and per task,
+        and totals of CPU time, LLM tokens and SQL execution time per step.
+        """
+        steps: Dict[str, Dict[str, Any]] = {}
+        step_latencies: Dict[str, List[float]] = {}
+        task_latencies = []
+        for metrics_list in self.step_metrics.values():
+            task_latencies.append(sum(metrics.wall_seconds for metrics in metrics_list))
+            for metrics in metrics_list:
+                summary = steps.setdefault(metrics.step_name, {
+                    "executions": 0, "skipped": 0, "cpu_seconds": 0.0, "llm_calls": 0, "prompt_tokens": 0,
+                    "completion_tokens": 0, "sql_executions": 0, "sql_seconds": 0.0,
+                    "max_peak_rss_mb": 0.0, "max_peak_gpu_memory_mb": None, "overlapped": 0
+                })
+                if metrics.skipped:
+                    summary["skipped"] += 1
+                    continue
+                summary["executions"] += 1
+                summary["cpu_seconds"] += metrics.cpu_seconds
+                summary["llm_calls"] += metrics.llm_calls
+                summary["prompt_tokens"] += metrics.prompt_tokens
+                summary["completion_tokens"] += metrics.completion_tokens
+                summary["sql_executions"] += metrics.sql_executions
+                summary["sql_seconds"] += metrics.sql_seconds
+                summary["max_peak_rss_mb"] = max(summary["max_peak_rss_mb"], metrics.peak_rss_mb)
+                # The executions that ran next to other steps, they have no GPU peak
+                summary["overlapped"] += int(metrics.overlapped)
+                if metrics.peak_gpu_memory_mb is not None:
+                    summary["max_peak_gpu_memory_mb"] = max(summary["max_peak_gpu_memory_mb"] or 0.0, metrics.peak_gpu_memory_mb)
+                step_latencies.setdefault(metrics.step_name, []).append(metrics.wall_seconds)
+
+        for step_name, summary in steps.items():
+            summary["latency"] = latency_histogram(step_latencies.get(step_name, []))
+        return {
+            "tasks": len(self.step_metrics),
+            "task_latency": latency_histogram(task_latencies),
+            "steps": steps,
+            "per_task": {
+                str(question_id): [metrics.to_dict() for metrics in metrics_list]
+                for question_id, metrics_list in self.step_metrics.items()
+            }
+        }
+
+    def build_selection_report(self) -> Dict[str, Any]:
+        """
+        Summarizes how the final queries were selected. The latency saved is estimated from
+        the mean duration of the LLM selection calls that were actually made.
+        """
+        method_counts: Dict[str, int] = {}
+        llm_latencies = []
+        for res in self.results:
+            if res.selection_method is None:
+                continue
+            method_counts[res.selection_method] = method_counts.get(res.selection_method, 0) + 1
+            if res.selection_latency_seconds is not None:
+                llm_latencies.append(res.selection_latency_seconds)
+
+        resolved_without_model = sum(
+            count for method, count in method_counts.items()
+            if method != QuerySelectionConstants.SELECTION_METHOD_LLM
+        )
+        mean_llm_latency = sum(llm_latencies) / len(llm_latencies) if llm_latencies else None
+        return {
+            "selections": sum(method_counts.values()),
+            "resolved_without_model": resolved_without_model,
+            "llm_calls": method_counts.get(QuerySelectionConstants.SELECTION_METHOD_LLM, 0),
+            "method_counts": method_counts,
+            "mean_llm_latency_seconds": mean_llm_latency,
+            "estimated_latency_saved_seconds": resolved_without_model * mean_llm_latency if mean_llm_latency is not None else None
+        }
+
     def save_results(self, output_path: str):
         """
         Saves the aggregated results to a JSON file.
@@ -44,4 +129,26 @@ class StatisticsManager:
             results_data.append(res_dict)
 
         with open(output_path, "w") as f:
-            json.dump(results_data, f, indent=4)
\ No newline at end of file
+            json.dump(results_data, f, indent=4)
+
+    def save_latency_report(self, output_path: str):
+        """
+        Saves the per-step latency and resource report to a JSON file.
+        """
+        latency_report = self.build_latency_report()
+        for step_name, summary in latency_report["steps"].items():
+            latency = summary["latency"]
+            if latency["count"]:
+                print(f"{step_name}: {latency['count']} executions, p50 {latency['p50_seconds']:.2f}s, p95 {latency['p95_seconds']:.2f}s")
+        with open(output_path, "w") as f:
+            json.dump(latency_report, f, indent=4)
+
+    def save_selection_report(self, output_path: str):
+        """
+        Saves the query selection report to a JSON file.
+        """
+        selection_report = self.build_selection_report()
+        print(f"Query selection: {selection_report['resolved_without_model']}/{selection_report['selections']} "
+              f"resolved without the reasoning model.")
+        with open(output_path, "w") as f:
+            json.dump(selection_report, f, indent=4)
@@ -1,3 +1,6 @@
+import os
+from typing import List
+
 from sqlalchemy import create_engine, text
 from sqlalchemy.exc import OperationalError, ProgrammingError
 from components.schema.schema_engine import SchemaEngine
@@ -75,8 +78,14 @@ class DatabaseManager:
                     engine_default.dispose()
 
 
-    def create_engine(self, database_name: str):
-        """Creates the SQLAlchemy engine for the target database."""
+    def create_engine(self, database_name: str, databases_dir: str = None):
+        """
+        Creates the SQLAlchemy engine for the target database.
+
+        Args:
+            database_name (str): The database, opened at `<databases_dir>/<database_name>/<database_name>.sqlite`.
+            databases_dir (str, optional): The databases directory. Defaults to the directory of DatabaseConstants.SQLITE_PATH.
+        """
 
         # self._ensure_database_exists(database_name) # Ensure database exists before creating engine
 
@@ -95,7 +104,8 @@ class DatabaseManager:
         #     database=database_name
         # )
 
-        database_url = DatabaseConstants.SQLITE_PATH + f"/{database_name}/{database_name}.sqlite"
+        sqlite_path = f"sqlite:///{databases_dir}" if databases_dir else DatabaseConstants.SQLITE_PATH
+        database_url = sqlite_path + f"/{database_name}/{database_name}.sqlite"
         try:
             engine = create_engine(database_url)
             # Optional: Test the connection
@@ -107,6 +117,27 @@ class DatabaseManager:
             print(f"Error creating SQLAlchemy engine for database '{database_name}': {e}")
             return None
 
+    @staticmethod
+    def list_sqlite_databases(databases_dir: str = None) -> List[str]:
+        """
+        Lists the SQLite databases laid out as `<databases_dir>/<db_name>/<db_name>.sqlite`,
+        which is the layout `create_engine` expects.
+
+        Args:
+            databases_dir (str, optional): The databases directory. Defaults to the directory of DatabaseConstants.SQLITE_PATH.
+
+        Returns:
+            List[str]: The sorted database names.
+        """
+        databases_dir = databases_dir or DatabaseConstants.SQLITE_PATH[len("sqlite:///"):]
+        if not os.path.isdir(databases_dir):
+            print(f"SQLite databases directory '{databases_dir}' does not exist.")
+            return []
+        return sorted(
+            name for name in os.listdir(databases_dir)
+            if os.path.isfile(os.path.join(databases_dir, name, f"{name}.sqlite"))
+        )
+
     def close_connections(self, engine: Engine):
         """Disposes the given engine, closing all of its connections."""
         if engine:
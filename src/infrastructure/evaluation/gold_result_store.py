@@ -0,0 +1,158 @@
+"""
+This module defines the GoldResultStore, a compact on-disk store of precomputed gold query results.
+
+The store is a single NumPy structured array saved as `.npy`, sorted by question_id, so it can be
+memory-mapped and searched without loading or parsing the whole file.
+"""
+import logging
+import os
+from dataclasses import dataclass
+from typing import Iterable, Optional
+
+import numpy as np
+
+from util.constants import EvaluationConstants
+
+logger = logging.getLogger(__name__)
+
+GOLD_STATUS_OK = 0
+GOLD_STATUS_ERROR = 1
+
+GOLD_RECORD_DTYPE = np.dtype([
+    ("question_id", "<i8"),
+    ("db_id", "S64"),
+    # Raw digests are stored as uint8 vectors because "S" fields strip trailing NUL bytes
+    ("fingerprint", "u1", (EvaluationConstants.DIGEST_SIZE,)),
+    ("digest", "u1", (EvaluationConstants.DIGEST_SIZE,)),
+    ("row_count", "<i8"),
+    ("status", "u1"),
+    ("preview", f"S{EvaluationConstants.GOLD_PREVIEW_CHARS}"),
+])
+
+
+def _to_digest_vector(hex_digest: str) -> np.ndarray:
+    raw = bytes.fromhex(hex_digest) if hex_digest else b""
+    return np.frombuffer(raw.ljust(EvaluationConstants.DIGEST_SIZE, b"\x00"), dtype=np.uint8)
+
+
+@dataclass
+class GoldResult:
+    """
+    The precomputed outcome of a single gold query.
+    """
+    question_id: int
+    db_id: str
+    fingerprint: str
+    digest: str
+    row_count: int
+    status: int = GOLD_STATUS_OK
+    preview: str = ""
+
+    @property
+    def is_valid(self) -> bool:
+        return self.status == GOLD_STATUS_OK
+
+
+class GoldResultStore:
+    """
+    Read access to the precomputed gold results, keyed by question_id and database fingerprint.
+    """
+    def __init__(self, records: np.ndarray):
+        """
+        Initializes the GoldResultStore.
+
+        Args:
+            records (np.ndarray): A (possibly memory-mapped) array of GOLD_RECORD_DTYPE sorted by question_id.
+        """
+        self._records = records
+
+    def __len__(self) -> int:
+        return len(self._records)
+
+    @classmethod
+    def open(cls, path: str) -> Optional['GoldResultStore']:
+        """
+        Memory-maps a store from disk.
+
+        Args:
+            path (str): The path of the `.npy` store file.
+
+        Returns:
+            Optional[GoldResultStore]: The store, or None if the file does not exist or is not a gold store.
+        """
+        if not path or not os.path.isfile(path):
+            return None
+        try:
+            records = np.load(path, mmap_mode="r")
+        except (OSError, ValueError) as e:
+            logger.warning(f"Could not open gold result store at {path}: {e}")
+            return None
+        if records.dtype != GOLD_RECORD_DTYPE:
+            logger.warning(f"Gold result store at {path} has an unexpected layout. Rebuild it with build_gold_store.py.")
+            return None
+        logger.info(f"Opened gold result store at {path} with {len(records)} records.")
+        return cls(records)
+
+    @staticmethod
+    def write(path: str, results: Iterable[GoldResult]) -> int:
+        """
+        Writes the gold results to disk, sorted by question_id.
+
+        Args:
+            path (str): The path of the `.npy` store file.
+            results (Iterable[GoldResult]): The gold results to store.
+
+        Returns:
+            int: The number of records written.
+        """
+        results = sorted(results, key=lambda r: r.question_id)
+        records = np.zeros(len(results), dtype=GOLD_RECORD_DTYPE)
+        for i, result in enumerate(results):
+            records[i] = (
+                result.question_id,
+                result.db_id.encode("utf-8"),
+                _to_digest_vector(result.fingerprint),
+                _to_digest_vector(result.digest),
+                result.row_count,
+                result.status,
+                result.preview.encode("utf-8")[:EvaluationConstants.GOLD_PREVIEW_CHARS],
+            )
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        np.save(path, records)
+        return len(records)
+
+    def get(self, question_id: int, fingerprint: str) -> Optional[GoldResult]:
+        """
+        Looks up the gold result of a question.
+
+        Args:
+            question_id (int): The question_id of the task.
+            fingerprint (str): The fingerprint of the database the candidate is executed on.
+
+        Returns:
+            Optional[GoldResult]: The gold result, or None if the question is unknown, failed to
+            execute at build time or was computed on a different version of the database.
+        """
+        question_ids = self._records["question_id"]
+        index = int(np.searchsorted(question_ids, question_id))
+        if index >= len(question_ids) or question_ids[index] != question_id:
+            return None
+
+        record = self._records[index]
+        if record["fingerprint"].tobytes().hex() != fingerprint:
+            logger.info(f"Gold result for question_id {question_id} is stale (database fingerprint changed).")
+            return None
+
+        result = GoldResult(
+            question_id=int(record["question_id"]),
+            db_id=record["db_id"].decode("utf-8"),
+            fingerprint=fingerprint,
+            digest=record["digest"].tobytes().hex(),
+            row_count=int(record["row_count"]),
+            status=int(record["status"]),
+            preview=record["preview"].decode("utf-8", errors="ignore"),
+        )
+        return result if result.is_valid else None
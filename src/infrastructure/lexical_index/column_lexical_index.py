@@ -0,0 +1,153 @@
+"""
+This module defines the ColumnLexicalIndex, a per-database BM25 index over the columns of a schema.
+
+It complements the dense vector store: exact identifier hits such as `driverRef` or `cdscode`
+are found lexically even when their comments are vague. Each column is a document made of its
+table name, column name and comment. An index is a single JSON file `<path>/<db_id>.json`
+holding the columns; the inverted index is rebuilt in memory when the file is opened.
+"""
+import json
+import logging
+import os
+import re
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Sequence
+
+from util.constants import LexicalIndexConstants
+from util.similarity_measures.bm25 import BM25Util
+
+logger = logging.getLogger(__name__)
+
+_INDEX_FILE_SUFFIX = ".json"
+
+
+def _compact(identifier: str) -> str:
+    return re.sub(r"[^a-z0-9]", "", str(identifier).lower())
+
+
+@dataclass
+class ColumnDocument:
+    """
+    An indexed column, in the format returned by InformationRetriever.retrieve_context.
+    """
+    table_name: str
+    column_name: str
+    description: str
+
+    def to_context(self) -> Dict[str, Any]:
+        return {"column_name": self.column_name, "table_name": self.table_name, "description": self.description}
+
+
+@dataclass
+class LexicalMatch:
+    """
+    A column matching a query, with its BM25 score.
+    """
+    column: ColumnDocument
+    score: float
+    exact: bool = False
+
+
+class ColumnLexicalIndex:
+    """
+    BM25 index over the table names, column names and comments of one database.
+    """
+    def __init__(self, columns: Sequence[ColumnDocument], k1: float = LexicalIndexConstants.DEFAULT_K1,
+                 b: float = LexicalIndexConstants.DEFAULT_B, name_boost: int = LexicalIndexConstants.NAME_BOOST):
+        """
+        Initializes the ColumnLexicalIndex.
+
+        Args:
+            columns (Sequence[ColumnDocument]): The columns of the database.
+            k1 (float): The BM25 term frequency saturation parameter.
+            b (float): The BM25 length normalization parameter.
+            name_boost (int): How many times the table and column name tokens are counted.
+        """
+        self.columns = list(columns)
+        self.name_boost = name_boost
+        self._bm25 = BM25Util([self._column_tokens(column) for column in self.columns], k1=k1, b=b)
+        # Compacted column names and "table.column" names, for exact identifier hits
+        self._exact_columns: Dict[str, List[int]] = {}
+        for i, column in enumerate(self.columns):
+            self._exact_columns.setdefault(_compact(column.column_name), []).append(i)
+            self._exact_columns.setdefault(_compact(f"{column.table_name}.{column.column_name}"), []).append(i)
+
+    def __len__(self) -> int:
+        return len(self.columns)
+
+    def _column_tokens(self, column: ColumnDocument) -> List[str]:
+        name_tokens = BM25Util.tokenize(column.table_name) + BM25Util.tokenize(column.column_name)
+        description = column.description if column.description != column.column_name else ""
+        return name_tokens * self.name_boost + BM25Util.tokenize(description)
+
+    @classmethod
+    def from_documents(cls, documents: Sequence[str], metadatas: Sequence[Dict[str, Any]]) -> 'ColumnLexicalIndex':
+        """
+        Builds the index from the documents and metadatas written to the vector store.
+        """
+        return cls([
+            ColumnDocument(table_name=metadata["table_name"], column_name=metadata["column_name"], description=document)
+            for document, metadata in zip(documents, metadatas)
+        ])
+
+    @staticmethod
+    def index_file(path: str, db_id: str) -> str:
+        return os.path.join(path, f"{db_id}{_INDEX_FILE_SUFFIX}")
+
+    def save(self, path: str, db_id: str) -> None:
+        """
+        Writes the indexed columns to `<path>/<db_id>.json`, replacing the previous file atomically.
+        """
+        os.makedirs(path, exist_ok=True)
+        index_file = self.index_file(path, db_id)
+        tmp_file = f"{index_file}.tmp"
+        with open(tmp_file, "w") as f:
+            json.dump({"columns": [[c.table_name, c.column_name, c.description] for c in self.columns]}, f)
+        os.replace(tmp_file, index_file)
+
+    @classmethod
+    def open(cls, path: str, db_id: str) -> Optional['ColumnLexicalIndex']:
+        """
+        Loads the index of a database.
+
+        Returns:
+            Optional[ColumnLexicalIndex]: The index, or None if it was not built.
+        """
+        index_file = cls.index_file(path, db_id)
+        if not os.path.isfile(index_file):
+            return None
+        with open(index_file, "r") as f:
+            columns = json.load(f)["columns"]
+        return cls([ColumnDocument(table_name=t, column_name=c, description=d) for t, c, d in columns])
+
+    def search(self, query: str, k: int = 5) -> List[LexicalMatch]:
+        """
+        Finds the k columns best matching a query. Columns named exactly like the query come first.
+
+        Args:
+            query (str): The query, typically a keyword extracted from the question.
+            k (int): The maximum number of columns returned.
+
+        Returns:
+            List[LexicalMatch]: The matching columns, best first.
+        """
+        exact_rows = set(self._exact_columns.get(_compact(query), []))
+        scores = self._bm25.scores(BM25Util.tokenize(query))
+        for i in exact_rows:
+            scores.setdefault(i, 0.0)
+        ranked = sorted(scores.items(), key=lambda item: (item[0] not in exact_rows, -item[1], item[0]))[:k]
+        return [LexicalMatch(column=self.columns[i], score=score, exact=i in exact_rows) for i, score in ranked]
+
+    @staticmethod
+    def is_decisive(matches: Sequence[LexicalMatch],
+                    score_ratio: float = LexicalIndexConstants.DECISIVE_SCORE_RATIO) -> bool:
+        """
+        Tells whether the best match is clear enough to skip the dense retrieval: it is the only
+        column named exactly like the query, or it outscores the runner-up by `score_ratio`.
+        A single partial match is not decisive, it may just share a common word with the query.
+        """
+        if not matches:
+            return False
+        if matches[0].exact:
+            return len(matches) == 1 or not matches[1].exact
+        return len(matches) > 1 and matches[0].score >= score_ratio * matches[1].score
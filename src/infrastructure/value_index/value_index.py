@@ -0,0 +1,237 @@
+"""
+This module defines the ValueIndex, a per-database MinHash LSH index over the distinct values of text columns.
+
+It answers "which table.column likely contains this phrase" without scanning the tables at query time.
+An index is a directory holding memory-mappable NumPy arrays and a JSON file:
+    - signatures.npy: (N x num_perm) uint32 MinHash signatures of the N indexed values
+    - value_columns.npy: (N) int32 index of the column each value belongs to
+    - sorted_band_hashes.npy / band_order.npy: (bands x N) band hashes sorted per band and the matching value rows
+    - values.json: the columns, the values and the parameters the index was built with
+"""
+import json
+import logging
+import os
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+from sqlalchemy import inspect, text, types
+from sqlalchemy.engine import Engine
+
+from util.constants import ValueIndexConstants
+from util.db.result_digest import fingerprint_database
+from util.similarity_measures.lsh import LSHUtil
+
+logger = logging.getLogger(__name__)
+
+_SIGNATURES_FILE = "signatures.npy"
+_VALUE_COLUMNS_FILE = "value_columns.npy"
+_SORTED_BAND_HASHES_FILE = "sorted_band_hashes.npy"
+_BAND_ORDER_FILE = "band_order.npy"
+_VALUES_FILE = "values.json"
+
+
+@dataclass
+class ValueMatch:
+    """
+    A database value similar to a phrase, and the column it was found in.
+    """
+    table_name: str
+    column_name: str
+    value: str
+    similarity: float
+
+
+class ValueIndex:
+    """
+    MinHash LSH index over the values of one database.
+    """
+    def __init__(self, lsh: LSHUtil, columns: List[Tuple[str, str]], values: List[str], signatures: np.ndarray,
+                 value_columns: np.ndarray, sorted_band_hashes: np.ndarray, band_order: np.ndarray, fingerprint: str = ""):
+        """
+        Initializes the ValueIndex. Use `build` or `open` to create one.
+        """
+        self.lsh = lsh
+        self.columns = columns
+        self.values = values
+        self.signatures = signatures
+        self.value_columns = value_columns
+        self.sorted_band_hashes = sorted_band_hashes
+        self.band_order = band_order
+        self.fingerprint = fingerprint
+        # Exact matches of the normalized phrase skip the LSH lookup
+        self._exact_rows: Dict[str, List[int]] = {}
+        for row, value in enumerate(values):
+            self._exact_rows.setdefault(LSHUtil.normalize(value), []).append(row)
+
+    def __len__(self) -> int:
+        return len(self.values)
+
+    @staticmethod
+    def _text_columns(engine: Engine) -> List[Tuple[str, str]]:
+        inspector = inspect(engine)
+        columns = []
+        for table_name in inspector.get_table_names():
+            for column in inspector.get_columns(table_name):
+                # SQLite columns without a declared type have NullType and can hold text
+                if isinstance(column["type"], (types.String, types.NullType)):
+                    columns.append((table_name, column["name"]))
+        return columns
+
+    @classmethod
+    def build(cls, engine: Engine, lsh: Optional[LSHUtil] = None,
+              max_values_per_column: int = ValueIndexConstants.MAX_VALUES_PER_COLUMN,
+              max_value_length: int = ValueIndexConstants.MAX_VALUE_LENGTH) -> 'ValueIndex':
+        """
+        Builds the index from the distinct values of the text columns of a database.
+
+        Args:
+            engine (Engine): The SQLAlchemy engine connected to the database.
+            lsh (Optional[LSHUtil]): The MinHash parameters. Defaults to LSHUtil().
+            max_values_per_column (int): The maximum number of distinct values indexed per column.
+            max_value_length (int): Longer values are not indexed.
+
+        Returns:
+            ValueIndex: The built index.
+        """
+        lsh = lsh or LSHUtil()
+        columns = cls._text_columns(engine)
+        values: List[str] = []
+        value_columns: List[int] = []
+        preparer = engine.dialect.identifier_preparer
+        with engine.connect() as connection:
+            for column_index, (table_name, column_name) in enumerate(columns):
+                query = (
+                    f"SELECT DISTINCT {preparer.quote(column_name)} FROM {preparer.quote(table_name)} "
+                    f"WHERE {preparer.quote(column_name)} IS NOT NULL LIMIT {int(max_values_per_column)}"
+                )
+                try:
+                    rows = connection.execute(text(query)).fetchall()
+                except Exception as e:
+                    logger.warning(f"Could not read values of {table_name}.{column_name}: {e}")
+                    continue
+                for (value,) in rows:
+                    if isinstance(value, str) and 0 < len(value.strip()) <= max_value_length:
+                        values.append(value)
+                        value_columns.append(column_index)
+
+        signatures = lsh.signatures(values)
+        band_hashes = lsh.band_hashes(signatures) if values else np.zeros((0, lsh.bands), dtype=np.uint64)
+        band_order = np.argsort(band_hashes, axis=0, kind="stable").T.astype(np.int32)
+        sorted_band_hashes = np.take_along_axis(band_hashes, band_order.T.astype(np.int64), axis=0).T
+        logger.info(f"Built value index over {len(values)} values of {len(columns)} text columns.")
+        return cls(lsh, columns, values, signatures, np.asarray(value_columns, dtype=np.int32),
+                   np.ascontiguousarray(sorted_band_hashes), np.ascontiguousarray(band_order), fingerprint_database(engine))
+
+    def save(self, path: str) -> None:
+        """
+        Writes the index to a directory.
+        """
+        os.makedirs(path, exist_ok=True)
+        np.save(os.path.join(path, _SIGNATURES_FILE), self.signatures)
+        np.save(os.path.join(path, _VALUE_COLUMNS_FILE), self.value_columns)
+        np.save(os.path.join(path, _SORTED_BAND_HASHES_FILE), self.sorted_band_hashes)
+        np.save(os.path.join(path, _BAND_ORDER_FILE), self.band_order)
+        with open(os.path.join(path, _VALUES_FILE), "w") as f:
+            json.dump({
+                "num_perm": self.lsh.num_perm,
+                "bands": self.lsh.bands,
+                "shingle_size": self.lsh.shingle_size,
+                "fingerprint": self.fingerprint,
+                "columns": [list(column) for column in self.columns],
+                "values": self.values,
+            }, f)
+
+    @classmethod
+    def open(cls, path: str, fingerprint: Optional[str] = None) -> Optional['ValueIndex']:
+        """
+        Memory-maps an index from a directory.
+
+        Args:
+            path (str): The index directory.
+            fingerprint (Optional[str]): The current database fingerprint. If given and different from
+                                         the one the index was built on, the index is considered stale.
+
+        Returns:
+            Optional[ValueIndex]: The index, or None if it does not exist or is stale.
+        """
+        values_path = os.path.join(path, _VALUES_FILE)
+        if not os.path.isfile(values_path):
+            return None
+        with open(values_path, "r") as f:
+            metadata = json.load(f)
+        if fingerprint is not None and metadata.get("fingerprint") != fingerprint:
+            logger.warning(f"Value index at {path} is stale (database fingerprint changed). Rebuild it with build_value_index.py.")
+            return None
+
+        lsh = LSHUtil(num_perm=metadata["num_perm"], bands=metadata["bands"], shingle_size=metadata["shingle_size"])
+        return cls(
+            lsh=lsh,
+            columns=[tuple(column) for column in metadata["columns"]],
+            values=metadata["values"],
+            signatures=np.load(os.path.join(path, _SIGNATURES_FILE), mmap_mode="r"),
+            value_columns=np.load(os.path.join(path, _VALUE_COLUMNS_FILE), mmap_mode="r"),
+            sorted_band_hashes=np.load(os.path.join(path, _SORTED_BAND_HASHES_FILE), mmap_mode="r"),
+            band_order=np.load(os.path.join(path, _BAND_ORDER_FILE), mmap_mode="r"),
+            fingerprint=metadata.get("fingerprint", "")
+        )
+
+    def column_values(self) -> Dict[str, List[str]]:
+        """
+        Returns the indexed values, keyed by "table.column".
+        """
+        values_per_column: Dict[str, List[str]] = {}
+        for value, column_index in zip(self.values, self.value_columns.tolist()):
+            table_name, column_name = self.columns[column_index]
+            values_per_column.setdefault(f"{table_name}.{column_name}", []).append(value)
+        return values_per_column
+
+    def _candidate_rows(self, signature: np.ndarray) -> np.ndarray:
+        query_band_hashes = self.lsh.band_hashes(signature)[0]
+        candidates = []
+        for band, band_hash in enumerate(query_band_hashes):
+            sorted_hashes = self.sorted_band_hashes[band]
+            start = np.searchsorted(sorted_hashes, band_hash, side="left")
+            end = np.searchsorted(sorted_hashes, band_hash, side="right")
+            if end > start:
+                candidates.append(np.asarray(self.band_order[band, start:end]))
+        return np.unique(np.concatenate(candidates)) if candidates else np.zeros(0, dtype=np.int32)
+
+    def query(self, phrase: str, top_k: int = ValueIndexConstants.TOP_K,
+              min_similarity: float = ValueIndexConstants.MIN_SIMILARITY) -> List[ValueMatch]:
+        """
+        Finds the values most similar to a phrase, at most one per column.
+
+        Args:
+            phrase (str): The phrase, typically a literal value from the question.
+            top_k (int): The maximum number of columns returned.
+            min_similarity (float): The minimum estimated Jaccard similarity of the value shingles.
+
+        Returns:
+            List[ValueMatch]: The best matching value of each column, most similar first.
+        """
+        if len(self) == 0 or not phrase or not phrase.strip():
+            return []
+
+        signature = self.lsh.signature(phrase)
+        rows = self._candidate_rows(signature)
+        similarities = self.lsh.estimate_jaccard(signature, self.signatures[rows]) if len(rows) else np.zeros(0)
+
+        best_per_column: Dict[int, Tuple[float, int]] = {}
+        for row, similarity in zip(rows.tolist(), similarities.tolist()):
+            column_index = int(self.value_columns[row])
+            if similarity >= min_similarity and similarity > best_per_column.get(column_index, (-1.0, -1))[0]:
+                best_per_column[column_index] = (similarity, row)
+        for row in self._exact_rows.get(LSHUtil.normalize(phrase), []):
+            best_per_column[int(self.value_columns[row])] = (1.0, row)
+
+        ranked = sorted(best_per_column.items(), key=lambda item: item[1][0], reverse=True)[:top_k]
+        return [
+            ValueMatch(
+                table_name=self.columns[column_index][0],
+                column_name=self.columns[column_index][1],
+                value=self.values[row],
+                similarity=similarity
+            )
+            for column_index, (similarity, row) in ranked
+        ]
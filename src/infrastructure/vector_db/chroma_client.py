@@ -1,9 +1,16 @@
+import time
+import threading
 import chromadb
 from chromadb.api.types import Documents, EmbeddingFunction, Embeddings
 from typing import List, Dict, Optional
 import logging
 from chromadb.config import Settings
 
+from components.models.embedding_cache import EmbeddingCache
+from infrastructure.vector_db.vector_store import QueryTiming, VectorStore
+from util.constants import ResourceConstants
+from util.resource_limits import resource_slot
+
 # Assuming BaseEmbeddingModelFacade and SentenceTransformerEmbeddingFacade are importable
 # from ..components.models.embedding_model_facade import BaseEmbeddingModelFacade
 # Adjust the import path based on your project structure.
@@ -31,8 +38,10 @@ class FacadeEmbeddingFunction(EmbeddingFunction):
     """
     A ChromaDB-compatible embedding function that wraps our BaseEmbeddingModelFacade.
     """
-    def __init__(self, facade: BaseEmbeddingModelFacade, prompt_name: Optional[str] = None, normalize_embeddings: bool = True):
+    def __init__(self, facade: BaseEmbeddingModelFacade, prompt_name: Optional[str] = None, normalize_embeddings: bool = True,
+                 embedding_cache: Optional[EmbeddingCache] = None):
         self._facade = facade
+        self._embedding_cache = embedding_cache
         self._prompt_name = prompt_name # For models like Qwen that might use different prompts for query/doc
         self._normalize_embeddings = normalize_embeddings
         logger.info(f"FacadeEmbeddingFunction initialized with facade: {type(facade).__name__}, prompt_name: '{prompt_name}', normalize: {normalize_embeddings}")
@@ -49,6 +58,13 @@ class FacadeEmbeddingFunction(EmbeddingFunction):
         """
         if not texts:
             return []
+        if self._embedding_cache is not None:
+            return self._embedding_cache.encode(
+                self._facade,
+                list(texts),
+                prompt_name=self._prompt_name,
+                normalize_embeddings=self._normalize_embeddings
+            )
         # The facade's encode method should handle batching if necessary.
         # Pass prompt_name and normalize_embeddings to the facade's encode method.
         embeddings = self._facade.encode(
@@ -60,11 +76,12 @@ class FacadeEmbeddingFunction(EmbeddingFunction):
         return embeddings
 
 
-class ChromaClient:
+class ChromaClient(VectorStore):
     """
     A client for interacting with a ChromaDB instance, using a provided embedding model facade.
     """
-    def __init__(self, embedding_facade: BaseEmbeddingModelFacade, host: str = "localhost", port: int = 8000):
+    def __init__(self, embedding_facade: BaseEmbeddingModelFacade, host: str = "localhost", port: int = 8000,
+                 embedding_cache: Optional[EmbeddingCache] = None):
         """
         Initializes the ChromaClient.
 
@@ -73,9 +90,14 @@ class ChromaClient:
                                                          (e.g., SentenceTransformerEmbeddingFacade).
             host (str): The host of the ChromaDB server.
             port (int): The port of the ChromaDB server.
+            embedding_cache (Optional[EmbeddingCache]): A cache for the query embeddings.
         """
+        super().__init__(embedding_cache=embedding_cache)
         self.client = chromadb.HttpClient(host=host, port=port, settings=Settings(anonymized_telemetry=False))
         self.embedding_facade = embedding_facade
+        # Collection handles by name, so that a warm query is a single HTTP request
+        self._collections: Dict[str, chromadb.api.models.Collection.Collection] = {}
+        self._collections_lock = threading.Lock()
         logger.info(f"ChromaClient initialized with host='{host}', port={port}, facade='{type(embedding_facade).__name__}'")
 
     def get_or_create_collection(self, collection_name: str, prompt_name_for_embedding_fn: Optional[str] = None, normalize_embeddings_for_fn: bool = True) -> chromadb.api.models.Collection.Collection:
@@ -100,7 +122,8 @@ class ChromaClient:
         custom_embedding_function = FacadeEmbeddingFunction(
             facade=self.embedding_facade,
             prompt_name=prompt_name_for_embedding_fn,
-            normalize_embeddings=normalize_embeddings_for_fn
+            normalize_embeddings=normalize_embeddings_for_fn,
+            embedding_cache=self.embedding_cache
         )
         
         logger.info(f"Getting or creating collection '{collection_name}' with custom embedding function.")
@@ -114,9 +137,43 @@ class ChromaClient:
                     }
             }            # metadata={"hnsw:space": "cosine"} # Example: if you want to specify cosine distance
         )
-        logger.info(f"Collection '{collection.name}' (ID: {collection.id}) retrieved/created with {collection.count()} documents.")
+        with self._collections_lock:
+            self._collections[collection_name] = collection
+        logger.info(f"Collection '{collection.name}' (ID: {collection.id}) retrieved/created.")
+        return collection
+
+    def _get_collection(self, collection_name: str) -> chromadb.api.models.Collection.Collection:
+        """
+        Returns the cached handle of a collection, fetching it from the server on first use.
+        """
+        with self._collections_lock:
+            collection = self._collections.get(collection_name)
+        if collection is None:
+            collection = self.client.get_collection(name=collection_name)
+            with self._collections_lock:
+                self._collections[collection_name] = collection
         return collection
 
+    def invalidate_collection(self, collection_name: Optional[str] = None) -> None:
+        """
+        Drops cached collection handles, e.g. after a collection was deleted or recreated on the server.
+
+        Args:
+            collection_name (Optional[str]): The collection to drop, or None to drop all of them.
+        """
+        with self._collections_lock:
+            if collection_name is None:
+                self._collections.clear()
+            else:
+                self._collections.pop(collection_name, None)
+
+    def count_documents(self, collection_name: str) -> int:
+        """
+        Returns the number of documents of a collection. This is a separate request, so it is
+        only issued when a caller asks for it.
+        """
+        return self._get_collection(collection_name).count()
+
     def add_documents(self, collection_name: str, documents: List[str], metadatas: List[Dict], ids: List[str]) -> None:
         """
         Adds documents to a specified collection.
@@ -128,7 +185,7 @@ class ChromaClient:
             metadatas (List[Dict]): A list of metadata dictionaries corresponding to the documents.
             ids (List[str]): A list of unique IDs for the documents.
         """
-        collection = self.client.get_collection(name=collection_name)
+        collection = self._get_collection(collection_name)
         logger.info(f"Generating embeddings for {len(documents)} documents before adding to collection '{collection_name}'.")
         
         # Generate embeddings using the facade
@@ -147,8 +204,59 @@ class ChromaClient:
             metadatas=metadatas,
             ids=ids
         )
-        logger.info(f"Documents added. Collection '{collection_name}' now has {collection.count()} documents.")
+        logger.info(f"Added {len(documents)} documents to collection '{collection_name}'.")
+
+
+    def upsert_documents(self, collection_name: str, documents: List[str], metadatas: List[Dict], ids: List[str]) -> None:
+        """
+        Adds documents to a specified collection, replacing the documents that already exist with the same ids.
+
+        Args:
+            collection_name (str): The name of the collection.
+            documents (List[str]): A list of documents (texts) to upsert.
+            metadatas (List[Dict]): A list of metadata dictionaries corresponding to the documents.
+            ids (List[str]): A list of unique IDs for the documents.
+        """
+        collection = self._get_collection(collection_name)
+        logger.info(f"Generating embeddings for {len(documents)} documents before upserting into collection '{collection_name}'.")
+        embeddings = self.embedding_facade.encode(
+            documents,
+            prompt_name="document",
+            normalize_embeddings=True
+        )
+        collection.upsert(
+            embeddings=embeddings,
+            documents=documents,
+            metadatas=metadatas,
+            ids=ids
+        )
+        logger.info(f"Upserted {len(documents)} documents into collection '{collection_name}'.")
+
+    def delete_documents(self, collection_name: str, ids: List[str]) -> None:
+        """
+        Deletes documents from a specified collection.
+
+        Args:
+            collection_name (str): The name of the collection.
+            ids (List[str]): The IDs of the documents to delete.
+        """
+        if not ids:
+            return
+        self._get_collection(collection_name).delete(ids=ids)
+        logger.info(f"Deleted {len(ids)} documents from collection '{collection_name}'.")
+
+    def get_document_metadatas(self, collection_name: str) -> Dict[str, Dict]:
+        """
+        Returns the metadata of every document of a collection, without documents or embeddings.
+
+        Args:
+            collection_name (str): The name of the collection.
 
+        Returns:
+            Dict[str, Dict]: The metadata of each document, keyed by document id.
+        """
+        existing = self._get_collection(collection_name).get(include=["metadatas"])
+        return {doc_id: metadata or {} for doc_id, metadata in zip(existing["ids"], existing["metadatas"])}
 
     def query_collection(self, collection_name: str, query_texts: List[str], n_results: int = 5, query_prompt_name: Optional[str] = "query", **kwargs) -> Dict:
         """
@@ -166,20 +274,33 @@ class ChromaClient:
         Returns:
             Dict: A dictionary containing the query results.
         """
-        collection = self.client.get_collection(name=collection_name)
-        
+        collection = self._get_collection(collection_name)
+
         # For querying, ChromaDB expects query_embeddings. We generate these using our facade,
         # potentially with a specific "query" prompt if applicable.
-        query_embeddings = self.embedding_facade.encode(
-            query_texts, 
+        start = time.perf_counter()
+        query_embeddings = self._encode_queries(
+            query_texts,
+            prompt_name=query_prompt_name,
             normalize_embeddings=True # Typically, queries are normalized for cosine similarity
         )
-        
+        embedded = time.perf_counter()
+
         logger.info(f"Querying collection '{collection_name}' with {len(query_texts)} texts, n_results={n_results}, query_prompt_name='{query_prompt_name}'.")
-        results = collection.query(
-            query_embeddings=query_embeddings, # Pass the generated embeddings
-            n_results=n_results,
-            include=['metadatas', 'documents', 'distances'] # Ensure we get these back
-        )
-        logger.info(f"Query results: {results}")
-        return results
\ No newline at end of file
+        try:
+            with resource_slot(ResourceConstants.VECTOR_STORE):
+                results = collection.query(
+                    query_embeddings=query_embeddings, # Pass the generated embeddings
+                    n_results=n_results,
+                    include=['metadatas', 'documents', 'distances'] # Ensure we get these back
+                )
+        except Exception:
+            # The cached handle may point to a collection that was deleted or recreated
+            self.invalidate_collection(collection_name)
+            raise
+
+        timing = QueryTiming(embedding_seconds=embedded - start, search_seconds=time.perf_counter() - embedded)
+        self._record_query_timing(timing)
+        logger.info(f"Query on '{collection_name}' took {timing.embedding_seconds * 1000:.1f} ms embedding + {timing.search_seconds * 1000:.1f} ms search.")
+        logger.debug("Query results: %s", results)
+        return results
@@ -0,0 +1,307 @@
+"""
+In-process vector store that keeps the embeddings of each collection as a memory-mapped float matrix.
+
+Every collection is a directory holding:
+    - embeddings.npy: a float32 (N x D) matrix of L2-normalized document embeddings
+    - records.json: the ids, documents and metadatas of the N rows, in the same order
+
+Queries run an exact cosine top-k with NumPy, or use an HNSW index when `hnswlib` is installed
+and the store is configured with `index: "hnsw"`. No server is needed.
+"""
+import json
+import logging
+import os
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, Any, Dict, List, Optional
+
+import numpy as np
+
+from infrastructure.vector_db.vector_store import QueryTiming, VectorStore
+from util.constants import ResourceConstants, VectorStoreConstants
+from util.resource_limits import resource_slot
+
+try:
+    import hnswlib
+except ImportError:
+    hnswlib = None
+
+if TYPE_CHECKING:
+    from components.models.embedding_cache import EmbeddingCache
+    from components.models.embedding_model_facade import BaseEmbeddingModelFacade
+
+logger = logging.getLogger(__name__)
+
+_EMBEDDINGS_FILE = "embeddings.npy"
+_RECORDS_FILE = "records.json"
+
+
+def _normalize_rows(matrix: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+
+@dataclass
+class _LocalCollection:
+    """
+    The loaded state of a collection: the memory-mapped matrix, its records and an optional HNSW index.
+    """
+    embeddings: np.ndarray
+    ids: List[str] = field(default_factory=list)
+    documents: List[str] = field(default_factory=list)
+    metadatas: List[Dict[str, Any]] = field(default_factory=list)
+    hnsw_index: Optional[Any] = None
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+
+class LocalVectorStore(VectorStore):
+    """
+    A vector store kept on the local file system and searched in-process.
+    """
+    def __init__(self, embedding_facade: 'BaseEmbeddingModelFacade', path: str = VectorStoreConstants.DEFAULT_LOCAL_STORE_PATH,
+                 index: str = VectorStoreConstants.INDEX_EXACT, hnsw_m: int = VectorStoreConstants.DEFAULT_HNSW_M,
+                 hnsw_ef_construction: int = VectorStoreConstants.DEFAULT_HNSW_EF_CONSTRUCTION,
+                 hnsw_ef_search: int = VectorStoreConstants.DEFAULT_HNSW_EF_SEARCH,
+                 embedding_cache: Optional['EmbeddingCache'] = None):
+        """
+        Initializes the LocalVectorStore.
+
+        Args:
+            embedding_facade (BaseEmbeddingModelFacade): The facade used to embed documents and queries.
+            path (str): The root directory of the collections.
+            index (str): "exact" for a brute-force cosine top-k, or "hnsw" for an approximate HNSW index.
+                         Falls back to "exact" if hnswlib is not installed.
+            hnsw_m (int): The number of HNSW graph neighbours per node.
+            hnsw_ef_construction (int): The HNSW candidate list size at build time.
+            hnsw_ef_search (int): The HNSW candidate list size at query time.
+            embedding_cache (Optional[EmbeddingCache]): A cache for the query embeddings.
+        """
+        if index == VectorStoreConstants.INDEX_HNSW and hnswlib is None:
+            logger.warning("hnswlib is not installed, the local vector store falls back to exact search.")
+            index = VectorStoreConstants.INDEX_EXACT
+
+        super().__init__(embedding_cache=embedding_cache)
+        self.embedding_facade = embedding_facade
+        self.path = path
+        self.index = index
+        self.hnsw_m = hnsw_m
+        self.hnsw_ef_construction = hnsw_ef_construction
+        self.hnsw_ef_search = hnsw_ef_search
+        self._collections: Dict[str, _LocalCollection] = {}
+        self._lock = threading.Lock()
+        logger.info(f"LocalVectorStore initialized at '{path}' with {index} search, facade='{type(embedding_facade).__name__}'")
+
+    def _collection_dir(self, collection_name: str) -> str:
+        return os.path.join(self.path, collection_name)
+
+    def _load_collection(self, collection_name: str) -> _LocalCollection:
+        """
+        Returns the loaded collection, memory-mapping it from disk on first access.
+        """
+        with self._lock:
+            if collection_name in self._collections:
+                return self._collections[collection_name]
+
+        collection_dir = self._collection_dir(collection_name)
+        embeddings_path = os.path.join(collection_dir, _EMBEDDINGS_FILE)
+        if not os.path.isfile(embeddings_path):
+            raise ValueError(f"Collection '{collection_name}' does not exist in the local vector store at '{self.path}'.")
+
+        with open(os.path.join(collection_dir, _RECORDS_FILE), "r") as f:
+            records = json.load(f)
+        collection = _LocalCollection(
+            embeddings=np.load(embeddings_path, mmap_mode="r"),
+            ids=records["ids"],
+            documents=records["documents"],
+            metadatas=records["metadatas"]
+        )
+        if self.index == VectorStoreConstants.INDEX_HNSW and len(collection) > 0:
+            collection.hnsw_index = self._build_hnsw_index(collection.embeddings)
+
+        with self._lock:
+            self._collections[collection_name] = collection
+        return collection
+
+    def _build_hnsw_index(self, embeddings: np.ndarray) -> Any:
+        hnsw_index = hnswlib.Index(space="cosine", dim=embeddings.shape[1])
+        hnsw_index.init_index(max_elements=embeddings.shape[0], M=self.hnsw_m, ef_construction=self.hnsw_ef_construction)
+        hnsw_index.add_items(np.asarray(embeddings), np.arange(embeddings.shape[0]))
+        hnsw_index.set_ef(self.hnsw_ef_search)
+        return hnsw_index
+
+    def _write_collection(self, collection_name: str, embeddings: np.ndarray, ids: List[str],
+                          documents: List[str], metadatas: List[Dict[str, Any]]) -> None:
+        """
+        Writes a collection to disk. Files are written next to the old ones and swapped in,
+        so a reader never maps a partially written matrix.
+        """
+        collection_dir = self._collection_dir(collection_name)
+        os.makedirs(collection_dir, exist_ok=True)
+
+        embeddings_path = os.path.join(collection_dir, _EMBEDDINGS_FILE)
+        records_path = os.path.join(collection_dir, _RECORDS_FILE)
+        with open(f"{embeddings_path}.tmp", "wb") as f:
+            np.save(f, np.ascontiguousarray(embeddings, dtype=np.float32))
+        with open(f"{records_path}.tmp", "w") as f:
+            json.dump({"ids": ids, "documents": documents, "metadatas": metadatas}, f)
+        os.replace(f"{embeddings_path}.tmp", embeddings_path)
+        os.replace(f"{records_path}.tmp", records_path)
+
+        with self._lock:
+            self._collections.pop(collection_name, None)
+
+    def get_or_create_collection(self, collection_name: str, **kwargs) -> None:
+        """
+        Creates an empty collection if it doesn't exist.
+
+        Args:
+            collection_name (str): The name of the collection.
+        """
+        if not os.path.isfile(os.path.join(self._collection_dir(collection_name), _EMBEDDINGS_FILE)):
+            self._write_collection(collection_name, np.zeros((0, 0), dtype=np.float32), [], [], [])
+            logger.info(f"Created local collection '{collection_name}'.")
+        else:
+            logger.info(f"Local collection '{collection_name}' retrieved.")
+
+    def add_documents(self, collection_name: str, documents: List[str], metadatas: List[Dict], ids: List[str]) -> None:
+        """
+        Embeds documents and adds them to a collection. Documents whose id already exists are replaced.
+
+        Args:
+            collection_name (str): The name of the collection.
+            documents (List[str]): A list of documents (texts) to add.
+            metadatas (List[Dict]): A list of metadata dictionaries corresponding to the documents.
+            ids (List[str]): A list of unique IDs for the documents.
+        """
+        self.upsert_documents(collection_name, documents, metadatas, ids)
+
+    def upsert_documents(self, collection_name: str, documents: List[str], metadatas: List[Dict], ids: List[str]) -> None:
+        """
+        Embeds documents and inserts them into a collection, replacing the documents with the same ids.
+
+        Args:
+            collection_name (str): The name of the collection.
+            documents (List[str]): A list of documents (texts) to upsert.
+            metadatas (List[Dict]): A list of metadata dictionaries corresponding to the documents.
+            ids (List[str]): A list of unique IDs for the documents.
+        """
+        collection = self._load_collection(collection_name)
+        logger.info(f"Generating embeddings for {len(documents)} documents before adding to collection '{collection_name}'.")
+        new_embeddings = _normalize_rows(np.asarray(self.embedding_facade.encode(
+            documents,
+            prompt_name="document",
+            normalize_embeddings=True
+        ), dtype=np.float32))
+
+        replaced_ids = set(ids)
+        kept_rows = [i for i, doc_id in enumerate(collection.ids) if doc_id not in replaced_ids]
+        if len(collection) > 0:
+            embeddings = np.vstack([collection.embeddings[kept_rows], new_embeddings])
+        else:
+            embeddings = new_embeddings
+
+        self._write_collection(
+            collection_name,
+            embeddings,
+            [collection.ids[i] for i in kept_rows] + list(ids),
+            [collection.documents[i] for i in kept_rows] + list(documents),
+            [collection.metadatas[i] for i in kept_rows] + list(metadatas)
+        )
+        logger.info(f"Documents added. Collection '{collection_name}' now has {embeddings.shape[0]} documents.")
+
+    def delete_documents(self, collection_name: str, ids: List[str]) -> None:
+        """
+        Deletes documents from a collection.
+
+        Args:
+            collection_name (str): The name of the collection.
+            ids (List[str]): The IDs of the documents to delete.
+        """
+        if not ids:
+            return
+        collection = self._load_collection(collection_name)
+        deleted_ids = set(ids)
+        kept_rows = [i for i, doc_id in enumerate(collection.ids) if doc_id not in deleted_ids]
+        self._write_collection(
+            collection_name,
+            collection.embeddings[kept_rows] if kept_rows else np.zeros((0, 0), dtype=np.float32),
+            [collection.ids[i] for i in kept_rows],
+            [collection.documents[i] for i in kept_rows],
+            [collection.metadatas[i] for i in kept_rows]
+        )
+        logger.info(f"Deleted {len(collection) - len(kept_rows)} documents from collection '{collection_name}'.")
+
+    def get_document_metadatas(self, collection_name: str) -> Dict[str, Dict]:
+        """
+        Returns the metadata of every document of a collection, keyed by document id.
+        """
+        collection = self._load_collection(collection_name)
+        return dict(zip(collection.ids, collection.metadatas))
+
+    def query_collection(self, collection_name: str, query_texts: List[str], n_results: int = 5,
+                         query_prompt_name: Optional[str] = "query", **kwargs) -> Dict:
+        """
+        Queries a collection.
+
+        Args:
+            collection_name (str): The name of the collection.
+            query_texts (List[str]): A list of query texts.
+            n_results (int): The number of results to return for each query.
+            query_prompt_name (Optional[str]): The prompt_name used to encode the query texts.
+            **kwargs: Additional arguments for the query (unused).
+
+        Returns:
+            Dict: The query results in the ChromaDB layout.
+        """
+        collection = self._load_collection(collection_name)
+        start = time.perf_counter()
+        query_embeddings = _normalize_rows(np.asarray(self._encode_queries(
+            query_texts,
+            prompt_name=query_prompt_name,
+            normalize_embeddings=True
+        ), dtype=np.float32))
+        embedded = time.perf_counter()
+        with resource_slot(ResourceConstants.VECTOR_STORE):
+            results = self._search(collection, query_embeddings, n_results)
+        self._record_query_timing(QueryTiming(embedding_seconds=embedded - start, search_seconds=time.perf_counter() - embedded))
+        return results
+
+    @staticmethod
+    def _top_k(similarities: np.ndarray, k: int) -> np.ndarray:
+        """
+        Returns the column indices of the k largest similarities of each row, best first.
+        """
+        if k >= similarities.shape[1]:
+            return np.argsort(-similarities, axis=1)
+        candidates = np.argpartition(-similarities, k - 1, axis=1)[:, :k]
+        order = np.argsort(-np.take_along_axis(similarities, candidates, axis=1), axis=1)
+        return np.take_along_axis(candidates, order, axis=1)
+
+    def _search(self, collection: _LocalCollection, query_embeddings: np.ndarray, n_results: int) -> Dict:
+        """
+        Searches a loaded collection with already normalized query embeddings.
+        """
+        results: Dict[str, List[List[Any]]] = {"ids": [], "documents": [], "metadatas": [], "distances": []}
+        k = min(n_results, len(collection))
+        if k == 0:
+            for key in results:
+                results[key] = [[] for _ in range(len(query_embeddings))]
+            return results
+
+        if collection.hnsw_index is not None:
+            rows, distances = collection.hnsw_index.knn_query(query_embeddings, k=k)
+        else:
+            similarities = query_embeddings @ collection.embeddings.T
+            rows = self._top_k(similarities, k)
+            distances = 1.0 - np.take_along_axis(similarities, rows, axis=1)
+
+        for query_rows, query_distances in zip(rows, distances):
+            results["ids"].append([collection.ids[row] for row in query_rows])
+            results["documents"].append([collection.documents[row] for row in query_rows])
+            results["metadatas"].append([collection.metadatas[row] for row in query_rows])
+            results["distances"].append([float(distance) for distance in query_distances])
+        return results
@@ -0,0 +1,109 @@
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Dict, List, Optional
+
+if TYPE_CHECKING:
+    from components.models.embedding_cache import EmbeddingCache
+
+
+@dataclass
+class QueryTiming:
+    """
+    Latency of a single collection query, split into query embedding and vector search.
+    """
+    embedding_seconds: float = 0.0
+    search_seconds: float = 0.0
+
+    @property
+    def total_seconds(self) -> float:
+        return self.embedding_seconds + self.search_seconds
+
+
+@dataclass
+class QueryTimingStats:
+    """
+    Accumulated query latencies of a vector store.
+    """
+    calls: int = 0
+    embedding_seconds: float = 0.0
+    search_seconds: float = 0.0
+
+    def add(self, timing: QueryTiming) -> None:
+        self.calls += 1
+        self.embedding_seconds += timing.embedding_seconds
+        self.search_seconds += timing.search_seconds
+
+    def to_dict(self) -> Dict[str, float]:
+        return {
+            "calls": self.calls,
+            "embedding_seconds": self.embedding_seconds,
+            "search_seconds": self.search_seconds,
+            "mean_embedding_seconds": self.embedding_seconds / self.calls if self.calls else 0.0,
+            "mean_search_seconds": self.search_seconds / self.calls if self.calls else 0.0,
+        }
+
+
+class VectorStore(ABC):
+    """
+    Abstract base class for the vector stores holding the column embeddings.
+
+    Query results follow the ChromaDB layout: a dictionary with the keys 'ids', 'documents',
+    'metadatas' and 'distances', each holding one list per query text. Distances are cosine distances.
+    """
+    def __init__(self, embedding_cache: Optional['EmbeddingCache'] = None):
+        self.embedding_cache = embedding_cache
+        self.last_query_timing: Optional[QueryTiming] = None
+        self.timing_stats = QueryTimingStats()
+
+    def _encode_queries(self, query_texts: List[str], prompt_name: Optional[str], normalize_embeddings: bool) -> List[List[float]]:
+        """
+        Embeds query texts through the embedding cache, if one is configured.
+        """
+        if self.embedding_cache is not None:
+            return self.embedding_cache.encode(self.embedding_facade, query_texts, prompt_name=prompt_name,
+                                               normalize_embeddings=normalize_embeddings)
+        return self.embedding_facade.encode(query_texts, prompt_name=prompt_name, normalize_embeddings=normalize_embeddings)
+
+    def get_statistics(self) -> Dict[str, Dict[str, float]]:
+        """
+        Returns the accumulated query latencies and, if a cache is configured, the embedding cache hit rates.
+        """
+        statistics = {"query_timing": self.timing_stats.to_dict()}
+        if self.embedding_cache is not None:
+            statistics["embedding_cache"] = self.embedding_cache.stats.to_dict()
+        return statistics
+
+    def _record_query_timing(self, timing: QueryTiming) -> None:
+        self.last_query_timing = timing
+        self.timing_stats.add(timing)
+
+    @abstractmethod
+    def get_or_create_collection(self, collection_name: str) -> None:
+        """Gets an existing collection or creates it if it doesn't exist."""
+        pass
+
+    @abstractmethod
+    def add_documents(self, collection_name: str, documents: List[str], metadatas: List[Dict], ids: List[str]) -> None:
+        """Embeds the documents and adds them to a collection."""
+        pass
+
+    @abstractmethod
+    def upsert_documents(self, collection_name: str, documents: List[str], metadatas: List[Dict], ids: List[str]) -> None:
+        """Embeds the documents and inserts them, replacing the documents with the same ids."""
+        pass
+
+    @abstractmethod
+    def delete_documents(self, collection_name: str, ids: List[str]) -> None:
+        """Deletes documents from a collection by id."""
+        pass
+
+    @abstractmethod
+    def get_document_metadatas(self, collection_name: str) -> Dict[str, Dict]:
+        """Returns the metadata of every document of a collection, keyed by document id."""
+        pass
+
+    @abstractmethod
+    def query_collection(self, collection_name: str, query_texts: List[str], n_results: int = 5,
+                         query_prompt_name: Optional[str] = "query", **kwargs) -> Dict:
+        """Returns the n_results nearest documents of a collection for each query text."""
+        pass
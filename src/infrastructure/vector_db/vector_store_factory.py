@@ -0,0 +1,73 @@
+from typing import Optional
+
+from components.models.embedding_cache import EmbeddingCache
+from components.models.embedding_model_facade import BaseEmbeddingModelFacade
+from common.config.config_helper import ConfigurationHelper
+from infrastructure.vector_db.vector_store import VectorStore
+from util.constants import EmbeddingCacheConstants, PreprocessingConstants, VectorStoreConstants
+
+
+class VectorStoreFactory:
+    """
+    Factory for creating the vector store backend configured in chroma_db.yaml.
+    """
+    def __init__(self):
+        self._config_helper = ConfigurationHelper()
+
+    def create_vector_store(self, embedding_facade: BaseEmbeddingModelFacade, config_file: str = "chroma_db.yaml",
+                            config_path: str = "chroma_db", backend: Optional[str] = None) -> VectorStore:
+        """
+        Creates the vector store selected by the 'backend' key of the configuration:
+        "chroma" for a ChromaDB server over HTTP, or "local" for the in-process LocalVectorStore.
+
+        Args:
+            embedding_facade (BaseEmbeddingModelFacade): The facade used to embed documents and queries.
+            config_file (str): The name of the configuration file.
+            config_path (str): The dot-separated path to the vector store section within the file.
+            backend (Optional[str]): Overrides the configured backend, e.g. to compare backends in a benchmark.
+
+        Returns:
+            VectorStore: The configured vector store.
+        """
+        config = self._config_helper.get_config(config_file, config_path) or {}
+        backend = backend or config.get("backend", VectorStoreConstants.DEFAULT_BACKEND)
+        embedding_cache = self._create_embedding_cache(config.get("embedding_cache"))
+
+        if backend == VectorStoreConstants.BACKEND_LOCAL:
+            # Imported here so the local backend does not require chromadb to be installed
+            from infrastructure.vector_db.local_vector_store import LocalVectorStore
+
+            local_config = config.get("local") or {}
+            return LocalVectorStore(
+                embedding_facade=embedding_facade,
+                path=local_config.get("path", VectorStoreConstants.DEFAULT_LOCAL_STORE_PATH),
+                index=local_config.get("index", VectorStoreConstants.INDEX_EXACT),
+                hnsw_m=int(local_config.get("hnsw_m", VectorStoreConstants.DEFAULT_HNSW_M)),
+                hnsw_ef_construction=int(local_config.get("hnsw_ef_construction", VectorStoreConstants.DEFAULT_HNSW_EF_CONSTRUCTION)),
+                hnsw_ef_search=int(local_config.get("hnsw_ef_search", VectorStoreConstants.DEFAULT_HNSW_EF_SEARCH)),
+                embedding_cache=embedding_cache
+            )
+
+        if backend != VectorStoreConstants.BACKEND_CHROMA:
+            raise ValueError(f"Unknown vector store backend '{backend}'. Expected '{VectorStoreConstants.BACKEND_CHROMA}' or '{VectorStoreConstants.BACKEND_LOCAL}'.")
+
+        from infrastructure.vector_db.chroma_client import ChromaClient
+
+        return ChromaClient(
+            host=config.get("host", PreprocessingConstants.DEFAULT_CHROMA_HOST),
+            port=int(config.get("port", PreprocessingConstants.DEFAULT_CHROMA_PORT)),
+            embedding_facade=embedding_facade,
+            embedding_cache=embedding_cache
+        )
+
+    @staticmethod
+    def _create_embedding_cache(cache_config: Optional[dict]) -> Optional[EmbeddingCache]:
+        """
+        Creates the query embedding cache from the 'embedding_cache' section, or None if it is disabled.
+        """
+        if not cache_config or not cache_config.get("enabled", False):
+            return None
+        return EmbeddingCache(
+            max_entries=int(cache_config.get("max_entries", EmbeddingCacheConstants.DEFAULT_MAX_ENTRIES)),
+            disk_path=cache_config.get("disk_path")
+        )
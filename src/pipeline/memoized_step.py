@@ -0,0 +1,125 @@
+import hashlib
+import importlib.util
+import json
+import os
+import tempfile
+from typing import Any, Dict, Optional, TypeVar
+
+from context.generic_context import GenericContext
+from pipeline.pipeline_step import PipelineStep
+
+# Define a type variable for the generic pipeline context
+C = TypeVar('C', bound=GenericContext)
+
+
+class StepOutputStore:
+    """
+    Stores the output attributes of memoized steps as JSON files, one per memo key:
+    <path>/<step name>/<key[:2]>/<key>.json. Writes are atomic, so concurrent tasks and
+    pipeline variants can share the store.
+    """
+    def __init__(self, path: str):
+        self.path = path
+
+    def _file(self, step_name: str, key: str) -> str:
+        return os.path.join(self.path, step_name, key[:2], f"{key}.json")
+
+    def load(self, step_name: str, key: str) -> Optional[Dict[str, Any]]:
+        """
+        Returns the stored output attributes, or None if there are none or they cannot be read.
+        """
+        try:
+            with open(self._file(step_name, key), "r", encoding="utf-8") as f:
+                return json.load(f)["outputs"]
+        except (OSError, ValueError, KeyError):
+            return None
+
+    def save(self, step_name: str, key: str, outputs: Dict[str, Any], inputs: Dict[str, Any]) -> None:
+        """
+        Stores the output attributes. The inputs are stored alongside, to inspect what an entry was computed from.
+        """
+        file_path = self._file(step_name, key)
+        os.makedirs(os.path.dirname(file_path), exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(file_path), suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump({"step": step_name, "inputs": inputs, "outputs": outputs}, f, default=str)
+            os.replace(tmp_path, file_path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+
+
+class MemoizedStep(PipelineStep[C, Any]):
+    """
+    Wraps a step that declares its context inputs and outputs (memo_input_fields, memo_output_fields).
+    The step runs only when no outputs are stored for its memo key; otherwise the stored outputs are
+    restored into the context. The key is a hash of the input attributes, memo_version and the contents
+    of the step's prompt modules and configuration files, so e.g. SQL generation prompt variants
+    share the stored retrieval and schema filter outputs.
+
+    Outputs where every attribute is empty are not stored, so failed executions are retried. Neither are
+    outputs of executions degraded by the latency budget of the task.
+    """
+    def __init__(self, step: PipelineStep[C, Any], store: StepOutputStore, config_dir: str = "config"):
+        """
+        Args:
+            step: The step to memoize.
+            store: The store of the step outputs.
+            config_dir: The directory of the configuration files listed in memo_config_files.
+        """
+        if not step.memo_input_fields or not step.memo_output_fields:
+            raise ValueError(f"{step.name} does not declare its memo input and output fields.")
+        self.step = step
+        self.store = store
+        self.name = step.name
+        self.runs_without_budget = step.runs_without_budget
+        self.hits = 0
+        self.misses = 0
+        self._dependencies_fingerprint = self._fingerprint_dependencies(config_dir)
+
+    def _fingerprint_dependencies(self, config_dir: str) -> str:
+        digest = hashlib.sha256(self.step.memo_version.encode("utf-8"))
+        paths = [importlib.util.find_spec(module).origin for module in self.step.memo_prompt_modules]
+        paths += [os.path.join(config_dir, config_file) for config_file in self.step.memo_config_files]
+        for path in paths:
+            # File names rather than paths, so that checkouts in different directories share the store
+            digest.update(os.path.basename(path or "").encode("utf-8"))
+            if path and os.path.exists(path):
+                with open(path, "rb") as f:
+                    digest.update(f.read())
+        return digest.hexdigest()
+
+    def memo_key(self, inputs: Dict[str, Any]) -> str:
+        """
+        Returns the memo key of the given input attributes.
+        """
+        encoded_inputs = json.dumps(inputs, sort_keys=True, default=str)
+        return hashlib.sha256(f"{self._dependencies_fingerprint}:{encoded_inputs}".encode("utf-8")).hexdigest()
+
+    def should_execute(self, context: C) -> bool:
+        return self.step.should_execute(context)
+
+    def handle_execution(self, context: C, previous_step_output: Optional[Any] = None) -> Optional[Any]:
+        inputs = context.export_fields(self.step.memo_input_fields)
+        key = self.memo_key(inputs)
+
+        outputs = self.store.load(self.name, key)
+        if outputs is not None:
+            self.hits += 1
+            print(f"Restored the outputs of {self.name} from the memo store.")
+            context.restore_fields(outputs)
+            return self.step.memo_output(context)
+
+        self.misses += 1
+        budget = getattr(context, "latency_budget", None)
+        fallbacks_before = len(budget.fallbacks) if budget is not None else 0
+        self.step.before(context)
+        output = self.step.handle_execution(context, previous_step_output)
+        self.step.after(context, output)
+
+        degraded = budget is not None and (len(budget.fallbacks) > fallbacks_before or budget.is_exhausted())
+        outputs = context.export_fields(self.step.memo_output_fields)
+        if any(outputs.values()) and not degraded:
+            self.store.save(self.name, key, outputs, inputs)
+        return output
@@ -0,0 +1,103 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Generic, List, Optional, Sequence, TypeVar
+
+from context.generic_context import GenericContext
+from pipeline.pipeline_step import PipelineStep
+from pipeline.pipeline_step_output import PipelineStepOutput
+
+# Define a type variable for the generic pipeline context
+C = TypeVar('C', bound=GenericContext)
+
+
+class ParallelBranchOutputs(PipelineStepOutput):
+    """
+    The outputs of the branches of a ParallelStage, keyed by branch name,
+    handed to the join step of the stage.
+    """
+    def __init__(self, outputs: Dict[str, Optional[Any]]):
+        self.outputs = outputs
+
+    def get(self, branch_name: str) -> Optional[Any]:
+        return self.outputs.get(branch_name)
+
+
+class JoinStep(PipelineStep[C, Any]):
+    """
+    The step closing a ParallelStage. It runs once every branch finished and receives their
+    outputs as a ParallelBranchOutputs. Subclasses merge them into the output passed to the
+    step following the stage; by default the ParallelBranchOutputs is passed on as is.
+    """
+    def handle_execution(self, context: C, previous_step_output: ParallelBranchOutputs) -> Optional[Any]:
+        return previous_step_output
+
+
+class ParallelStage(Generic[C]):
+    """
+    A fork/join node of the pipeline graph: independent branches that run concurrently,
+    followed by an explicit join step.
+
+    Every branch is a chain of steps receiving the output of the step before the stage.
+    Within a branch, steps run in order with the usual should_execute and output passing
+    semantics. All branches share the pipeline context, so they must write to different
+    context attributes.
+    """
+    def __init__(self, branches: Dict[str, Sequence[PipelineStep[C, Any]]], join_step: JoinStep[C],
+                 max_workers: Optional[int] = None):
+        """
+        Initializes the ParallelStage.
+
+        Args:
+            branches: The steps of every branch, keyed by branch name.
+            join_step: The step receiving the outputs of all branches.
+            max_workers: The maximum number of branches running at once. Defaults to one thread per branch.
+        """
+        if not branches:
+            raise ValueError("A parallel stage needs at least one branch.")
+        self.branches: Dict[str, List[PipelineStep[C, Any]]] = {name: list(steps) for name, steps in branches.items()}
+        self.join_step = join_step
+        self.max_workers = max_workers or len(self.branches)
+
+    @property
+    def name(self) -> str:
+        return f"{self.join_step.name}({', '.join(self.branches)})"
+
+    @staticmethod
+    def _run_branch(steps: List[PipelineStep[C, Any]], context: C, previous_step_output: Optional[Any]) -> Optional[Any]:
+        output = previous_step_output
+        for step in steps:
+            output = step.run_step(context, output)
+        return output
+
+    def run_step(self, context: C, previous_step_output: Optional[Any] = None) -> Optional[Any]:
+        """
+        Runs all branches concurrently, then the join step.
+
+        Returns:
+            The output of the join step.
+        """
+        with ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="pipeline-branch") as pool:
+            futures = {
+                name: pool.submit(self._run_branch, steps, context, previous_step_output)
+                for name, steps in self.branches.items()
+            }
+            # An exception of a branch is raised here, like an exception of a sequential step
+            outputs = {name: future.result() for name, future in futures.items()}
+        return self.join_step.run_step(context, ParallelBranchOutputs(outputs))
+
+    @staticmethod
+    async def _run_branch_async(steps: List[PipelineStep[C, Any]], context: C, previous_step_output: Optional[Any]) -> Optional[Any]:
+        output = previous_step_output
+        for step in steps:
+            output = await step.run_step_async(context, output)
+        return output
+
+    async def run_step_async(self, context: C, previous_step_output: Optional[Any] = None) -> Optional[Any]:
+        """
+        Asynchronous counterpart of run_step: the branches run as concurrent coroutines.
+        max_workers is not applied, the resource limits bound the concurrency instead.
+        """
+        outputs = await asyncio.gather(*(
+            self._run_branch_async(steps, context, previous_step_output) for steps in self.branches.values()
+        ))
+        return await self.join_step.run_step_async(context, ParallelBranchOutputs(dict(zip(self.branches, outputs))))
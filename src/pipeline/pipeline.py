@@ -1,42 +1,66 @@
-from typing import TypeVar, Generic, Optional, Any
+from typing import TypeVar, Generic, Optional, Any, Dict, List, Sequence, Union
 
 from context.generic_context import GenericContext
 from pipeline.pipeline_step import PipelineStep
+from pipeline.parallel_stage import JoinStep, ParallelStage
 
 # Define a type variable for the generic pipeline context
 C = TypeVar('C', bound=GenericContext)
 
+# A node of the pipeline graph: a single step, or parallel branches closed by a join step
+PipelineStage = Union[PipelineStep[C, Any], ParallelStage[C]]
+
+
 class Pipeline(Generic[C]):
     """
-    Represents a pipeline of steps executed in a chain.
-    It holds the first step of the chain and initiates execution.
+    Represents a pipeline as a graph of steps: a sequence of stages, where each stage
+    is either a single step or a ParallelStage whose branches run concurrently and are
+    merged by an explicit join step.
+    The stages are scheduled iteratively, each receiving the output of the previous one.
     It is generic over the Context type it operates on.
     Includes a nested Builder class for constructing the pipeline.
     """
 
-    def __init__(self, first_step: Optional[PipelineStep[C, Any]]):
+    def __init__(self, stages: Sequence[PipelineStage]):
         """
-        Initializes the Pipeline with the first step of the chain.
+        Initializes the Pipeline with its stages.
 
         Args:
-            first_step: The first PipelineStep instance in the chain, or None if the pipeline is empty.
+            stages: The stages of the pipeline in execution order. May be empty.
         """
-        self._first_step = first_step
+        self._stages: List[PipelineStage] = list(stages)
+
+    @property
+    def stages(self) -> List[PipelineStage]:
+        return list(self._stages)
 
     def run(self, initial_context: C) -> None:
         """
-        Runs the pipeline by executing the first step in the chain.
-        The execution then proceeds through the linked steps.
+        Runs the pipeline by executing its stages in order.
+        A skipped step passes the output it received on to the next stage.
+
+        Args:
+            initial_context: The initial context object.
+        """
+        output: Optional[Any] = None
+        for stage in self._stages:
+            output = stage.run_step(initial_context, output)
+
+    async def run_async(self, initial_context: C) -> None:
+        """
+        Asynchronous counterpart of run. The context ends up in the same state as with run,
+        but while a step waits, the event loop can run the pipelines of other tasks.
 
         Args:
             initial_context: The initial context object.
         """
-        if self._first_step:
-            self._first_step.execute(initial_context, None)
+        output: Optional[Any] = None
+        for stage in self._stages:
+            output = await stage.run_step_async(initial_context, output)
 
     class Builder(Generic[C]):
         """
-        Builds a Pipeline by chaining PipelineStep instances.
+        Builds a Pipeline by chaining PipelineStep instances and parallel stages.
         It is generic over the Context type the pipeline operates on.
         This is a nested class of Pipeline.
         """
@@ -45,8 +69,7 @@ class Pipeline(Generic[C]):
             """
             Initializes the PipelineBuilder.
             """
-            self._first_step: Optional[PipelineStep[C, Any]] = None
-            self._last_step: Optional[PipelineStep[C, Any]] = None
+            self._stages: List[PipelineStage] = []
 
         def add_step(self, step: PipelineStep[C, Any]) -> 'Pipeline.Builder[C]':
             """
@@ -58,16 +81,28 @@ class Pipeline(Generic[C]):
             Returns:
                 The PipelineBuilder instance, allowing for chaining calls.
             """
-            if not self._first_step:
-                self._first_step = step
-                self._last_step = step
-            else:
-                # Assuming PipelineStep has a link_with method
-                self._last_step.link_with(step)
-                self._last_step = step
+            self._stages.append(step)
             # DEBUG: Added step {step.__class__.__name__} to the pipeline builder.
             return self
 
+        def add_parallel_steps(self, branches: Dict[str, Sequence[PipelineStep[C, Any]]], join_step: JoinStep[C],
+                               max_workers: Optional[int] = None) -> 'Pipeline.Builder[C]':
+            """
+            Adds independent branches that run concurrently, followed by a join step.
+            E.g. two SQL generators, or value retrieval next to column retrieval.
+
+            Args:
+                branches: The steps of every branch, keyed by branch name. Each branch receives
+                          the output of the previous stage.
+                join_step: The step receiving the outputs of all branches as a ParallelBranchOutputs.
+                max_workers: The maximum number of branches running at once.
+
+            Returns:
+                The PipelineBuilder instance, allowing for chaining calls.
+            """
+            self._stages.append(ParallelStage(branches, join_step, max_workers=max_workers))
+            return self
+
         def build(self) -> 'Pipeline[C]':
             """
             Builds and returns the configured Pipeline instance.
@@ -75,5 +110,5 @@ class Pipeline(Generic[C]):
             Returns:
                 The built Pipeline instance.
             """
-            # INFO: Building pipeline with first step: {self._first_step.__class__.__name__ if self._first_step else 'None'}
-            return Pipeline(self._first_step)
\ No newline at end of file
+            # INFO: Building pipeline with stages: {[stage.name for stage in self._stages]}
+            return Pipeline(self._stages)
@@ -1,8 +1,12 @@
+import asyncio
 from abc import ABC, abstractmethod
-from typing import TypeVar, Generic, Optional, Any
+from typing import TypeVar, Generic, Optional, Any, Tuple
 
 from context.generic_context import GenericContext
 from pipeline.pipeline_step_output import PipelineStepOutput
+from util.instrumentation import StepMetrics, instrument_step
+from util.latency_budget import activate_latency_budget
+from util.tracing import get_tracer
 
 # Define type variables for the generic step
 C = TypeVar('C', bound=GenericContext)
@@ -20,6 +24,36 @@ class PipelineStep(ABC, Generic[C, O]):
     """
 
     _next_step: Optional['PipelineStep[C, Any]'] = None
+    _name: Optional[str] = None
+
+    # Declarations used by MemoizedStep (see pipeline/memoized_step.py). A step can be memoized when it
+    # declares the context attributes it reads and writes. memo_version, the prompt modules and the
+    # configuration files are part of the memo key: changing any of them invalidates stored outputs.
+    memo_input_fields: Tuple[str, ...] = ()
+    memo_output_fields: Tuple[str, ...] = ()
+    memo_version: str = "1"
+    memo_prompt_modules: Tuple[str, ...] = ()
+    memo_config_files: Tuple[str, ...] = ()
+    # Whether the step still runs once the latency budget of the task is spent, e.g. the evaluation
+    runs_without_budget: bool = False
+
+    @property
+    def name(self) -> str:
+        """
+        The name of the step, used in the step metrics. Defaults to the class name.
+        """
+        return self._name or self.__class__.__name__
+
+    @name.setter
+    def name(self, name: str) -> None:
+        self._name = name
+
+    def memo_output(self, context: C) -> Optional[Any]:
+        """
+        Rebuilds the output of the step from its restored output attributes, when MemoizedStep
+        restores them instead of running the step. Steps whose output is not read by the next step return None.
+        """
+        return None
 
     def link_with(self, step: 'PipelineStep[C, Any]') -> 'PipelineStep[C, Any]':
         """
@@ -56,20 +90,65 @@ class PipelineStep(ABC, Generic[C, O]):
         """
         pass
 
-    def execute(self, context: C, previous_step_output: I = None) -> None:
+    def run_step(self, context: C, previous_step_output: I = None) -> Optional[Any]:
         """
-        Orchestrates the execution of the pipeline step.
+        Runs this step alone, without the steps linked after it.
+        The resources used by before, handle_execution and after are recorded in the context,
+        and a snapshot of the context is traced if tracing is enabled.
+        If the context carries a latency budget, the step is exposed to it while running and is
+        cancelled, i.e. skipped, if the budget is already spent.
+
+        Returns:
+            The output of the step, or the previous step output if the step was skipped.
         """
         output: Optional[O] = None
-        if self.should_execute(context):
-            self.before(context)
-            output = self.handle_execution(context, previous_step_output)
-            self.after(context, output)
+        budget = getattr(context, "latency_budget", None)
+        cancelled = budget is not None and not self.runs_without_budget and budget.is_exhausted()
+        if cancelled:
+            budget.record_fallback(f"{self.name}:cancelled")
+        if not cancelled and self.should_execute(context):
+            with instrument_step(self.name) as metrics, activate_latency_budget(budget):
+                self.before(context)
+                output = self.handle_execution(context, previous_step_output)
+                self.after(context, output)
+            context.record_step_metrics(metrics)
+            tracer = get_tracer()
+            if tracer is not None:
+                tracer.trace_step(context, self.name, metrics)
         else:
             # If skipped, pass the previous output to the next step
             output = previous_step_output
+            context.record_step_metrics(StepMetrics(step_name=self.name, skipped=True))
 
         context.set_last_executed_step(self)
+        return output
 
-        if self._next_step:
-            self._next_step.execute(context, output)
\ No newline at end of file
+    def execute(self, context: C, previous_step_output: I = None) -> None:
+        """
+        Orchestrates the execution of the pipeline step and of the steps linked after it.
+        The chain is walked iteratively, each step receiving the output of the previous one.
+        """
+        step: Optional[PipelineStep[C, Any]] = self
+        output = previous_step_output
+        while step is not None:
+            output = step.run_step(context, output)
+            step = step._next_step
+
+    async def run_step_async(self, context: C, previous_step_output: I = None) -> Optional[Any]:
+        """
+        Runs this step alone without blocking the event loop, with the semantics of run_step.
+        The synchronous step runs in a worker thread, so steps of other tasks can progress while
+        it waits on a model, the database or the vector store.
+        Steps with natively asynchronous work may override this method.
+        """
+        return await asyncio.to_thread(self.run_step, context, previous_step_output)
+
+    async def execute_async(self, context: C, previous_step_output: I = None) -> None:
+        """
+        Asynchronous counterpart of execute: runs this step and the steps linked after it, in order.
+        """
+        step: Optional[PipelineStep[C, Any]] = self
+        output = previous_step_output
+        while step is not None:
+            output = await step.run_step_async(context, output)
+            step = step._next_step
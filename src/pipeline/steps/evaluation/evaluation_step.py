@@ -6,6 +6,9 @@ from pipeline.steps.evaluation.executor.evaluation_executor import EvaluationExe
 
 
 class EvaluationStep(PipelineStep[PipelineContext, None]):
+    # Every task is evaluated, also when its latency budget is spent
+    runs_without_budget = True
+
     def __init__(self):
         self.executor = EvaluationExecutor()
 
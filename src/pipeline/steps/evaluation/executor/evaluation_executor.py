@@ -1,13 +1,30 @@
+import asyncio
+import logging
+from typing import Optional
+
+from common.config.config_helper import ConfigurationHelper
 from context.pipeline_context import PipelineContext
 from executor.statistics_manager import EvaluationResult
-from util.constants import DatabaseConstants
-from util.db.execute import compare_sqls_outcomes
+from infrastructure.evaluation.gold_result_store import GoldResultStore
+from util.constants import DatabaseConstants, EvaluationConstants
+from util.db.execute import compare_sqls_outcomes, execute_sql_digest
+from util.db.result_digest import fingerprint_database
 
 
 class EvaluationExecutor:
+    def __init__(self, gold_store: Optional[GoldResultStore] = None):
+        evaluation_config = ConfigurationHelper().get_config("evaluation.yaml", "evaluation") or {}
+        # The evaluation runs outside the latency budget, so a runaway query is interrupted here
+        self.timeout = float(evaluation_config.get("timeout_seconds", EvaluationConstants.DEFAULT_TIMEOUT_SECONDS))
+        if gold_store is None:
+            gold_store_path = evaluation_config.get("gold_store_path", EvaluationConstants.DEFAULT_GOLD_STORE_PATH)
+            gold_store = GoldResultStore.open(gold_store_path)
+        self.gold_store = gold_store
+
     def execute(self, pipeline_context: PipelineContext) -> EvaluationResult:
         """
         Compares the selected SQL query with the gold standard query and returns the evaluation result.
+        When the gold result is precomputed, only the selected query is executed.
         """
         selected_query = pipeline_context.selected_sql_query
         gold_query = pipeline_context.task.SQL
@@ -19,15 +36,21 @@ class EvaluationExecutor:
                 generated_sql=None,
                 gold_sql=gold_query,
                 comparison_status=0,
-                execution_status=None
+                execution_status=None,
+                selection_method=pipeline_context.selection_method,
+                selection_latency_seconds=pipeline_context.selection_latency_seconds,
+                budget_fallbacks=pipeline_context.budget_fallbacks
             )
 
-        comparison_status = compare_sqls_outcomes(
-            predicted_sql=selected_query.sql,
-            ground_sql=gold_query,
-            db_path=DatabaseConstants.DB_PATH,
-            engine=pipeline_context.db_engine
-        )
+        comparison_status = self._compare_with_gold_store(pipeline_context, selected_query.sql)
+        if comparison_status is None:
+            comparison_status = compare_sqls_outcomes(
+                predicted_sql=selected_query.sql,
+                ground_sql=gold_query,
+                db_path=DatabaseConstants.DB_PATH,
+                engine=pipeline_context.db_engine,
+                timeout=self.timeout
+            )
 
         return EvaluationResult(
             question=pipeline_context.task.question,
@@ -35,5 +58,33 @@ class EvaluationExecutor:
             generated_sql=selected_query.sql,
             gold_sql=gold_query,
             comparison_status=comparison_status,
-            execution_status=selected_query.status
-        )
\ No newline at end of file
+            execution_status=selected_query.status,
+            selection_method=pipeline_context.selection_method,
+            selection_latency_seconds=pipeline_context.selection_latency_seconds,
+            budget_fallbacks=pipeline_context.budget_fallbacks
+        )
+
+    def _compare_with_gold_store(self, pipeline_context: PipelineContext, predicted_sql: str) -> Optional[int]:
+        """
+        Compares the predicted query against the precomputed gold digest.
+
+        Returns:
+            Optional[int]: 1 if the outcomes are equivalent, 0 otherwise, or None if no usable
+            gold result is stored for this task and database version.
+        """
+        if self.gold_store is None:
+            return None
+
+        gold_result = self.gold_store.get(
+            question_id=pipeline_context.task.question_id,
+            fingerprint=fingerprint_database(pipeline_context.db_engine)
+        )
+        if gold_result is None:
+            return None
+
+        try:
+            predicted_result = execute_sql_digest(predicted_sql, pipeline_context.db_engine, self.timeout)
+        except asyncio.TimeoutError as e:
+            logging.info(f"Evaluating the predicted query timed out: {e}")
+            return 0
+        return int(predicted_result.digest == gold_result.digest)
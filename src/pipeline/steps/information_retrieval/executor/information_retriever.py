@@ -3,14 +3,21 @@
 InformationRetriever agent for extracting keywords, phrases, and relevant context.
 """
 import json # Changed from ast to json
-from typing import Dict, List, Any
+import os
+from typing import Dict, List, Any, Optional
+
+from sqlalchemy.engine import Engine
 
 from common.config.config_helper import ConfigurationHelper
 from components.models.embedding_model_facade import HuggingFaceEmbeddingFacade
 from components.models.reasoning_model_facade import ReasoningModelFacade
-from infrastructure.vector_db.chroma_client import ChromaClient
+from infrastructure.lexical_index.column_lexical_index import ColumnLexicalIndex
+from infrastructure.vector_db.vector_store_factory import VectorStoreFactory
+from infrastructure.value_index.value_index import ValueIndex
 from prompts.keyword_phrases_extraction import PROMPT, FEW_SHOT_EXAMPLES_FOR_DICT_OUTPUT_STR
-from util.constants import PreprocessingConstants
+from util.constants import LexicalIndexConstants, PreprocessingConstants, ValueIndexConstants
+from util.db.result_digest import fingerprint_database
+from util.similarity_measures.rank_fusion import reciprocal_rank_fusion
 from executor.task_model import Task
 
 class InformationRetriever:
@@ -29,28 +36,30 @@ class InformationRetriever:
         """
         self.reasoning_model = ReasoningModelFacade(model_name=reasoning_model_name)
 
-        # Initialize ConfigurationHelper to load ChromaDB settings
-        self.config_helper = ConfigurationHelper()
-        chroma_config = self.config_helper.get_config('chroma_db.yaml', 'chroma_db')
-
-        chroma_host = chroma_config.get('host', PreprocessingConstants.DEFAULT_CHROMA_HOST)
-        chroma_port = chroma_config.get('port', PreprocessingConstants.DEFAULT_CHROMA_PORT)
-
         # Initialize Embedding Facade
         self.embedding_facade = HuggingFaceEmbeddingFacade()
 
-        # Initialize ChromaClient
-        self.chroma_client = ChromaClient(
-            host=chroma_host,
-            port=chroma_port,
-            embedding_facade=self.embedding_facade
-        )
+        # Initialize the vector store backend configured in chroma_db.yaml
+        self.vector_store = VectorStoreFactory().create_vector_store(embedding_facade=self.embedding_facade)
 
         # Store collection name
         self.column_collection_name = PreprocessingConstants.COLUMN_COLLECTION_NAME
 
+        # Value indexes for phrase-to-column matching, opened lazily per database
+        self.value_index_config = ConfigurationHelper().get_config("value_index.yaml", "value_index") or {}
+        self.value_index_path = self.value_index_config.get("path", ValueIndexConstants.DEFAULT_INDEX_PATH)
+        self._value_indexes: Dict[str, Optional[ValueIndex]] = {}
 
-    def extract_keywords(self, user_query: str, hint: str = "") -> Dict[str, List[str]]:
+        # BM25 indexes over the column names and comments, fused with the dense results
+        self.lexical_index_config = ConfigurationHelper().get_config("lexical_index.yaml", "lexical_index") or {}
+        self.lexical_index_path = self.lexical_index_config.get("path", LexicalIndexConstants.DEFAULT_INDEX_PATH)
+        self._lexical_indexes: Dict[str, Optional[ColumnLexicalIndex]] = {}
+        self.retrieval_mode = self.lexical_index_config.get("mode", LexicalIndexConstants.DEFAULT_RETRIEVAL_MODE)
+        # Number of keywords answered by the lexical index alone, without an embedding and vector search
+        self.lexical_fast_path_hits = 0
+
+
+    def extract_keywords(self, user_query: str, hint: str = "", enable_thinking: bool = True) -> Dict[str, List[str]]:
         """
         Extracts main entities (keywords) and main phrases (values) from a user query.
 
@@ -63,6 +72,7 @@ class InformationRetriever:
         Args:
             user_query: The natural language query from the user (maps to QUESTION).
             hint: An optional hint to guide extraction (maps to HINT).
+            enable_thinking: Whether the reasoning model may think before answering.
 
         Returns:
             A dictionary with "keywords" and "phrases" as keys,
@@ -77,7 +87,7 @@ class InformationRetriever:
 
         try:
             # Use the 'query' method from ReasoningModelFacade
-            response_text = self.reasoning_model.query(formatted_prompt)
+            response_text = self.reasoning_model.query(formatted_prompt, enable_thinking=enable_thinking)
             print(f"LLM Unparsed Response for keyword extraction: {response_text}")
             # Expecting the LLM to output a JSON string representing a dictionary.
             # TODO: Actually extract the json from ```json ``` or ``` ``` or just try to find any JSON dictionary
@@ -106,30 +116,129 @@ class InformationRetriever:
             print(f"Error extracting the keywords: {str(e)}" )
         return {"keywords": keywords_list, "phrases": phrases_list}
 
-    def retrieve_entities(self, keywords: List[str], phrases: List[str]) -> List[str]:
+    def _get_value_index(self, db_id: str, db_engine: Optional[Engine] = None) -> Optional[ValueIndex]:
         """
-        Placeholder method to retrieve relevant entities (e.g., tables) based on
-        keywords and phrases. The goal is to find tables whose columns might
-        contain values similar to the provided phrases.
+        Returns the value index of a database, opened once and kept for later tasks.
+        """
+        if db_id not in self._value_indexes:
+            fingerprint = fingerprint_database(db_engine) if db_engine is not None else None
+            self._value_indexes[db_id] = ValueIndex.open(os.path.join(self.value_index_path, db_id), fingerprint=fingerprint)
+            if self._value_indexes[db_id] is None:
+                print(f"No usable value index for database '{db_id}'. Build it with build_value_index.py.")
+        return self._value_indexes[db_id]
+
+    def retrieve_entities(self, phrases: List[str], task: Task, db_engine: Optional[Engine] = None) -> Dict[str, List[Dict[str, Any]]]:
+        """
+        Retrieves the columns whose values are similar to the provided phrases
+        (literal values such as "Carlo Ancelotti"), using the MinHash LSH value index of the database.
 
         Args:
-            keywords: A list of keywords extracted from the user query.
             phrases: A list of phrases (potential data values) from the user query.
+            task: The task, whose db_id selects the value index.
+            db_engine: The database engine, used to detect a stale index. Optional.
 
         Returns:
-            A list of relevant entity names (e.g., table names).
-            Currently returns an empty list.
+            A dictionary where keys are phrases and values are lists of dictionaries,
+            each representing a column containing a similar value, in the format of retrieve_context:
+            e.g., {"Carlo Ancelotti": [{"column_name": "name", "table_name": "coach", "description": "...", "value": "Carlo Ancelotti"}]}
+            Returns an empty dictionary if there are no phrases or no value index for the database.
+        """
+        if not phrases or not self.value_index_config.get("enabled", False):
+            return {}
+        value_index = self._get_value_index(task.db_id, db_engine)
+        if value_index is None:
+            return {}
+
+        top_k = int(self.value_index_config.get("top_k", ValueIndexConstants.TOP_K))
+        min_similarity = float(self.value_index_config.get("min_similarity", ValueIndexConstants.MIN_SIMILARITY))
+        retrieved_entities: Dict[str, List[Dict[str, Any]]] = {}
+        for phrase in phrases:
+            matches = value_index.query(phrase, top_k=top_k, min_similarity=min_similarity)
+            if matches:
+                retrieved_entities[phrase] = [
+                    {
+                        "column_name": match.column_name,
+                        "table_name": match.table_name,
+                        "description": f"Contains values like '{match.value}'",
+                        "value": match.value
+                    }
+                    for match in matches
+                ]
+        return retrieved_entities
+
+    def _get_lexical_index(self, db_id: str) -> Optional[ColumnLexicalIndex]:
+        """
+        Returns the lexical index of a database, loaded once and kept for later tasks.
         """
-        # TODO: Implement logic to find relevant tables/entities.
-        # This will likely involve checking column contents or metadata
-        # against the provided phrases, possibly using the schema information
-        # or a more direct database lookup if feasible.
-        return []
+        if not self.lexical_index_config.get("enabled", False):
+            return None
+        if db_id not in self._lexical_indexes:
+            self._lexical_indexes[db_id] = ColumnLexicalIndex.open(self.lexical_index_path, db_id)
+            if self._lexical_indexes[db_id] is None:
+                print(f"No lexical index for database '{db_id}'. Build it with populate_column_vectors.py.")
+        return self._lexical_indexes[db_id]
+
+    def _dense_search(self, keyword: str, task: Task, k: int) -> List[Dict[str, Any]]:
+        """
+        Retrieves the k columns closest to the question and keyword in the vector store.
+        """
+        question_and_keyword = str(task.question + " " + keyword)
+        collection_name = f"{PreprocessingConstants.COLUMN_COLLECTION_NAME}_{task.db_id}"
+        query_results = self.vector_store.query_collection(
+            collection_name=collection_name,
+            query_texts=[question_and_keyword],
+            n_results=k
+        )
+
+        keyword_contexts: List[Dict[str, Any]] = []
+        if query_results and query_results.get("documents") and query_results.get("metadatas"):
+            docs_for_keyword = query_results["documents"][0] if query_results["documents"] else []
+            metadatas_for_keyword = query_results["metadatas"][0] if query_results["metadatas"] else []
+
+            for doc_text, metadata in zip(docs_for_keyword, metadatas_for_keyword):
+                if metadata and 'column_name' in metadata and 'table_name' in metadata:
+                    keyword_contexts.append({
+                        "column_name": metadata['column_name'],
+                        "table_name": metadata['table_name'],
+                        "description": doc_text
+                    })
+                else:
+                    print(f"Missing metadata for potential column with description {doc_text} for keyword '{keyword}'")
+        return keyword_contexts
+
+    def _fuse(self, lexical_contexts: List[Dict[str, Any]], dense_contexts: List[Dict[str, Any]], k: int) -> List[Dict[str, Any]]:
+        """
+        Combines the lexical and dense rankings of a keyword with reciprocal-rank fusion.
+        """
+        contexts_by_column: Dict[tuple, Dict[str, Any]] = {}
+        rankings = []
+        for contexts in (lexical_contexts, dense_contexts):
+            ranking = []
+            for column_context in contexts:
+                column = (column_context["table_name"], column_context["column_name"])
+                contexts_by_column.setdefault(column, column_context)
+                ranking.append(column)
+            rankings.append(ranking)
+
+        fused = reciprocal_rank_fusion(
+            rankings,
+            rrf_k=int(self.lexical_index_config.get("rrf_k", LexicalIndexConstants.DEFAULT_RRF_K)),
+            weights=[
+                float(self.lexical_index_config.get("lexical_weight", 1.0)),
+                float(self.lexical_index_config.get("dense_weight", 1.0))
+            ]
+        )
+        return [contexts_by_column[column] for column, _ in fused[:k]]
 
     def retrieve_context(self, keywords: List[str], task: Task, k: int = 5) -> Dict[str, List[Dict[str, Any]]]:
         """
-        Retrieves the top-k most relevant column descriptions (or names)
-        from the ChromaDB collection based on semantic similarity to the input keywords.
+        Retrieves the top-k most relevant column descriptions (or names) for each keyword.
+
+        Columns are ranked by semantic similarity in the vector store and, if a lexical index exists
+        for the database, by BM25 over the table names, column names and comments. Both rankings are
+        combined with reciprocal-rank fusion. When the lexical ranking is decisive (e.g. the keyword
+        is exactly a column name) it is returned alone, without embedding the query.
+        `retrieval_mode` ("dense", "lexical" or "hybrid") restricts the retrieval to one ranking.
 
         Args:
             keywords: A list of keywords to search for.
@@ -145,39 +254,31 @@ class InformationRetriever:
             return {}
 
         retrieved_contexts: Dict[str, List[Dict[str, Any]]] = {}
+        use_dense = self.retrieval_mode != LexicalIndexConstants.RETRIEVAL_MODE_LEXICAL
+        lexical_index = self._get_lexical_index(task.db_id) if self.retrieval_mode != LexicalIndexConstants.RETRIEVAL_MODE_DENSE else None
+        decisive_fast_path = self.lexical_index_config.get("decisive_fast_path", True)
+        decisive_score_ratio = float(self.lexical_index_config.get("decisive_score_ratio", LexicalIndexConstants.DECISIVE_SCORE_RATIO))
 
         for keyword in keywords:
             if not keyword.strip(): # Skip empty or whitespace-only keywords
                 retrieved_contexts[keyword] = []
                 continue
             try:
-                question_and_keyword = str(task.question + " " + keyword)
-                collection_name = f"{PreprocessingConstants.COLUMN_COLLECTION_NAME}_{task.db_id}"
-                query_results = self.chroma_client.query_collection(
-                    collection_name=collection_name,
-                    query_texts=[question_and_keyword],
-                    n_results=k
-                )
-
-                keyword_contexts: List[Dict[str, Any]] = []
-                if query_results and query_results.get("documents") and query_results.get("metadatas"):
-                    docs_for_keyword = query_results["documents"][0] if query_results["documents"] else []
-                    metadatas_for_keyword = query_results["metadatas"][0] if query_results["metadatas"] else []
-
-                    for doc_text, metadata in zip(docs_for_keyword, metadatas_for_keyword):
-                        if metadata and 'column_name' in metadata and 'table_name' in metadata:
-                            keyword_contexts.append({
-                                "column_name": metadata['column_name'],
-                                "table_name": metadata['table_name'],
-                                "description": doc_text
-                            })
-                        else:
-                            print(f"Missing metadata for potential column with description {doc_text} for keyword '{keyword}'")
-                
-                retrieved_contexts[keyword] = keyword_contexts
+                lexical_matches = lexical_index.search(keyword, k=k) if lexical_index is not None else []
+                lexical_contexts = [match.column.to_context() for match in lexical_matches]
+                if not use_dense:
+                    retrieved_contexts[keyword] = lexical_contexts
+                    continue
+                if decisive_fast_path and ColumnLexicalIndex.is_decisive(lexical_matches, score_ratio=decisive_score_ratio):
+                    self.lexical_fast_path_hits += 1
+                    retrieved_contexts[keyword] = lexical_contexts
+                    continue
+
+                dense_contexts = self._dense_search(keyword, task, k)
+                retrieved_contexts[keyword] = self._fuse(lexical_contexts, dense_contexts, k) if lexical_contexts else dense_contexts
 
             except Exception as e:
                 print(f"Error retrieving context for keyword '{keyword}': {str(e)}")
                 retrieved_contexts[keyword] = []
         
-        return retrieved_contexts
\ No newline at end of file
+        return retrieved_contexts
@@ -3,6 +3,7 @@ from pipeline.steps.information_retrieval.executor.information_retriever import
 from context.pipeline_context import PipelineContext
 from pipeline.pipeline_step import PipelineStep
 from pipeline.pipeline_step_output import PipelineStepOutput
+from util.constants import LatencyBudgetConstants
 from typing import Optional
 import time
 
@@ -12,18 +13,43 @@ class InformationRetrievalStepOutput(PipelineStepOutput):
 
 
 class InformationRetrievalStep(PipelineStep[PipelineContext, InformationRetrievalStepOutput]):
+    memo_input_fields = ("db_id", "user_query")
+    memo_output_fields = ("db_schema_per_keyword",)
+    memo_prompt_modules = ("prompts.keyword_phrases_extraction",)
+    memo_config_files = ("chroma_db.yaml", "lexical_index.yaml", "value_index.yaml")
+
     def __init__(self):
         self.information_retriever = InformationRetriever()
 
+    def memo_output(self, context: PipelineContext) -> Optional[InformationRetrievalStepOutput]:
+        return InformationRetrievalStepOutput(retrieved_context=context.db_schema_per_keyword)
+
     def handle_execution(self, context: PipelineContext, previous_step_output: Optional[Any] = None) -> Optional[InformationRetrievalStepOutput]:
-        keywords_and_phrases = self.information_retriever.extract_keywords(user_query=context.user_query)
+        # With a short latency budget the keywords are extracted without thinking and fewer are retrieved
+        short_budget = context.latency_budget is not None and context.latency_budget.fallback_if_short(
+            f"{self.name}:no_thinking", f"{self.name}:fewer_keywords")
+        keywords_and_phrases = self.information_retriever.extract_keywords(user_query=context.user_query, enable_thinking=not short_budget)
         keywords = keywords_and_phrases.get("keywords", [])
+        phrases = keywords_and_phrases.get("phrases", [])
+        if short_budget:
+            keywords = keywords[:LatencyBudgetConstants.MAX_KEYWORDS_WHEN_SHORT]
+            phrases = phrases[:LatencyBudgetConstants.MAX_KEYWORDS_WHEN_SHORT]
 
-        if len(keywords) == 0:
+        if len(keywords) == 0 and len(phrases) == 0:
             print(f"Information retriever failed to extract keywords!")
             return InformationRetrievalStepOutput(retrieved_context={})
         
         retrieved_context = self.information_retriever.retrieve_context(keywords=keywords, task=context.task)
+
+        # Columns containing values similar to the phrases are handed to the schema filter as well
+        retrieved_entities = self.information_retriever.retrieve_entities(
+            phrases=phrases,
+            task=context.task,
+            db_engine=context.db_engine
+        )
+        for phrase, column_contexts in retrieved_entities.items():
+            retrieved_context.setdefault(phrase, []).extend(column_contexts)
+
         context.db_schema_per_keyword = retrieved_context
         
         return InformationRetrievalStepOutput(retrieved_context=retrieved_context)
\ No newline at end of file
@@ -5,8 +5,12 @@ from pipeline.pipeline_step_output import PipelineStepOutput
 import json
 
 class PrintOutputStep(PipelineStep[PipelineContext, PipelineStepOutput]):
+    """
+    Prints a compact snapshot of the context, for debugging a single task interactively.
+    Evaluation runs trace the context with util/tracing.py instead.
+    """
     def handle_execution(self, context: PipelineContext, previous_step_output: Optional[PipelineStepOutput]) -> Optional[PipelineStepOutput]:
-        print("\n--- Information Retrieval Step Output ---")
-        print(json.dumps(context.to_dict(), indent=4))
+        print(f"\n--- Context after {context.get_last_executed_step().name if context.get_last_executed_step() else 'start'} ---")
+        print(json.dumps(context.to_trace_dict(), default=str))
         print("------------------------------------")
-        return previous_step_output
\ No newline at end of file
+        return previous_step_output
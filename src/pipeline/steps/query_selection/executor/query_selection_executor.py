@@ -1,22 +1,27 @@
 import re
 from typing import List
+from common.config.config_helper import ConfigurationHelper
 from components.models.reasoning_model_facade import ReasoningModelFacade
 from context.pipeline_context import PipelineContext
 from prompts.query_selection import PROMPT
+from util.constants import PromptSchemaConstants
 from util.db.execute import SQLExecInfo
 
 
 class QuerySelectionExecutor:
     def __init__(self):
         self.reasoning_model_facade = ReasoningModelFacade()
+        prompt_schema_config = ConfigurationHelper().get_config("prompt_schema.yaml", "prompt_schema") or {}
+        self.schema_max_tokens = int(prompt_schema_config.get("max_tokens", PromptSchemaConstants.DEFAULT_MAX_TOKENS))
 
     def execute(self, pipeline_context: PipelineContext) -> SQLExecInfo:
         queries_with_results = ""
         for i, info in enumerate(pipeline_context.generated_sql_queries):
             queries_with_results += f"{i}: {info.sql}\n"
             queries_with_results += f"  Execution Status: {info.status.value}\n"
-            if info.result is not None:
-                queries_with_results += f"  Query Output: {str(info.result)}\n"
+            if info.votes > 1:
+                queries_with_results += f"  Generated By: {info.votes} candidates\n"
+            queries_with_results += f"  Query Output: {info.render_preview()}\n"
 
         if not hasattr(pipeline_context, 'schema_engine') or pipeline_context.schema_engine is None:
             raise ValueError("SchemaEngine not found in pipeline context.")
@@ -32,11 +37,24 @@ class QuerySelectionExecutor:
                     else:
                         selected_columns.append(f"{table}.{col}")
 
-        mschema_string: str = pipeline_context.schema_engine.mschema.to_mschema(
-            selected_tables=selected_tables,
-            selected_columns=selected_columns,
-            show_type_detail=True
-        )
+        if self.schema_max_tokens > 0:
+            budgeted_schema = pipeline_context.schema_engine.mschema.to_mschema_within_budget(
+                tokenizer=self.reasoning_model_facade.counting_tokenizer,
+                max_tokens=self.schema_max_tokens,
+                selected_tables=selected_tables,
+                selected_columns=selected_columns,
+                column_ranking=pipeline_context.column_ranking(),
+                show_type_detail=True
+            )
+            if budgeted_schema.pruned:
+                print(f"Pruned the query selection schema to fit {self.schema_max_tokens} tokens: {budgeted_schema.to_dict()}")
+            mschema_string = budgeted_schema.text
+        else:
+            mschema_string: str = pipeline_context.schema_engine.mschema.to_mschema(
+                selected_tables=selected_tables,
+                selected_columns=selected_columns,
+                show_type_detail=True
+            )
 
         full_prompt = PROMPT.format(
             DATABASE_SCHEMA=mschema_string,
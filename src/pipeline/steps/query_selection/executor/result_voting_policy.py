@@ -0,0 +1,91 @@
+"""
+This module defines the execution-result voting policy used in front of the LLM query selection.
+
+Candidates that return the same set of rows are clustered together. When one cluster clearly
+wins the vote, its best candidate is selected directly and the reasoning model is not called.
+"""
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+
+from util.constants import QuerySelectionConstants
+from util.db.execute import SQLExecInfo
+
+
+@dataclass
+class ResultCluster:
+    """
+    Candidates whose execution returned the same set of rows.
+    """
+    digest: str
+    candidates: List[SQLExecInfo] = field(default_factory=list)
+
+    @property
+    def votes(self) -> int:
+        return sum(candidate.votes for candidate in self.candidates)
+
+    @property
+    def representative(self) -> SQLExecInfo:
+        # The candidate generated most often, the earliest one on ties
+        return max(self.candidates, key=lambda candidate: candidate.votes)
+
+
+@dataclass
+class VotingDecision:
+    """
+    The outcome of the vote. `selected_query` is None when the vote is not decisive
+    and the LLM has to select the query.
+    """
+    selected_query: Optional[SQLExecInfo]
+    method: str
+    clusters: List[ResultCluster]
+
+
+class ResultVotingPolicy:
+    """
+    Selects a query by majority vote over the execution results of the candidates.
+    """
+    def __init__(self, min_majority_share: float = QuerySelectionConstants.MIN_MAJORITY_SHARE):
+        """
+        Initializes the ResultVotingPolicy.
+
+        Args:
+            min_majority_share (float): The largest cluster is selected when its share of the votes
+                                        is strictly greater than this value.
+        """
+        self.min_majority_share = min_majority_share
+
+    @staticmethod
+    def cluster(candidates: List[SQLExecInfo]) -> List[ResultCluster]:
+        """
+        Groups candidates by the digest of their results, largest cluster first.
+        A candidate whose result was truncated at the fetch size forms its own cluster, since equal
+        prefixes do not show that the complete results agree.
+        """
+        clusters: Dict[str, ResultCluster] = {}
+        for index, candidate in enumerate(candidates):
+            digest = candidate.result_digest.digest
+            key = f"{digest}#{index}" if candidate.may_be_truncated else digest
+            clusters.setdefault(key, ResultCluster(digest=digest)).candidates.append(candidate)
+        return sorted(clusters.values(), key=lambda c: c.votes, reverse=True)
+
+    def decide(self, candidates: List[SQLExecInfo]) -> VotingDecision:
+        """
+        Decides whether a query can be selected without the LLM.
+
+        Args:
+            candidates (List[SQLExecInfo]): The executed candidates.
+
+        Returns:
+            VotingDecision: The selected query and the method used, or no query if the vote is tied.
+        """
+        clusters = self.cluster(candidates)
+        if len(candidates) == 1:
+            return VotingDecision(candidates[0], QuerySelectionConstants.SELECTION_METHOD_SINGLE_CANDIDATE, clusters)
+        if len(clusters) == 1:
+            return VotingDecision(clusters[0].representative, QuerySelectionConstants.SELECTION_METHOD_UNANIMOUS, clusters)
+
+        total_votes = sum(c.votes for c in clusters)
+        top, runner_up = clusters[0], clusters[1]
+        if top.votes > runner_up.votes and top.votes / total_votes > self.min_majority_share:
+            return VotingDecision(top.representative, QuerySelectionConstants.SELECTION_METHOD_MAJORITY, clusters)
+        return VotingDecision(None, QuerySelectionConstants.SELECTION_METHOD_LLM, clusters)
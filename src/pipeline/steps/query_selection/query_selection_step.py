@@ -1,8 +1,11 @@
+import time
 from typing import Optional, Any
 from context.pipeline_context import PipelineContext
 from pipeline.pipeline_step import PipelineStep
 from pipeline.pipeline_step_output import PipelineStepOutput
 from pipeline.steps.query_selection.executor.query_selection_executor import QuerySelectionExecutor
+from pipeline.steps.query_selection.executor.result_voting_policy import ResultVotingPolicy
+from util.constants import QuerySelectionConstants
 from util.db.execute import SQLExecInfo
 
 
@@ -12,17 +15,40 @@ class QuerySelectionStepOutput(PipelineStepOutput):
 
 
 class QuerySelectionStep(PipelineStep[PipelineContext, QuerySelectionStepOutput]):
+    # db_schema_per_keyword ranks the columns pruned when the prompt schema has a token budget
+    memo_input_fields = ("db_id", "user_query", "hint", "db_schema_per_keyword", "selected_schema", "generated_sql_queries")
+    memo_output_fields = ("selected_sql_query", "selection_method", "selection_latency_seconds")
+    memo_prompt_modules = ("prompts.query_selection",)
+    memo_config_files = ("prompt_schema.yaml",)
+
     def __init__(self):
+        self.voting_policy = ResultVotingPolicy()
         self.executor = QuerySelectionExecutor()
 
+    def memo_output(self, context: PipelineContext) -> Optional[QuerySelectionStepOutput]:
+        return QuerySelectionStepOutput(selected_query=context.selected_sql_query)
+
     def handle_execution(self, context: PipelineContext, previous_step_output: Optional[Any] = None) -> Optional[QuerySelectionStepOutput]:
         print("------------------ QUERY SELECTION STEP ---------------------- \n")
         if context.generated_sql_queries is None or len(context.generated_sql_queries) == 0:
             return None
 
-        selected_query = self.executor.execute(
-            pipeline_context=context
-        )
+        # Only ask the reasoning model when the execution results do not agree
+        decision = self.voting_policy.decide(context.generated_sql_queries)
+        context.selection_method = decision.method
+        selected_query = decision.selected_query
+        if selected_query is None and context.latency_budget is not None \
+                and context.latency_budget.fallback_if_short(f"{self.name}:vote_instead_of_llm"):
+            # No time left for the reasoning model, the largest result cluster wins
+            selected_query = decision.clusters[0].representative
+            context.selection_method = QuerySelectionConstants.SELECTION_METHOD_BUDGET_VOTE
+        if selected_query is None:
+            start = time.perf_counter()
+            selected_query = self.executor.execute(
+                pipeline_context=context
+            )
+            context.selection_latency_seconds = time.perf_counter() - start
+        print(f"Selected query by {context.selection_method} over {len(decision.clusters)} result clusters.")
         context.selected_sql_query = selected_query
-        
-        return QuerySelectionStepOutput(selected_query=selected_query)
\ No newline at end of file
+
+        return QuerySelectionStepOutput(selected_query=selected_query)
@@ -10,7 +10,7 @@ class SchemaFilterExecutor:
     def __init__(self):
         self.reasoning_model_facade = ReasoningModelFacade()
 
-    def execute(self, pipeline_context: PipelineContext) -> dict:
+    def execute(self, pipeline_context: PipelineContext, enable_thinking: bool = True) -> dict:
         unique_table_names: List[str] = []
         unique_column_names: List[str] = []
 
@@ -39,7 +39,7 @@ class SchemaFilterExecutor:
             FEWSHOT_EXAMPLES=FEWSHOT_EXAMPLES,
         )
 
-        model_response = self.reasoning_model_facade.query(full_prompt)
+        model_response = self.reasoning_model_facade.query(full_prompt, enable_thinking=enable_thinking)
         
         print('FILTERING RESPONSE', model_response)
         resulting_schema = {}
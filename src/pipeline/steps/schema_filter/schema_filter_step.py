@@ -7,6 +7,10 @@ from typing import Optional
 import time 
 
 class SchemaFilterStep(PipelineStep[PipelineContext, None]):
+    memo_input_fields = ("db_id", "user_query", "hint", "db_schema_per_keyword")
+    memo_output_fields = ("selected_schema",)
+    memo_prompt_modules = ("prompts.column_selection",)
+
     def handle_execution(self,
                          pipeline_context: PipelineContext,
                          previous_step_output: InformationRetrievalStepOutput) -> Optional[PipelineStepOutput]:
@@ -15,8 +19,10 @@ class SchemaFilterStep(PipelineStep[PipelineContext, None]):
             print(f"Schema Filter step did not run successfully. Empty DB Schema")
             return None
         executor = SchemaFilterExecutor()
+        short_budget = pipeline_context.latency_budget is not None and pipeline_context.latency_budget.fallback_if_short(f"{self.name}:no_thinking")
         result_dictionary = executor.execute(
-            pipeline_context=pipeline_context
+            pipeline_context=pipeline_context,
+            enable_thinking=not short_budget
         )
         pipeline_context.selected_schema = result_dictionary
 
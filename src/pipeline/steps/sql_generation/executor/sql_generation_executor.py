@@ -5,8 +5,11 @@ import asyncio
 from components.models.text2sql_model_facade import Text2SQLModelFacade
 from context.pipeline_context import PipelineContext
 from prompts.sql_generation import PROMPT, DEFOG_PROMPT
+from common.config.config_helper import ConfigurationHelper
 from util.db.execute import execute_sql_queries_async, SQLExecInfo, SQLExecStatus
-from util.constants import DatabaseConstants, HuggingFaceModelConstants
+from util.db.query_cost import QueryCostGuard
+from util.db.sql_canonicalizer import deduplicate_sql_candidates
+from util.constants import DatabaseConstants, HuggingFaceModelConstants, PromptSchemaConstants, SQLExecutionConstants
 
 class SQLGenerationExecutor:
 
@@ -15,7 +18,13 @@ class SQLGenerationExecutor:
         # self.omin_text2sql_model_facade = Text2SQLModelFacade(model_name = HuggingFaceModelConstants.OMNI_TEXT2SQL_MODEL_PATH, model_repo = HuggingFaceModelConstants.OMNI_TEXT2SQL_MODEL_REPO)
         self.defog_text2sql_model_facade = Text2SQLModelFacade(model_name = HuggingFaceModelConstants.DEFOG_TEXT2SQL_MODEL_PATH, model_repo = HuggingFaceModelConstants.DEFOG_TEXT2SQL_MODEL_REPO)
 
-    def execute(self, pipeline_context: PipelineContext) -> List[SQLExecInfo]:
+        execution_config = ConfigurationHelper().get_config("sql_execution.yaml", "sql_execution") or {}
+        self.execution_timeout = float(execution_config.get("timeout_seconds", SQLExecutionConstants.DEFAULT_TIMEOUT_SECONDS))
+        self.cost_guard = QueryCostGuard.from_config()
+        prompt_schema_config = ConfigurationHelper().get_config("prompt_schema.yaml", "prompt_schema") or {}
+        self.schema_max_tokens = int(prompt_schema_config.get("max_tokens", PromptSchemaConstants.DEFAULT_MAX_TOKENS))
+
+    def execute(self, pipeline_context: PipelineContext, single_generator: bool = False) -> List[SQLExecInfo]:
         # Create MSchema string from selected_schema
 
         selected_tables = [table_name.split('.')[1] for table_name in pipeline_context.selected_schema.keys() if '.' in table_name ]
@@ -32,11 +41,24 @@ class SQLGenerationExecutor:
         if not hasattr(pipeline_context, 'schema_engine') or pipeline_context.schema_engine is None:
             return []
 
-        mschema_string: str = pipeline_context.schema_engine.mschema.to_mschema(
-            selected_tables=selected_tables,
-            selected_columns=selected_columns,
-            show_type_detail=True
-        )
+        if self.schema_max_tokens > 0:
+            budgeted_schema = pipeline_context.schema_engine.mschema.to_mschema_within_budget(
+                tokenizer=self.text2sql_model_facade.counting_tokenizer,
+                max_tokens=self.schema_max_tokens,
+                selected_tables=selected_tables,
+                selected_columns=selected_columns,
+                column_ranking=pipeline_context.column_ranking(),
+                show_type_detail=True
+            )
+            if budgeted_schema.pruned:
+                print(f"Pruned the SQL generation schema to fit {self.schema_max_tokens} tokens: {budgeted_schema.to_dict()}")
+            mschema_string = budgeted_schema.text
+        else:
+            mschema_string: str = pipeline_context.schema_engine.mschema.to_mschema(
+                selected_tables=selected_tables,
+                selected_columns=selected_columns,
+                show_type_detail=True
+            )
 
         print('SQL GENERATION MSCHEMA', mschema_string)
 
@@ -55,8 +77,9 @@ class SQLGenerationExecutor:
         try:
             default_response = self.text2sql_model_facade.query(full_prompt)
             responses.append(default_response)
-            defog_response = self.defog_text2sql_model_facade.query(prompt = defog_prompt, system_prompt = None, max_new_tokens = 800)
-            responses.append(defog_response)
+            if not single_generator:
+                defog_response = self.defog_text2sql_model_facade.query(prompt = defog_prompt, system_prompt = None, max_new_tokens = 800)
+                responses.append(defog_response)
         except Exception as e:
             print("Failed to generate query because of", e)
 
@@ -76,7 +99,16 @@ class SQLGenerationExecutor:
             except Exception as e:
                 print("Could not parse JSON for schema filtering", e) 
                 generated_sql_queries.append(model_response) 
-        
+
+        # Canonically identical candidates are executed once and count as votes
+        candidate_groups = deduplicate_sql_candidates(generated_sql_queries)
+        unique_sql_queries = [group.sql for group in candidate_groups]
+        print(f"Executing {len(unique_sql_queries)} distinct candidates out of {len(generated_sql_queries)} generated")
+
+        # The executions may not outlast the latency budget of the task
+        execution_timeout = self.execution_timeout
+        if pipeline_context.latency_budget is not None:
+            execution_timeout = pipeline_context.latency_budget.cap_timeout(execution_timeout)
 
         # Execute and filter queries asynchronously
         # We need to run the async function in an event loop.
@@ -92,15 +124,16 @@ class SQLGenerationExecutor:
             # we need to run the task in the existing loop.
             # This is a simplified approach; for complex scenarios, consider a dedicated task runner.
             executable_sql_infos = loop.run_until_complete(
-                execute_sql_queries_async(generated_sql_queries, DatabaseConstants.DB_PATH, pipeline_context.db_engine, "thesis") # Store the schema/s and other relevant info in the context
+                execute_sql_queries_async(unique_sql_queries, DatabaseConstants.DB_PATH, pipeline_context.db_engine, execution_timeout, self.cost_guard) # Store the schema/s and other relevant info in the context
             )
         else:
             # If no loop is running, create and run a new one.
             executable_sql_infos = loop.run_until_complete(
-                execute_sql_queries_async(generated_sql_queries, DatabaseConstants.DB_PATH, pipeline_context.db_engine, "thesis")
+                execute_sql_queries_async(unique_sql_queries, DatabaseConstants.DB_PATH, pipeline_context.db_engine, execution_timeout, self.cost_guard)
             )
 
-        for executable in executable_sql_infos:
+        for group, executable in zip(candidate_groups, executable_sql_infos):
+            executable.votes = group.votes
             print('QUERY EXECUTION', executable.to_dict())
         
         pipeline_context.generated_sql_queries = [info for info in executable_sql_infos if info.status == SQLExecStatus.CORRECT_SYNTAX]
@@ -10,17 +10,29 @@ class SQLGenerationStepOutput(PipelineStepOutput):
         self.generated_sql_queries = generated_sql_queries
 
 class SQLGenerationStep(PipelineStep[PipelineContext, SQLGenerationStepOutput]):
+    # db_schema_per_keyword ranks the columns pruned when the prompt schema has a token budget
+    memo_input_fields = ("db_id", "user_query", "hint", "db_schema_per_keyword", "selected_schema")
+    memo_output_fields = ("generated_sql_queries",)
+    memo_prompt_modules = ("prompts.sql_generation",)
+    memo_config_files = ("sql_execution.yaml", "prompt_schema.yaml")
+
     def __init__(self):
         self.executor = SQLGenerationExecutor()
 
+    def memo_output(self, context: PipelineContext) -> Optional[SQLGenerationStepOutput]:
+        return SQLGenerationStepOutput(generated_sql_queries=context.generated_sql_queries)
+
     def handle_execution(self, context: PipelineContext, previous_step_output: Optional[Any] = None) -> Optional[SQLGenerationStepOutput]:
         print("------------------ SQL GENERATION STEP ---------------------- \n")
         if context.selected_schema is None or len(context.selected_schema.keys()) == 0:
             print(f"SQL Generation did not run due to missing selected schema keys")
             return None
 
+        # With a short latency budget only the default generator runs
+        short_budget = context.latency_budget is not None and context.latency_budget.fallback_if_short(f"{self.name}:single_generator")
         generated_queries = self.executor.execute(
-            pipeline_context=context
+            pipeline_context=context,
+            single_generator=short_budget
         )
         context.generated_sql_queries = generated_queries
         
@@ -67,4 +67,170 @@ class PreprocessingConstants:
     # ChromaDB specific constants for column vector population
     COLUMN_COLLECTION_NAME: str = "database_columns"
     DEFAULT_CHROMA_HOST: str = "localhost"
-    DEFAULT_CHROMA_PORT: int = 8000
\ No newline at end of file
+    DEFAULT_CHROMA_PORT: int = 8000
+
+class SQLExecutionConstants:
+    """
+    Constants related to the execution of generated SQL queries.
+    """
+    DEFAULT_FETCH_SIZE: int = 500
+    # Size of the textual result previews used in prompts and logs
+    PREVIEW_MAX_ROWS: int = 10
+    PREVIEW_MAX_CHARS: int = 1000
+
+    DEFAULT_TIMEOUT_SECONDS: float = 60
+    # Number of SQLite VM instructions between two timeout checks
+    SQLITE_PROGRESS_HANDLER_STEPS: int = 10000
+    # Cost guard defaults, estimated in visited rows (see util/db/query_cost.py)
+    COST_GUARD_SKIP_COST: float = 5e9
+    COST_GUARD_SHORT_TIMEOUT_COST: float = 5e7
+    COST_GUARD_SHORT_TIMEOUT_SECONDS: float = 5
+    COST_GUARD_UNKNOWN_TABLE_ROWS: int = 1000
+
+
+class EvaluationConstants:
+    """
+    Constants related to the evaluation of generated SQL queries against the gold queries.
+    """
+    # Precomputed gold results, built with scripts/evaluation/build_gold_store.py
+    DEFAULT_GOLD_STORE_PATH: str = "./dataset/dev/bird_subset_gold.npy"
+    DIGEST_SIZE: int = 16  # bytes
+    GOLD_PREVIEW_ROWS: int = 3
+    GOLD_PREVIEW_CHARS: int = 256
+    # Time limit of each query executed by the evaluation, a query exceeding it does not match the gold result
+    DEFAULT_TIMEOUT_SECONDS: float = 60
+
+class QuerySelectionConstants:
+    """
+    Constants related to the selection of the final SQL query among the generated candidates.
+    """
+    # Share of the candidate votes the largest result cluster needs to be selected without the LLM
+    MIN_MAJORITY_SHARE: float = 0.5
+    SELECTION_METHOD_SINGLE_CANDIDATE: str = "single_candidate"
+    SELECTION_METHOD_UNANIMOUS: str = "unanimous"
+    SELECTION_METHOD_MAJORITY: str = "majority"
+    SELECTION_METHOD_LLM: str = "llm"
+    # The latency budget was short, the largest result cluster was selected without a majority
+    SELECTION_METHOD_BUDGET_VOTE: str = "budget_vote"
+
+class VectorStoreConstants:
+    """
+    Constants related to the vector stores holding the column embeddings.
+    """
+    BACKEND_CHROMA: str = "chroma"
+    BACKEND_LOCAL: str = "local"
+    DEFAULT_BACKEND: str = BACKEND_CHROMA
+
+    INDEX_EXACT: str = "exact"
+    INDEX_HNSW: str = "hnsw"
+    DEFAULT_LOCAL_STORE_PATH: str = "/workspace/data/vector_store"
+    DEFAULT_HNSW_M: int = 16
+    DEFAULT_HNSW_EF_CONSTRUCTION: int = 200
+    DEFAULT_HNSW_EF_SEARCH: int = 64
+
+class EmbeddingCacheConstants:
+    """
+    Constants related to the query embedding cache.
+    """
+    DEFAULT_MAX_ENTRIES: int = 10000
+    KEY_SIZE: int = 16
+
+class ValueIndexConstants:
+    """
+    Constants related to the MinHash LSH index over the database values.
+    """
+    DEFAULT_INDEX_PATH: str = "/workspace/data/value_index"
+    DEFAULT_NUM_PERM: int = 64
+    DEFAULT_BANDS: int = 16
+    DEFAULT_SHINGLE_SIZE: int = 3
+    # Only short values are indexed, long free text is not a literal the user would type
+    MAX_VALUES_PER_COLUMN: int = 5000
+    MAX_VALUE_LENGTH: int = 100
+    MIN_SIMILARITY: float = 0.4
+    TOP_K: int = 5
+
+class LexicalIndexConstants:
+    """
+    Constants related to the BM25 lexical index over the database columns and its fusion with the vector store.
+    """
+    DEFAULT_INDEX_PATH: str = "/workspace/data/lexical_index"
+    # Column retrieval modes of the InformationRetriever
+    RETRIEVAL_MODE_DENSE: str = "dense"
+    RETRIEVAL_MODE_LEXICAL: str = "lexical"
+    RETRIEVAL_MODE_HYBRID: str = "hybrid"
+    DEFAULT_RETRIEVAL_MODE: str = RETRIEVAL_MODE_HYBRID
+    DEFAULT_K1: float = 1.2
+    DEFAULT_B: float = 0.75
+    # Table and column name tokens are repeated so that they weigh more than comment tokens
+    NAME_BOOST: int = 2
+    DEFAULT_RRF_K: int = 60
+    # A lexical hit is decisive, and the vector store is skipped, when it names the column exactly
+    # or outscores the runner-up by this factor
+    DECISIVE_SCORE_RATIO: float = 2.0
+
+class InstrumentationConstants:
+    """
+    Constants related to the per-step instrumentation of the pipeline.
+    """
+    # Upper bounds of the latency histogram buckets, from sub-millisecond lookups to long generations
+    LATENCY_BUCKET_BOUNDS_SECONDS: tuple = (0.001, 0.01, 0.1, 0.5, 1, 2, 5, 10, 30, 60, 120, 300, 600)
+
+class ResourceConstants:
+    """
+    Names of the shared resources whose concurrent use can be limited (see util/resource_limits.py).
+    """
+    GPU: str = "gpu"
+    DB: str = "db"
+    VECTOR_STORE: str = "vector_store"
+
+class PipelineExecutionConstants:
+    """
+    Constants related to how the RunningManager executes the pipelines of the tasks.
+    """
+    MODE_SYNC: str = "sync"
+    MODE_ASYNC: str = "async"
+    DEFAULT_MODE: str = MODE_SYNC
+    DEFAULT_MAX_IN_FLIGHT: int = 4
+    DEFAULT_MAX_TASKS: int = 50
+
+class TracingConstants:
+    """
+    Constants related to the per-step tracing of the pipeline context (see util/tracing.py).
+    """
+    DEFAULT_SAMPLE_RATE: float = 1.0
+    DEFAULT_MAX_ROWS: int = 3
+    DEFAULT_QUEUE_SIZE: int = 10000
+    # Context fields of a snapshot when the configuration does not select any
+    DEFAULT_FIELDS: tuple = ("generated_sql_queries", "selected_sql_query", "selection_method")
+
+class MemoizationConstants:
+    """
+    Constants related to the memoization of pipeline step outputs (see pipeline/memoized_step.py).
+    """
+    DEFAULT_PATH: str = "./cache/step_outputs"
+
+class LatencyBudgetConstants:
+    """
+    Constants related to the per-task latency budget (see util/latency_budget.py).
+    """
+    DEFAULT_TOTAL_SECONDS: float = 600
+    # Below this remaining time the steps take their cheaper paths
+    DEFAULT_SHORT_SECONDS: float = 120
+    DEFAULT_MIN_CALL_SECONDS: float = 5
+    MAX_KEYWORDS_WHEN_SHORT: int = 3
+    # Generation limit of the reasoning model when thinking is disabled
+    NO_THINKING_MAX_NEW_TOKENS: int = 1024
+
+class PromptSchemaConstants:
+    """
+    Constants related to rendering the database schema into prompts.
+    """
+    # 0 renders the whole selected schema
+    DEFAULT_MAX_TOKENS: int = 0
+
+class MSchemaConstants:
+    """
+    Constants related to the M-Schema representation of the databases (see components/schema/m_schema.py).
+    """
+    # Rendered selections cached per MSchema, least recently used evicted first
+    RENDER_CACHE_SIZE: int = 256
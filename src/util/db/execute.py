@@ -1,12 +1,17 @@
 from sqlalchemy.engine import Engine, CursorResult
 from sqlalchemy import text
-from typing import List, Any, Dict, Union
+from typing import List, Any, Dict, Optional, Sequence, Tuple, Union
 import asyncio
 import logging
+import time
 from enum import Enum
 from pydantic import BaseModel, PrivateAttr
 from common.config.config_helper import ConfigurationHelper
-from ..constants import DatabaseConstants
+from ..constants import DatabaseConstants, ResourceConstants, SQLExecutionConstants
+from ..instrumentation import record_sql_execution
+from ..resource_limits import resource_slot
+from .result_digest import ResultDigest, digest_result
+from .query_cost import QueryCostGuard, QueryPlanSummary
 
 logging.basicConfig(level=logging.INFO)
 
@@ -14,33 +19,131 @@ class SQLExecStatus(Enum):
     CORRECT_SYNTAX = "CORRECT_SYNTAX"
     INCORRECT_SYNTAX = "INCORRECT_SYNTAX"
     EMPTY_RESULT = "EMPTY_RESULT"
+    TIMEOUT = "TIMEOUT"
+    SKIPPED_BY_COST_GUARD = "SKIPPED_BY_COST_GUARD"
 
 class SQLExecInfo:
+    """
+    The outcome of executing a SQL query.
+
+    The result set is held column-oriented: the column names are stored once and the rows as
+    plain tuples. Rendering it as text is lazy and truncated, see `render_preview`.
+    """
     sql: str = ''
     status: SQLExecStatus = None
-    result: List[Any] = []
 
-    def __init__(self, sql: str, status: str, result: List[Any] = []):
+    def __init__(self, sql: str, status: SQLExecStatus, columns: Optional[Sequence[str]] = None,
+                 rows: Optional[List[Tuple[Any, ...]]] = None, plan: Optional[QueryPlanSummary] = None,
+                 votes: int = 1):
         self.sql = sql
         self.status = status
-        self.result = result
+        self.columns: Tuple[str, ...] = tuple(columns) if columns is not None else ()
+        self.rows: List[Tuple[Any, ...]] = rows if rows is not None else []
+        self.plan = plan
+        # Number of generated candidates that are canonically identical to this query
+        self.votes = votes
+        self._previews: Dict[Tuple[int, int], str] = {}
+        self._result_digest: Optional[ResultDigest] = None
+
+    @property
+    def row_count(self) -> int:
+        return len(self.rows)
+
+    @property
+    def may_be_truncated(self) -> bool:
+        """
+        Whether the result may have more rows than were fetched, so the rows are only a prefix of it.
+        """
+        return self.row_count >= SQLExecutionConstants.DEFAULT_FETCH_SIZE
+
+    @property
+    def result_digest(self) -> ResultDigest:
+        """
+        Order-insensitive digest of the fetched rows, computed on first access.
+        Candidates with the same digest returned the same set of rows. The values are compared by
+        position, so duplicated column names (T1.name, T2.name) and differing aliases do not matter.
+        """
+        if self._result_digest is None:
+            self._result_digest = digest_result(self.columns, self.rows, positional=True)
+        return self._result_digest
+
+    @property
+    def result(self) -> List[Dict[str, Any]]:
+        """
+        The rows as a list of dictionaries. This materializes one dict per row,
+        prefer `columns`/`rows` or `render_preview` on hot paths.
+        """
+        return [dict(zip(self.columns, row)) for row in self.rows]
+
+    def render_preview(self, max_rows: int = SQLExecutionConstants.PREVIEW_MAX_ROWS,
+                       max_chars: int = SQLExecutionConstants.PREVIEW_MAX_CHARS) -> str:
+        """
+        Renders a truncated textual preview of the result set, e.g. for prompts and logs.
+        Only the first `max_rows` rows are stringified and the preview is cached per size.
+
+        Args:
+            max_rows (int): The maximum number of rows to render.
+            max_chars (int): The maximum number of characters of the rendered rows.
+
+        Returns:
+            str: The column names followed by the first rows and the number of omitted rows.
+        """
+        key = (max_rows, max_chars)
+        if key not in self._previews:
+            rendered_rows = ", ".join(repr(row) for row in self.rows[:max_rows])
+            if len(rendered_rows) > max_chars:
+                rendered_rows = rendered_rows[:max_chars] + "..."
+            preview = f"Columns: ({', '.join(self.columns)}) Rows: [{rendered_rows}]"
+            omitted_rows = self.row_count - min(max_rows, self.row_count)
+            if omitted_rows > 0:
+                preview += f" ... and {omitted_rows} more rows"
+            self._previews[key] = preview
+        return self._previews[key]
+
+    def to_dict(self, max_rows: int = SQLExecutionConstants.PREVIEW_MAX_ROWS):
+        info = {
+            "sql": self.sql,
+            "status": self.status.value if self.status is not None else None,
+            "row_count": self.row_count,
+            "votes": self.votes,
+            "result": self.render_preview(max_rows=max_rows)
+        }
+        if self.plan is not None:
+            info["plan"] = self.plan.to_dict()
+        return info
 
-    def to_dict(self):
+    def to_state(self) -> Dict[str, Any]:
+        """
+        Returns the complete execution outcome in a JSON-compatible form, restored by `from_state`.
+        Unlike to_dict, all rows are kept. Values JSON cannot represent, e.g. bytes, are stored as strings.
+        """
         return {
             "sql": self.sql,
             "status": self.status.value if self.status is not None else None,
-            "result": str(self.result) if self.result is not None else None
+            "columns": list(self.columns),
+            "rows": [list(row) for row in self.rows],
+            "plan": self.plan.to_dict() if self.plan is not None else None,
+            "votes": self.votes
         }
-    
-    # @property
-    # def execution_result(self) -> List[Any]:
-    #     if not self._execution_results:
-    #         self._execution_results = _sync_execute_sql(self.sql, )
-    #     else:
-    #         return self._execution_results
+
+    @classmethod
+    def from_state(cls, state: Dict[str, Any]) -> 'SQLExecInfo':
+        """
+        Restores an SQLExecInfo from the output of `to_state`.
+        """
+        return cls(
+            sql=state["sql"],
+            status=SQLExecStatus(state["status"]) if state.get("status") is not None else None,
+            columns=state.get("columns") or (),
+            rows=[tuple(row) for row in state.get("rows") or []],
+            plan=QueryPlanSummary(**state["plan"]) if state.get("plan") else None,
+            votes=state.get("votes", 1)
+        )
 
 
-async def execute_sql_query_async(query: str, db_path: str, engine: Engine, timeout: int = 60) -> SQLExecInfo:
+async def execute_sql_query_async(query: str, db_path: str, engine: Engine,
+                                  timeout: float = SQLExecutionConstants.DEFAULT_TIMEOUT_SECONDS,
+                                  cost_guard: Optional[QueryCostGuard] = None) -> SQLExecInfo:
     """
     Executes a SQL query asynchronously against the provided database engine.
 
@@ -48,38 +151,54 @@ async def execute_sql_query_async(query: str, db_path: str, engine: Engine, time
         query (str): The SQL query string to execute.
         engine (Engine): The SQLAlchemy engine connected to the database.
         db_path (str): The database path/schema to set for the connection.
-        timeout (int): The maximum time in seconds to wait for query execution.
+        timeout (float): The maximum time in seconds to wait for query execution.
+        cost_guard (Optional[QueryCostGuard]): If given, the query plan is estimated first and
+                                               expensive queries are skipped or get a shorter timeout.
 
     Returns:
         SQLExecInfo: An object containing the SQL query, status, and result/error.
     """
+    plan = None
     try:
         # SQLAlchemy's execute is synchronous, so we run it in a thread pool executor
         # to simulate non-blocking behavior for the async context.
         # For true async DB operations, an async driver like asyncpg or aiomysql would be needed.
-
-        # TODO: Inlcude the timeout here
         loop = asyncio.get_event_loop()
-        result = await loop.run_in_executor(
-            None, # Use default ThreadPoolExecutor
-            lambda: _sync_execute_sql(query, engine, db_path)
-        )
 
-        if len(result) == 0:
-            return SQLExecInfo(sql=query, status=SQLExecStatus.EMPTY_RESULT, result=result)
+        if cost_guard is not None:
+            decision = await loop.run_in_executor(None, lambda: cost_guard.assess(query, engine))
+            plan = decision.plan
+            if decision.skip:
+                return SQLExecInfo(sql=query, status=SQLExecStatus.SKIPPED_BY_COST_GUARD, plan=plan)
+            if decision.timeout is not None:
+                timeout = min(timeout, decision.timeout)
+
+        execution_start = time.perf_counter()
+        try:
+            columns, rows = await loop.run_in_executor(
+                None, # Use default ThreadPoolExecutor
+                lambda: _sync_execute_sql(query, engine, db_path, timeout=timeout)
+            )
+        finally:
+            record_sql_execution(time.perf_counter() - execution_start)
+
+        if len(rows) == 0:
+            return SQLExecInfo(sql=query, status=SQLExecStatus.EMPTY_RESULT, columns=columns, rows=rows, plan=plan)
         
-        return SQLExecInfo(sql=query, status=SQLExecStatus.CORRECT_SYNTAX, result=result)
+        return SQLExecInfo(sql=query, status=SQLExecStatus.CORRECT_SYNTAX, columns=columns, rows=rows, plan=plan)
         
     except asyncio.TimeoutError:
         logging.info(f"SQL query execution timed out after {timeout} seconds: {query}")
-        return SQLExecInfo(sql=query, status=SQLExecStatus.INCORRECT_SYNTAX)
+        return SQLExecInfo(sql=query, status=SQLExecStatus.TIMEOUT, plan=plan)
     except Exception as e:
         logging.info(f"SQL query execution failed: {query}. Error: {e}")
-        return SQLExecInfo(sql=query, status=SQLExecStatus.INCORRECT_SYNTAX)
+        return SQLExecInfo(sql=query, status=SQLExecStatus.INCORRECT_SYNTAX, plan=plan)
     
 
 
-def _sync_execute_sql(query: str, engine: Engine, db_path: str = None, fetch: Union[str, int] = 500) -> List[Dict[str, Any]]:
+def _sync_execute_sql(query: str, engine: Engine, db_path: str = None,
+                      fetch: Union[str, int] = SQLExecutionConstants.DEFAULT_FETCH_SIZE,
+                      timeout: Optional[float] = None) -> Tuple[List[str], List[Tuple[Any, ...]]]:
     """
     Synchronously executes a SQL query and fetches results.
     This is a helper for the async function to run in an executor.
@@ -88,33 +207,70 @@ def _sync_execute_sql(query: str, engine: Engine, db_path: str = None, fetch: Un
         query (str): The SQL query string to execute.
         engine (Engine): The SQLAlchemy engine connected to the database.
         db_path (str): The PostgreSQL schema path to set for the connection.
+        timeout (Optional[float]): Maximum execution time in seconds. Only enforced for SQLite,
+                                   where the running statement is interrupted.
+
+    Returns:
+        Tuple[List[str], List[Tuple[Any, ...]]]: The column names and the fetched rows as tuples.
+
+    Raises:
+        asyncio.TimeoutError: If the query was interrupted because it exceeded the timeout.
     """
 
     if db_path is None:
         db_path = DatabaseConstants.DB_PATH
 
-    with engine.connect() as connection:
+    with resource_slot(ResourceConstants.DB), engine.connect() as connection:
         # Set the PostgreSQL search path for this connection
-        
-        # Execute the main query
-        result = connection.execute(text(query))
 
-        if not result.returns_rows:
-            connection.commit()
-            return []
+        deadline = _set_sqlite_deadline(connection, timeout)
+        try:
+            # Execute the main query
+            result = connection.execute(text(query))
 
+            if not result.returns_rows:
+                connection.commit()
+                return [], []
+
+            
+            # For SELECT statements, fetch results. For DML, commit and return status.
+            columns = list(result.keys())
+            if fetch == "all":
+                rows = result.fetchall()
+            elif fetch == "one":
+                row = result.fetchone()
+                rows = [row] if row is not None else []
+            elif isinstance(fetch, int):
+                rows = result.fetchmany(fetch)
+        except Exception as e:
+            if deadline is not None and time.monotonic() >= deadline:
+                raise asyncio.TimeoutError(f"Query interrupted after {timeout} seconds") from e
+            raise
+        finally:
+            if deadline is not None:
+                connection.connection.dbapi_connection.set_progress_handler(None, 0)
         
-        # For SELECT statements, fetch results. For DML, commit and return status.
-        if fetch == "all":
-            rows = result.fetchall()
-        elif fetch == "one":
-            rows = result.fetchone()
-        elif isinstance(fetch, int):
-            rows = result.fetchmany(fetch)
-        
-    return [row._asdict() for row in rows]
+    return columns, [tuple(row) for row in rows]
+
+def _set_sqlite_deadline(connection, timeout: Optional[float]) -> Optional[float]:
+    """
+    Installs a SQLite progress handler that interrupts the running statement after `timeout` seconds.
 
-async def execute_sql_queries_async(queries: List[str], db_path: str, engine: Engine, timeout: int = 60) -> List[SQLExecInfo]:
+    Returns:
+        Optional[float]: The monotonic deadline, or None if no timeout is enforced on this connection.
+    """
+    if timeout is None or connection.dialect.name != "sqlite":
+        return None
+    deadline = time.monotonic() + timeout
+    connection.connection.dbapi_connection.set_progress_handler(
+        lambda: int(time.monotonic() >= deadline),
+        SQLExecutionConstants.SQLITE_PROGRESS_HANDLER_STEPS
+    )
+    return deadline
+
+async def execute_sql_queries_async(queries: List[str], db_path: str, engine: Engine,
+                                    timeout: float = SQLExecutionConstants.DEFAULT_TIMEOUT_SECONDS,
+                                    cost_guard: Optional[QueryCostGuard] = None) -> List[SQLExecInfo]:
     """
     Executes a list of SQL queries asynchronously and returns their execution information.
 
@@ -122,15 +278,53 @@ async def execute_sql_queries_async(queries: List[str], db_path: str, engine: En
         queries (List[str]): A list of SQL query strings to execute.
         engine (Engine): The SQLAlchemy engine connected to the database.
         db_path (str): The database path/schema to set for the connection.
-        timeout (int): The maximum time in seconds to wait for each query execution.
+        timeout (float): The maximum time in seconds to wait for each query execution.
+        cost_guard (Optional[QueryCostGuard]): Optional pre-execution cost guard applied to every query.
 
     Returns:
         List[SQLExecInfo]: A list of SQLExecInfo objects for each query.
     """
-    tasks = [execute_sql_query_async(query, db_path, engine, timeout) for query in queries]
+    tasks = [execute_sql_query_async(query, db_path, engine, timeout, cost_guard) for query in queries]
     return await asyncio.gather(*tasks)
 
-def compare_sqls_outcomes(predicted_sql: str, ground_sql: str, db_path: str, engine: Engine) -> int:
+def execute_sql_digest(query: str, engine: Engine, timeout: Optional[float] = None) -> ResultDigest:
+    """
+    Executes a SQL query and digests the complete result set without materializing it as dicts.
+
+    Args:
+        query (str): The SQL query string to execute.
+        engine (Engine): The SQLAlchemy engine connected to the database.
+        timeout (Optional[float]): Maximum time in seconds to execute the query and stream its rows.
+                                   Only enforced for SQLite, where the running statement is interrupted.
+
+    Returns:
+        ResultDigest: The digest, row count and preview of the result set.
+
+    Raises:
+        asyncio.TimeoutError: If the query was interrupted because it exceeded the timeout.
+    """
+    execution_start = time.perf_counter()
+    try:
+        with resource_slot(ResourceConstants.DB), engine.connect() as connection:
+            deadline = _set_sqlite_deadline(connection, timeout)
+            try:
+                result = connection.execute(text(query))
+                if not result.returns_rows:
+                    connection.commit()
+                    return digest_result([], [])
+                return digest_result(list(result.keys()), result)
+            except Exception as e:
+                if deadline is not None and time.monotonic() >= deadline:
+                    raise asyncio.TimeoutError(f"Query interrupted after {timeout} seconds") from e
+                raise
+            finally:
+                if deadline is not None:
+                    connection.connection.dbapi_connection.set_progress_handler(None, 0)
+    finally:
+        record_sql_execution(time.perf_counter() - execution_start)
+
+def compare_sqls_outcomes(predicted_sql: str, ground_sql: str, db_path: str, engine: Engine,
+                          timeout: Optional[float] = None) -> int:
     """
     Compares the outcomes of two SQL queries to check for equivalence.
     
@@ -138,24 +332,23 @@ def compare_sqls_outcomes(predicted_sql: str, ground_sql: str, db_path: str, eng
         db_path (str): The path to the database file.
         predicted_sql (str): The predicted SQL query.
         ground_truth_sql (str): The ground truth SQL query.
+        timeout (Optional[float]): Maximum execution time in seconds of each query, see execute_sql_digest.
         
     Returns:
-        int: 1 if the outcomes are equivalent, 0 otherwise.
+        int: 1 if the outcomes are equivalent, 0 otherwise, also if a query exceeded the timeout.
     
     Raises:
         Exception: If an error occurs during SQL execution.
     """
     try:
-        predicted_res = _sync_execute_sql(predicted_sql, engine, db_path=db_path)
-        ground_truth_res = _sync_execute_sql(ground_sql, engine, db_path=db_path)
+        predicted_res = execute_sql_digest(predicted_sql, engine, timeout)
+        ground_truth_res = execute_sql_digest(ground_sql, engine, timeout)
 
-        # Convert each dict to a frozenset of key-value pairs
-        pred_set = {frozenset(d.items()) for d in predicted_res}
-        ground_set = {frozenset(d.items()) for d in ground_truth_res}
-
-        return int(pred_set == ground_set)
+        # The digests are computed over the set of rows, so this is a set comparison
+        return int(predicted_res.digest == ground_truth_res.digest)
+    except asyncio.TimeoutError as e:
+        logging.info(f"Comparing SQL outcomes timed out: {e}")
+        return 0
     except Exception as e:
         logging.critical(f"Error comparing SQL outcomes: {e}")
         raise e
-    
-    
@@ -0,0 +1,259 @@
+"""
+This module defines a cost-based pre-execution guard for generated SQL queries.
+
+The guard runs `EXPLAIN QUERY PLAN` (SQLite) on a candidate, walks the plan tree and estimates
+how many rows the query will visit from full table scans, automatic (missing) indexes and the
+depth of nested loops, using cached per-database table row counts.
+"""
+import json
+import logging
+import math
+import os
+import re
+import threading
+from dataclasses import dataclass, field, asdict
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy import text
+from sqlalchemy.engine import Engine
+
+from common.config.config_helper import ConfigurationHelper
+from util.constants import SQLExecutionConstants
+from util.db.result_digest import fingerprint_database
+
+logger = logging.getLogger(__name__)
+
+_LOOP_PATTERN = re.compile(r"^(SCAN|SEARCH) (.+?)(?: USING (.*))?$")
+
+
+@dataclass
+class QueryPlanSummary:
+    """
+    Summary of the query plan of a candidate and its estimated cost.
+    """
+    estimated_cost: float = 0.0
+    full_scans: List[str] = field(default_factory=list)
+    automatic_indexes: List[str] = field(default_factory=list)
+    temp_btrees: int = 0
+    max_loop_depth: int = 0
+    plan: List[str] = field(default_factory=list)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+
+@dataclass
+class CostDecision:
+    """
+    The guard's verdict for a candidate: skip it, or execute it with the given timeout.
+    """
+    plan: Optional[QueryPlanSummary]
+    skip: bool = False
+    timeout: Optional[float] = None
+
+
+class TableStatistics:
+    """
+    Per-database table row counts, computed once per database fingerprint and cached
+    in memory and, optionally, as JSON files in a cache directory.
+    """
+    _cache: Dict[str, Dict[str, int]] = {}
+    _lock = threading.Lock()
+
+    def __init__(self, cache_dir: Optional[str] = None):
+        self.cache_dir = cache_dir
+
+    def get_row_counts(self, engine: Engine) -> Dict[str, int]:
+        """
+        Returns the row count of every table of the database, keyed by lowercase table name.
+        """
+        fingerprint = fingerprint_database(engine)
+        with self._lock:
+            if fingerprint in self._cache:
+                return self._cache[fingerprint]
+
+        row_counts = self._load_from_disk(fingerprint)
+        if row_counts is None:
+            row_counts = self._count_rows(engine)
+            self._save_to_disk(fingerprint, row_counts)
+
+        with self._lock:
+            self._cache[fingerprint] = row_counts
+        return row_counts
+
+    def _count_rows(self, engine: Engine) -> Dict[str, int]:
+        row_counts: Dict[str, int] = {}
+        with engine.connect() as connection:
+            table_names = [row[0] for row in connection.execute(
+                text("SELECT name FROM sqlite_master WHERE type = 'table' AND name NOT LIKE 'sqlite_%'")
+            )]
+            for table_name in table_names:
+                quoted_name = table_name.replace('"', '""')
+                row_counts[table_name.lower()] = connection.execute(text(f'SELECT COUNT(*) FROM "{quoted_name}"')).scalar() or 0
+        logger.info(f"Computed row counts for {len(row_counts)} tables of {engine.url.database}.")
+        return row_counts
+
+    def _cache_path(self, fingerprint: str) -> Optional[str]:
+        return os.path.join(self.cache_dir, f"{fingerprint}.json") if self.cache_dir else None
+
+    def _load_from_disk(self, fingerprint: str) -> Optional[Dict[str, int]]:
+        path = self._cache_path(fingerprint)
+        if path is None or not os.path.isfile(path):
+            return None
+        with open(path, "r") as f:
+            return json.load(f)
+
+    def _save_to_disk(self, fingerprint: str, row_counts: Dict[str, int]) -> None:
+        path = self._cache_path(fingerprint)
+        if path is None:
+            return
+        os.makedirs(self.cache_dir, exist_ok=True)
+        with open(path, "w") as f:
+            json.dump(row_counts, f)
+
+
+class QueryCostGuard:
+    """
+    Estimates the cost of a query from its plan and decides whether it should be executed.
+    Only SQLite plans are understood; other dialects are always executed unguarded.
+    """
+    def __init__(self, skip_cost: float = SQLExecutionConstants.COST_GUARD_SKIP_COST,
+                 short_timeout_cost: float = SQLExecutionConstants.COST_GUARD_SHORT_TIMEOUT_COST,
+                 short_timeout_seconds: float = SQLExecutionConstants.COST_GUARD_SHORT_TIMEOUT_SECONDS,
+                 unknown_table_rows: int = SQLExecutionConstants.COST_GUARD_UNKNOWN_TABLE_ROWS,
+                 statistics: Optional[TableStatistics] = None):
+        """
+        Initializes the QueryCostGuard.
+
+        Args:
+            skip_cost (float): Candidates estimated above this cost are not executed.
+            short_timeout_cost (float): Candidates estimated above this cost get a short timeout.
+            short_timeout_seconds (float): The short timeout in seconds.
+            unknown_table_rows (int): Row estimate for plan entries that are not base tables
+                                      (materialized subqueries, CTEs).
+            statistics (Optional[TableStatistics]): The table row count provider.
+        """
+        self.skip_cost = skip_cost
+        self.short_timeout_cost = short_timeout_cost
+        self.short_timeout_seconds = short_timeout_seconds
+        self.unknown_table_rows = unknown_table_rows
+        self.statistics = statistics or TableStatistics()
+
+    @classmethod
+    def from_config(cls) -> Optional['QueryCostGuard']:
+        """
+        Creates the guard from the 'sql_execution.cost_guard' section of sql_execution.yaml.
+
+        Returns:
+            Optional[QueryCostGuard]: The guard, or None if it is disabled or not configured.
+        """
+        guard_config = ConfigurationHelper().get_config("sql_execution.yaml", "sql_execution.cost_guard")
+        if not guard_config or not guard_config.get("enabled", False):
+            return None
+        return cls(
+            skip_cost=float(guard_config.get("skip_cost", SQLExecutionConstants.COST_GUARD_SKIP_COST)),
+            short_timeout_cost=float(guard_config.get("short_timeout_cost", SQLExecutionConstants.COST_GUARD_SHORT_TIMEOUT_COST)),
+            short_timeout_seconds=float(guard_config.get("short_timeout_seconds", SQLExecutionConstants.COST_GUARD_SHORT_TIMEOUT_SECONDS)),
+            unknown_table_rows=int(guard_config.get("unknown_table_rows", SQLExecutionConstants.COST_GUARD_UNKNOWN_TABLE_ROWS)),
+            statistics=TableStatistics(cache_dir=guard_config.get("statistics_cache_dir"))
+        )
+
+    def assess(self, query: str, engine: Engine) -> CostDecision:
+        """
+        Explains the query and decides whether and how it should be executed.
+
+        Args:
+            query (str): The SQL query string.
+            engine (Engine): The SQLAlchemy engine connected to the database.
+
+        Returns:
+            CostDecision: The plan summary and the decision. Queries that cannot be explained
+            are executed normally so that their error is reported by the execution itself.
+        """
+        if engine.dialect.name != "sqlite":
+            return CostDecision(plan=None)
+        try:
+            plan = self.explain(query, engine)
+        except Exception as e:
+            logger.debug(f"Could not explain query, executing it unguarded: {e}")
+            return CostDecision(plan=None)
+
+        if plan.estimated_cost > self.skip_cost:
+            logger.info(f"Skipping query with estimated cost {plan.estimated_cost:.3g}: {query}")
+            return CostDecision(plan=plan, skip=True)
+        if plan.estimated_cost > self.short_timeout_cost:
+            return CostDecision(plan=plan, timeout=self.short_timeout_seconds)
+        return CostDecision(plan=plan)
+
+    def explain(self, query: str, engine: Engine) -> QueryPlanSummary:
+        """
+        Runs EXPLAIN QUERY PLAN and estimates the number of rows the query visits.
+        """
+        row_counts = self.statistics.get_row_counts(engine)
+        with engine.connect() as connection:
+            plan_rows = connection.execute(text(f"EXPLAIN QUERY PLAN {query.strip().rstrip(';')}")).fetchall()
+
+        children: Dict[int, List[Tuple[int, str]]] = {}
+        for node_id, parent_id, _, detail in plan_rows:
+            children.setdefault(parent_id, []).append((node_id, detail))
+
+        summary = QueryPlanSummary(plan=[row[3] for row in plan_rows])
+        summary.estimated_cost, summary.max_loop_depth = self._estimate(0, children, query, row_counts, summary)
+        return summary
+
+    def _estimate(self, parent_id: int, children: Dict[int, List[Tuple[int, str]]], query: str,
+                  row_counts: Dict[str, int], summary: QueryPlanSummary) -> Tuple[float, int]:
+        """
+        Estimates the cost of the plan nodes under `parent_id`.
+        Sibling SCAN/SEARCH nodes are nested loops, so their row estimates multiply.
+        """
+        cost, depth, loop_rows = 0.0, 0, 1.0
+        for node_id, detail in children.get(parent_id, []):
+            loop = _LOOP_PATTERN.match(detail)
+            if loop and not detail.startswith("SCAN CONSTANT ROW"):
+                operation, name, access = loop.group(1), loop.group(2).split(" ")[0], loop.group(3) or ""
+                table_rows = self._table_rows(name, query, row_counts)
+                if operation == "SCAN":
+                    loop_estimate = table_rows
+                    summary.full_scans.append(name)
+                elif "PRIMARY KEY" in access:
+                    loop_estimate = 1.0
+                elif ">" in access or "<" in access:
+                    loop_estimate = max(1.0, table_rows / 4)
+                else:
+                    loop_estimate = math.log2(table_rows + 1) + 1
+                if "AUTOMATIC" in access:
+                    # SQLite builds a transient index because no usable index exists
+                    summary.automatic_indexes.append(name)
+                    cost += table_rows
+                loop_rows *= max(loop_estimate, 1.0)
+                depth += 1
+                cost += loop_rows
+                sub_cost, sub_depth = self._estimate(node_id, children, query, row_counts, summary)
+                cost += sub_cost
+                depth = max(depth, sub_depth)
+            elif detail.startswith("USE TEMP B-TREE"):
+                summary.temp_btrees += 1
+                cost += loop_rows * math.log2(loop_rows + 1)
+            elif detail.startswith("CORRELATED"):
+                sub_cost, sub_depth = self._estimate(node_id, children, query, row_counts, summary)
+                cost += loop_rows * sub_cost
+                depth += sub_depth
+            else:
+                sub_cost, sub_depth = self._estimate(node_id, children, query, row_counts, summary)
+                cost += sub_cost
+                depth = max(depth, sub_depth)
+        return cost, depth
+
+    def _table_rows(self, name: str, query: str, row_counts: Dict[str, int]) -> float:
+        """
+        Resolves a plan entry name to a table row count. SQLite reports aliases (T1) instead
+        of table names, so aliases are resolved against the tables appearing in the query.
+        """
+        if name.lower() in row_counts:
+            return float(row_counts[name.lower()])
+        for table_name, rows in row_counts.items():
+            alias_pattern = rf"[`\"\[]?{re.escape(table_name)}[`\"\]]?\s+(?:AS\s+)?{re.escape(name)}\b"
+            if re.search(alias_pattern, query, flags=re.IGNORECASE):
+                return float(rows)
+        return float(self.unknown_table_rows)
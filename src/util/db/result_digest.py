@@ -0,0 +1,108 @@
+"""
+This module defines helpers for fingerprinting databases and digesting SQL result sets,
+so that two executions can be compared without keeping the full rows around.
+"""
+import hashlib
+import os
+from dataclasses import dataclass
+from typing import Any, Iterable, Sequence
+
+from sqlalchemy.engine import Engine
+
+from util.constants import EvaluationConstants
+
+# Offsets into the 100 byte SQLite database header (https://www.sqlite.org/fileformat.html)
+_SQLITE_HEADER_SIZE = 100
+_SQLITE_MAGIC = b"SQLite format 3\x00"
+
+
+@dataclass
+class ResultDigest:
+    """
+    Order-insensitive summary of a SQL result set.
+
+    Two result sets have the same digest when they contain the same set of rows,
+    which mirrors the set comparison done in `compare_sqls_outcomes`.
+    """
+    digest: str
+    row_count: int
+    preview: str = ""
+
+
+def _canonical_value(value: Any) -> Any:
+    """Normalizes values that compare equal in Python but have a different repr (True/1/1.0)."""
+    if isinstance(value, bool):
+        return int(value)
+    if isinstance(value, float) and value.is_integer():
+        return int(value)
+    return value
+
+
+def _row_hash(columns: Sequence[str], row: Sequence[Any], positional: bool = False) -> bytes:
+    if positional:
+        canonical_row = tuple(repr(_canonical_value(value)) for value in row)
+    else:
+        # A dict is built first so duplicated column names collapse the same way row._asdict() does.
+        named_row = dict(zip(columns, row))
+        canonical_row = tuple(sorted((name, repr(_canonical_value(value))) for name, value in named_row.items()))
+    return hashlib.blake2b(repr(canonical_row).encode("utf-8"), digest_size=EvaluationConstants.DIGEST_SIZE).digest()
+
+
+def digest_result(columns: Sequence[str], rows: Iterable[Sequence[Any]], positional: bool = False) -> ResultDigest:
+    """
+    Computes the digest, the row count and a short preview of a result set.
+
+    Args:
+        columns (Sequence[str]): The column names of the result set.
+        rows (Iterable[Sequence[Any]]): The rows as tuples (or any sequence of values).
+        positional (bool): Hash the values of every row by position, ignoring the column names. Used to compare
+                           candidates whose equivalent columns are named differently (COUNT(*), COUNT(T1.id)).
+                           Otherwise the rows are compared by column name, like the evaluation against the gold query.
+
+    Returns:
+        ResultDigest: The digest of the distinct rows, the number of rows and a truncated preview.
+    """
+    row_hashes = set()
+    preview_rows = []
+    row_count = 0
+    for row in rows:
+        row_count += 1
+        row_hashes.add(_row_hash(columns, row, positional))
+        if len(preview_rows) < EvaluationConstants.GOLD_PREVIEW_ROWS:
+            preview_rows.append(tuple(row))
+
+    hasher = hashlib.blake2b(digest_size=EvaluationConstants.DIGEST_SIZE)
+    for row_hash in sorted(row_hashes):
+        hasher.update(row_hash)
+
+    preview = str(preview_rows)[:EvaluationConstants.GOLD_PREVIEW_CHARS]
+    return ResultDigest(digest=hasher.hexdigest(), row_count=row_count, preview=preview)
+
+
+def fingerprint_database(engine: Engine) -> str:
+    """
+    Computes a cheap fingerprint identifying the content version of a database.
+
+    For SQLite files the fingerprint is derived from the file header (file change counter,
+    page count and schema cookie) and the file size, so it changes whenever the database is written
+    without having to hash the whole file. Other dialects fall back to the connection URL.
+
+    Args:
+        engine (Engine): The SQLAlchemy engine connected to the database.
+
+    Returns:
+        str: A hex fingerprint of the database.
+    """
+    hasher = hashlib.blake2b(digest_size=EvaluationConstants.DIGEST_SIZE)
+    database = engine.url.database or ""
+    hasher.update(f"{engine.dialect.name}:{os.path.basename(database)}".encode("utf-8"))
+
+    if engine.dialect.name == "sqlite" and database and os.path.isfile(database):
+        with open(database, "rb") as f:
+            header = f.read(_SQLITE_HEADER_SIZE)
+        if header.startswith(_SQLITE_MAGIC):
+            hasher.update(header[24:32])  # file change counter + database size in pages
+            hasher.update(header[40:44])  # schema cookie
+        hasher.update(str(os.path.getsize(database)).encode("utf-8"))
+
+    return hasher.hexdigest()
@@ -0,0 +1,104 @@
+"""
+This module defines helpers to canonicalize SQL candidates and deduplicate them before execution.
+
+Two candidates are considered identical when they only differ in whitespace, keyword case,
+the case of unquoted identifiers, table alias names, a trailing semicolon or `INNER JOIN` vs `JOIN`.
+Quoted identifiers are kept as written, since SQLite treats an unknown double-quoted name as a string.
+"""
+import logging
+import re
+from dataclasses import dataclass, field
+from typing import Dict, List
+
+import sqlglot
+from sqlglot import exp
+from sqlglot.errors import SqlglotError
+
+logger = logging.getLogger(__name__)
+
+_SIMPLE_IDENTIFIER = re.compile(r"^[a-z_][a-z0-9_]*$")
+
+
+@dataclass
+class CandidateGroup:
+    """
+    A set of SQL candidates that are canonically identical.
+    The first candidate of the group is the one that gets executed.
+    """
+    sql: str
+    canonical_sql: str
+    source_indices: List[int] = field(default_factory=list)
+
+    @property
+    def votes(self) -> int:
+        return len(self.source_indices)
+
+
+def canonicalize_sql(sql: str, dialect: str = "sqlite") -> str:
+    """
+    Returns a canonical form of a SQL query.
+
+    Args:
+        sql (str): The SQL query.
+        dialect (str): The sqlglot dialect used to parse the query.
+
+    Returns:
+        str: The canonical SQL. If the query cannot be parsed, its whitespace-normalized text is returned.
+    """
+    try:
+        expression = sqlglot.parse_one(sql, read=dialect)
+        return _canonical_expression_sql(expression, dialect)
+    except SqlglotError as e:
+        logger.debug(f"Could not parse SQL candidate, falling back to text normalization: {e}")
+        return " ".join(sql.split()).rstrip(";").strip()
+
+
+def _canonical_expression_sql(expression: exp.Expression, dialect: str) -> str:
+
+    # Rename table and subquery aliases to t0, t1, ... in order of appearance
+    aliases: Dict[str, str] = {}
+    for node in expression.find_all(exp.Table, exp.Subquery):
+        if node.alias:
+            canonical_alias = aliases.setdefault(node.alias.lower(), f"t{len(aliases)}")
+            node.set("alias", exp.TableAlias(this=exp.to_identifier(canonical_alias)))
+
+    for column in expression.find_all(exp.Column):
+        qualifier = column.table
+        if qualifier and qualifier.lower() in aliases:
+            column.set("table", exp.to_identifier(aliases[qualifier.lower()]))
+
+    for join in expression.find_all(exp.Join):
+        if (join.args.get("kind") or "").upper() == "INNER":
+            join.set("kind", None)
+
+    # SQLite identifiers are case-insensitive. Quoted identifiers keep their case and quotes: SQLite reads
+    # "Lewis" as a string literal when no such column exists, so "Lewis" and "lewis" may select other rows.
+    for identifier in expression.find_all(exp.Identifier):
+        if identifier.quoted:
+            continue
+        name = identifier.this.lower()
+        identifier.set("this", name)
+        identifier.set("quoted", not _SIMPLE_IDENTIFIER.match(name))
+
+    return expression.sql(dialect=dialect)
+
+
+def deduplicate_sql_candidates(sqls: List[str], dialect: str = "sqlite") -> List[CandidateGroup]:
+    """
+    Groups SQL candidates that are canonically identical.
+
+    Args:
+        sqls (List[str]): The SQL candidates, in generation order.
+        dialect (str): The sqlglot dialect used to parse the candidates.
+
+    Returns:
+        List[CandidateGroup]: One group per distinct candidate, in order of first appearance.
+        The number of candidates in a group is its number of votes.
+    """
+    groups: Dict[str, CandidateGroup] = {}
+    for index, sql in enumerate(sqls):
+        canonical_sql = canonicalize_sql(sql, dialect)
+        if canonical_sql not in groups:
+            groups[canonical_sql] = CandidateGroup(sql=sql, canonical_sql=canonical_sql)
+        groups[canonical_sql].source_indices.append(index)
+    return list(groups.values())
@@ -0,0 +1,81 @@
+"""
+This module extracts the table.column pairs a SQL query references, e.g. to measure how many of the
+columns of a gold query the schema linking retrieved.
+"""
+import logging
+from typing import Dict, Iterable, Optional, Set
+
+import sqlglot
+from sqlglot import exp
+from sqlglot.errors import SqlglotError
+from sqlglot.optimizer.qualify import qualify
+from sqlglot.optimizer.scope import traverse_scope
+
+logger = logging.getLogger(__name__)
+
+
+def extract_referenced_columns(sql: str, schema: Optional[Dict[str, Iterable[str]]] = None,
+                               dialect: str = "sqlite") -> Set[str]:
+    """
+    Returns the columns referenced anywhere in a query (SELECT, JOIN, WHERE, GROUP BY, ORDER BY, subqueries),
+    resolved through table aliases to the base table.
+
+    Unqualified columns are resolved with the schema: they are attributed to the tables of their
+    scope that have a column of that name. With a schema, only columns of the schema are returned, so that
+    e.g. a double-quoted string literal ("Monaco"), which sqlglot parses as a column, is not reported.
+    `SELECT *` adds no column.
+
+    Args:
+        sql (str): The SQL query.
+        schema (Optional[Dict[str, Iterable[str]]]): The column names of every table. Without it, only
+                                                     qualified columns and single-table scopes are resolved,
+                                                     and names that are not columns cannot be told apart.
+        dialect (str): The sqlglot dialect used to parse the query.
+
+    Returns:
+        Set[str]: The referenced columns as lowercase "table.column" strings. Empty if the query cannot be parsed.
+    """
+    schema_columns = {
+        table.lower(): {column.lower() for column in columns}
+        for table, columns in (schema or {}).items()
+    }
+    try:
+        expression = sqlglot.parse_one(sql, read=dialect)
+    except SqlglotError as e:
+        logger.warning(f"Could not parse SQL to extract its columns: {e}")
+        return set()
+
+    try:
+        expression = qualify(
+            expression,
+            dialect=dialect,
+            schema={table: {column: "TEXT" for column in columns} for table, columns in schema_columns.items()} or None,
+            validate_qualify_columns=False,
+            quote_identifiers=False
+        )
+    except SqlglotError as e:
+        # The unqualified query still resolves aliases and single-table scopes
+        logger.debug(f"Could not qualify SQL, resolving its columns without the schema: {e}")
+
+    referenced: Set[str] = set()
+    for scope in traverse_scope(expression):
+        base_tables = {
+            alias.lower(): source.name.lower()
+            for alias, source in scope.sources.items()
+            if isinstance(source, exp.Table)
+        }
+        for column in scope.columns:
+            column_name = column.name.lower()
+            if not column_name or column_name == "*":
+                continue
+            if column.table:
+                table_name = base_tables.get(column.table.lower())
+                if table_name is not None and (not schema_columns or column_name in schema_columns.get(table_name, ())):
+                    referenced.add(f"{table_name}.{column_name}")
+                continue
+            # Unqualified column: any table of the scope that has it, or the only table of the scope
+            candidates = [table for table in base_tables.values() if column_name in schema_columns.get(table, ())]
+            if not candidates and not schema_columns and len(set(base_tables.values())) == 1:
+                candidates = list(base_tables.values())
+            referenced.update(f"{table_name}.{column_name}" for table_name in candidates)
+    return referenced
@@ -0,0 +1,174 @@
+"""
+This module defines the per-step instrumentation of the pipeline.
+
+`instrument_step` measures a pipeline step (wall time, CPU time, peak RSS and GPU memory) and
+exposes its StepMetrics through a context variable, so that code deep inside the step, such as the
+model facades or the SQL execution helpers, can add LLM token counts and SQL execution time with
+`record_llm_usage` and `record_sql_execution` without the context being passed down.
+Outside of an instrumented step these functions do nothing.
+
+Steps overlap in parallel stages and in the asynchronous runner. CPU time is therefore measured for the
+thread running the step, while RSS is process-wide and the GPU peak is only recorded for steps that did not
+overlap another instrumented step (see StepMetrics.overlapped).
+"""
+import contextvars
+import resource
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass
+from typing import Any, Dict, Iterator, List, Optional, Sequence
+
+import numpy as np
+
+from util.constants import InstrumentationConstants
+
+_current_step_metrics: contextvars.ContextVar[Optional['StepMetrics']] = contextvars.ContextVar("current_step_metrics", default=None)
+_metrics_lock = threading.Lock()
+# The metrics of the instrumented steps currently running, guarded by _metrics_lock
+_active_steps: List['StepMetrics'] = []
+
+
+@dataclass
+class StepMetrics:
+    """
+    The resources used by one execution of a pipeline step.
+    """
+    step_name: str
+    wall_seconds: float = 0.0
+    # CPU time of the thread running the step, work handed to other threads (e.g. the SQL executor) is not included
+    cpu_seconds: float = 0.0
+    # Process-wide RSS high-water mark when the step finished, and how much it rose during the step,
+    # including the memory of the steps overlapping it
+    peak_rss_mb: float = 0.0
+    peak_rss_growth_mb: float = 0.0
+    # Peak GPU memory allocated during the step, if torch is loaded and a GPU is available.
+    # None for overlapped steps, as the peak is tracked per process.
+    peak_gpu_memory_mb: Optional[float] = None
+    # Whether another instrumented step ran at the same time
+    overlapped: bool = False
+    llm_calls: int = 0
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+    sql_executions: int = 0
+    sql_seconds: float = 0.0
+    skipped: bool = False
+
+    def to_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+
+def _max_rss_mb() -> float:
+    # ru_maxrss is in kilobytes on Linux and in bytes on macOS
+    max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return max_rss / (1024 * 1024) if sys.platform == "darwin" else max_rss / 1024
+
+
+def _cuda():
+    # torch is only used if something else already imported it, the instrumentation never loads it
+    torch = sys.modules.get("torch")
+    return torch.cuda if torch is not None and torch.cuda.is_available() else None
+
+
+@contextmanager
+def instrument_step(step_name: str) -> Iterator[StepMetrics]:
+    """
+    Measures the code run inside the block as one execution of a pipeline step.
+
+    Args:
+        step_name (str): The name of the step.
+
+    Yields:
+        StepMetrics: The metrics of the step, complete once the block exits.
+    """
+    metrics = StepMetrics(step_name=step_name)
+    token = _current_step_metrics.set(metrics)
+    cuda = _cuda()
+    with _metrics_lock:
+        if _active_steps:
+            metrics.overlapped = True
+            for active_metrics in _active_steps:
+                active_metrics.overlapped = True
+        elif cuda is not None:
+            # Resetting the peak while another step runs would lose that step's peak
+            cuda.reset_peak_memory_stats()
+        _active_steps.append(metrics)
+    rss_before = _max_rss_mb()
+    wall_start, cpu_start = time.perf_counter(), time.thread_time()
+    try:
+        yield metrics
+    finally:
+        metrics.wall_seconds = time.perf_counter() - wall_start
+        metrics.cpu_seconds = time.thread_time() - cpu_start
+        metrics.peak_rss_mb = _max_rss_mb()
+        metrics.peak_rss_growth_mb = metrics.peak_rss_mb - rss_before
+        with _metrics_lock:
+            _active_steps.remove(metrics)
+            if cuda is not None and not metrics.overlapped:
+                metrics.peak_gpu_memory_mb = cuda.max_memory_allocated() / (1024 * 1024)
+        _current_step_metrics.reset(token)
+
+
+def current_step_metrics() -> Optional[StepMetrics]:
+    """
+    Returns the metrics of the step being executed, or None outside of an instrumented step.
+    """
+    return _current_step_metrics.get()
+
+
+def record_llm_usage(prompt_tokens: int, completion_tokens: int) -> None:
+    """
+    Adds one LLM call and its token counts to the current step.
+    """
+    metrics = _current_step_metrics.get()
+    if metrics is None:
+        return
+    with _metrics_lock:
+        metrics.llm_calls += 1
+        metrics.prompt_tokens += int(prompt_tokens)
+        metrics.completion_tokens += int(completion_tokens)
+
+
+def record_sql_execution(seconds: float) -> None:
+    """
+    Adds one SQL execution and its duration to the current step. Concurrent executions
+    are summed, so the total can exceed the wall time of the step.
+    """
+    metrics = _current_step_metrics.get()
+    if metrics is None:
+        return
+    with _metrics_lock:
+        metrics.sql_executions += 1
+        metrics.sql_seconds += seconds
+
+
+def latency_histogram(latencies_seconds: Sequence[float],
+                      bucket_bounds: Sequence[float] = InstrumentationConstants.LATENCY_BUCKET_BOUNDS_SECONDS) -> Dict[str, Any]:
+    """
+    Summarizes latencies with percentiles and the counts of a fixed bucket histogram.
+    The bucket bounds are shared by all reports, so histograms of different runs can be compared.
+
+    Args:
+        latencies_seconds (Sequence[float]): The latencies.
+        bucket_bounds (Sequence[float]): The upper bounds of the buckets, in seconds. Larger values fall into a last "+inf" bucket.
+
+    Returns:
+        Dict[str, Any]: The count, mean, p50/p90/p95/p99, max and bucket counts.
+    """
+    values = np.asarray(latencies_seconds, dtype=np.float64)
+    if values.size == 0:
+        return {"count": 0}
+    counts = np.bincount(np.searchsorted(bucket_bounds, values, side="left"), minlength=len(bucket_bounds) + 1)
+    labels: List[str] = [f"<={bound:g}s" for bound in bucket_bounds] + ["+inf"]
+    return {
+        "count": int(values.size),
+        "total_seconds": float(values.sum()),
+        "mean_seconds": float(values.mean()),
+        "p50_seconds": float(np.percentile(values, 50)),
+        "p90_seconds": float(np.percentile(values, 90)),
+        "p95_seconds": float(np.percentile(values, 95)),
+        "p99_seconds": float(np.percentile(values, 99)),
+        "max_seconds": float(values.max()),
+        "buckets": {label: int(count) for label, count in zip(labels, counts)},
+    }
@@ -0,0 +1,124 @@
+"""
+This module defines the per-task latency budget of the pipeline.
+
+The budget is created with the task context and shared by its steps. A step asks `fallback_if_short`
+before an expensive path and takes a cheaper one when little time is left, e.g. one SQL generator
+instead of two. Every fallback taken is recorded, so the results show which tasks were degraded.
+
+Steps run in threads that cannot be interrupted, so a step exceeding the budget is cancelled
+cooperatively: while a step runs, `current_latency_budget` exposes the budget to the model facades,
+which stop generating once it is spent, and the SQL execution timeouts are capped by the remaining
+time. Steps starting after the budget is spent are skipped (see PipelineStep.run_step).
+
+The clock is paused while the task waits for a shared resource held by other tasks (see
+`resource_slot`), so tasks running concurrently take the same fallbacks as in the sequential runner
+instead of running out of budget in the GPU queue.
+"""
+import contextvars
+import threading
+import time
+from contextlib import contextmanager
+from typing import Iterator, List, Optional
+
+from util.constants import LatencyBudgetConstants
+
+_current_latency_budget: contextvars.ContextVar[Optional['LatencyBudget']] = contextvars.ContextVar("current_latency_budget", default=None)
+
+
+class LatencyBudget:
+    """
+    The time a task may spend in the pipeline, counted from the creation of the budget.
+    """
+    def __init__(self, total_seconds: float, short_seconds: float = LatencyBudgetConstants.DEFAULT_SHORT_SECONDS,
+                 min_call_seconds: float = LatencyBudgetConstants.DEFAULT_MIN_CALL_SECONDS):
+        """
+        Args:
+            total_seconds (float): The budget of the task.
+            short_seconds (float): Below this remaining time, steps take their cheaper paths.
+            min_call_seconds (float): The minimum time limit given to a model call or SQL execution,
+                                      so a call made just before the deadline can still produce something.
+        """
+        self.total_seconds = total_seconds
+        self.short_seconds = short_seconds
+        self.min_call_seconds = min_call_seconds
+        self.fallbacks: List[str] = []
+        self._start = time.perf_counter()
+        self._lock = threading.Lock()
+        # Time spent waiting for shared resources, overlapping waits of parallel branches counted once
+        self._paused_seconds = 0.0
+        self._pause_depth = 0
+        self._pause_start = 0.0
+
+    def elapsed(self) -> float:
+        with self._lock:
+            now = time.perf_counter()
+            paused_seconds = self._paused_seconds + (now - self._pause_start if self._pause_depth else 0.0)
+            return now - self._start - paused_seconds
+
+    @contextmanager
+    def paused(self) -> Iterator[None]:
+        """
+        Stops the clock for the duration of the block, used while waiting for a shared resource.
+        """
+        with self._lock:
+            if self._pause_depth == 0:
+                self._pause_start = time.perf_counter()
+            self._pause_depth += 1
+        try:
+            yield
+        finally:
+            with self._lock:
+                self._pause_depth -= 1
+                if self._pause_depth == 0:
+                    self._paused_seconds += time.perf_counter() - self._pause_start
+
+    def remaining(self) -> float:
+        return self.total_seconds - self.elapsed()
+
+    def is_exhausted(self) -> bool:
+        return self.remaining() <= 0
+
+    def is_short(self) -> bool:
+        return self.remaining() < self.short_seconds
+
+    def record_fallback(self, fallback: str) -> None:
+        """
+        Records that a step took a cheaper path or was cancelled, e.g. "SQLGenerationStep:single_generator".
+        """
+        with self._lock:
+            self.fallbacks.append(fallback)
+
+    def fallback_if_short(self, *fallbacks: str) -> bool:
+        """
+        Returns True, and records the fallbacks the caller takes instead, if the remaining budget is short.
+        """
+        if not self.is_short():
+            return False
+        for fallback in fallbacks:
+            self.record_fallback(fallback)
+        return True
+
+    def cap_timeout(self, timeout: float) -> float:
+        """
+        Returns the timeout limited to the remaining budget, but not below min_call_seconds.
+        """
+        return min(timeout, max(self.remaining(), self.min_call_seconds))
+
+
+@contextmanager
+def activate_latency_budget(budget: Optional[LatencyBudget]) -> Iterator[None]:
+    """
+    Exposes the budget to the code run inside the block, see current_latency_budget.
+    """
+    token = _current_latency_budget.set(budget)
+    try:
+        yield
+    finally:
+        _current_latency_budget.reset(token)
+
+
+def current_latency_budget() -> Optional[LatencyBudget]:
+    """
+    Returns the budget of the task whose step is running, or None if the task has no budget.
+    """
+    return _current_latency_budget.get()
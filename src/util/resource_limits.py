@@ -0,0 +1,72 @@
+"""
+This module defines process-wide limits on the concurrent use of shared resources.
+
+Code using a shared resource wraps the use in `resource_slot(name)`. When pipelines of several
+tasks run concurrently, a limit of 1 on "gpu" serializes the model calls while the "db" and
+"vector_store" calls of other tasks keep overlapping. Resources without a configured limit
+are not restricted, so the slots cost nothing in the sequential runner.
+
+The slots are thread semaphores rather than asyncio ones, because the model, database and
+vector store clients are synchronous and run in worker threads of the asyncio runner.
+
+The time spent waiting for a slot does not count against the latency budget of the task.
+"""
+import threading
+from contextlib import contextmanager
+from typing import Dict, Iterator, Mapping, Optional
+
+from util.latency_budget import current_latency_budget
+
+_semaphores: Dict[str, threading.BoundedSemaphore] = {}
+_limits: Dict[str, int] = {}
+_registry_lock = threading.Lock()
+
+
+def configure_resource_limits(limits: Optional[Mapping[str, int]]) -> None:
+    """
+    Sets the maximum number of concurrent users of each resource, replacing previous limits.
+
+    Args:
+        limits (Optional[Mapping[str, int]]): The limit per resource name, e.g. {"gpu": 1, "db": 8}.
+                                              Resources missing or with a limit <= 0 are unlimited.
+    """
+    with _registry_lock:
+        _limits.clear()
+        _semaphores.clear()
+        for resource, limit in (limits or {}).items():
+            if int(limit) > 0:
+                _limits[resource] = int(limit)
+                _semaphores[resource] = threading.BoundedSemaphore(int(limit))
+
+
+def resource_limits() -> Dict[str, int]:
+    """
+    Returns the configured limits.
+    """
+    with _registry_lock:
+        return dict(_limits)
+
+
+@contextmanager
+def resource_slot(resource: str) -> Iterator[None]:
+    """
+    Holds one slot of a resource for the duration of the block, waiting for a free slot if needed.
+
+    Args:
+        resource (str): The resource name, see ResourceConstants.
+    """
+    semaphore = _semaphores.get(resource)
+    if semaphore is None:
+        yield
+        return
+    if not semaphore.acquire(blocking=False):
+        budget = current_latency_budget()
+        if budget is None:
+            semaphore.acquire()
+        else:
+            with budget.paused():
+                semaphore.acquire()
+    try:
+        yield
+    finally:
+        semaphore.release()
@@ -0,0 +1,85 @@
+"""
+This module defines the BM25Util class for lexical (keyword) scoring of short documents
+such as database identifiers and column comments.
+"""
+import math
+import re
+from collections import Counter
+from typing import Dict, List, Sequence, Tuple
+
+from util.constants import LexicalIndexConstants
+
+_WORD_PATTERN = re.compile(r"[A-Za-z0-9]+")
+# Splits camelCase and PascalCase identifiers: "driverRef" -> "driver", "Ref"; "CDSCode" -> "CDS", "Code"
+_CAMEL_CASE_PATTERN = re.compile(r"[A-Z]+(?=[A-Z][a-z])|[A-Z]?[a-z]+|[A-Z]+|[0-9]+")
+
+
+class BM25Util:
+    """
+    Utility class for Okapi BM25 scoring over an in-memory inverted index.
+
+    Identifiers are tokenized into their lowercase parts plus the whole compacted identifier,
+    so that "driverRef" matches both the query "driver reference" and the exact name "driverref".
+    """
+    def __init__(self, documents: Sequence[Sequence[str]], k1: float = LexicalIndexConstants.DEFAULT_K1,
+                 b: float = LexicalIndexConstants.DEFAULT_B):
+        """
+        Initializes the BM25Util class and indexes the documents.
+
+        Args:
+            documents (Sequence[Sequence[str]]): The tokenized documents.
+            k1 (float): The term frequency saturation parameter.
+            b (float): The document length normalization parameter.
+        """
+        self.k1 = k1
+        self.b = b
+        self.document_count = len(documents)
+        self._document_lengths = [len(tokens) for tokens in documents]
+        self._average_length = (sum(self._document_lengths) / self.document_count) if self.document_count else 0.0
+        self._postings: Dict[str, List[Tuple[int, int]]] = {}
+        for doc_index, tokens in enumerate(documents):
+            for token, frequency in Counter(tokens).items():
+                self._postings.setdefault(token, []).append((doc_index, frequency))
+        self._idf = {
+            token: math.log(1.0 + (self.document_count - len(postings) + 0.5) / (len(postings) + 0.5))
+            for token, postings in self._postings.items()
+        }
+
+    @staticmethod
+    def tokenize(text: str) -> List[str]:
+        """
+        Splits a text into lowercase tokens. Every identifier-like word yields its camelCase and
+        snake_case parts and, if it has several parts, the whole lowercase word.
+        """
+        tokens: List[str] = []
+        for word in _WORD_PATTERN.findall(str(text)):
+            parts = [part.lower() for part in _CAMEL_CASE_PATTERN.findall(word)]
+            tokens.extend(parts)
+            if len(parts) > 1:
+                tokens.append(word.lower())
+        return tokens
+
+    def scores(self, query_tokens: Sequence[str]) -> Dict[int, float]:
+        """
+        Scores the documents containing at least one query token.
+
+        Returns:
+            Dict[int, float]: The BM25 score of each matching document index.
+        """
+        scores: Dict[int, float] = {}
+        for token in set(query_tokens):
+            postings = self._postings.get(token)
+            if not postings:
+                continue
+            idf = self._idf[token]
+            for doc_index, frequency in postings:
+                length_norm = 1.0 - self.b + self.b * self._document_lengths[doc_index] / self._average_length
+                scores[doc_index] = scores.get(doc_index, 0.0) + idf * frequency * (self.k1 + 1.0) / (frequency + self.k1 * length_norm)
+        return scores
+
+    def top_k(self, query_tokens: Sequence[str], k: int = 5) -> List[Tuple[int, float]]:
+        """
+        Returns the k best scoring documents as (document index, score), best first.
+        """
+        scores = self.scores(query_tokens)
+        return sorted(scores.items(), key=lambda item: (-item[1], item[0]))[:k]
@@ -1,19 +1,53 @@
 """
 This module defines the EditDistanceUtil class for calculating edit distance
-between two strings.
+between two strings, and normalized edit similarities between many strings at once.
 """
+from dataclasses import dataclass
+from typing import Dict, List, Mapping, Sequence
+
 import Levenshtein
+import numpy as np
+from rapidfuzz import process, utils
+from rapidfuzz.distance import Levenshtein as RapidLevenshtein
+
+
+@dataclass
+class FuzzyMatch:
+    """
+    A choice matching a query, with its normalized edit similarity in [0, 1].
+    """
+    query: str
+    choice: str
+    index: int
+    similarity: float
+
+
+@dataclass
+class ColumnValueMatch:
+    """
+    A column value matching a phrase, with its normalized edit similarity in [0, 1].
+    """
+    column: str
+    value: str
+    similarity: float
+
 
 class EditDistanceUtil:
     """
     Utility class for calculating edit distance (Levenshtein distance)
     between two text strings.
     """
-    def __init__(self):
+    def __init__(self, workers: int = -1, case_sensitive: bool = False):
         """
         Initializes the EditDistanceUtil class.
+
+        Args:
+            workers (int): The number of threads used by the bulk methods. -1 uses all cores.
+            case_sensitive (bool): If False, the bulk methods lowercase the strings and strip
+                                   non-alphanumeric characters before comparing them.
         """
-        pass
+        self.workers = workers
+        self.processor = None if case_sensitive else utils.default_process
 
     def calculate_distance(self, text1: str, text2: str) -> int:
         """
@@ -34,5 +68,92 @@ class EditDistanceUtil:
             return len(text2) if text2 else 0
         if text2 is None:
             return len(text1) if text1 else 0
-            
-        return Levenshtein.distance(text1, text2)
\ No newline at end of file
+
+        return Levenshtein.distance(text1, text2)
+
+    def similarity_matrix(self, queries: Sequence[str], choices: Sequence[str], score_cutoff: float = 0.0) -> np.ndarray:
+        """
+        Computes the normalized edit similarity (1 - distance / max length) of every query against every choice.
+        The matrix is computed in native code across `workers` threads.
+
+        Args:
+            queries (Sequence[str]): The query strings.
+            choices (Sequence[str]): The candidate strings.
+            score_cutoff (float): Similarities below this value are set to 0.
+
+        Returns:
+            np.ndarray: A (len(queries) x len(choices)) float32 matrix of similarities in [0, 1].
+        """
+        if len(queries) == 0 or len(choices) == 0:
+            return np.zeros((len(queries), len(choices)), dtype=np.float32)
+        return process.cdist(
+            [str(query) for query in queries],
+            [str(choice) for choice in choices],
+            scorer=RapidLevenshtein.normalized_similarity,
+            processor=self.processor,
+            score_cutoff=score_cutoff or None,
+            dtype=np.float32,
+            workers=self.workers
+        )
+
+    def top_k_matches(self, queries: Sequence[str], choices: Sequence[str], k: int = 5,
+                      score_cutoff: float = 0.0) -> List[List[FuzzyMatch]]:
+        """
+        Finds the k most similar choices of every query.
+
+        Args:
+            queries (Sequence[str]): The query strings.
+            choices (Sequence[str]): The candidate strings.
+            k (int): The maximum number of matches per query.
+            score_cutoff (float): The minimum normalized similarity of a match.
+
+        Returns:
+            List[List[FuzzyMatch]]: For each query, its matches, most similar first.
+        """
+        similarities = self.similarity_matrix(queries, choices, score_cutoff=score_cutoff)
+        if similarities.size == 0 or k <= 0:
+            return [[] for _ in queries]
+
+        k = min(k, similarities.shape[1])
+        top_indices = np.argpartition(-similarities, k - 1, axis=1)[:, :k]
+        matches = []
+        for query_index, query in enumerate(queries):
+            query_matches = [
+                FuzzyMatch(query=query, choice=choices[i], index=int(i), similarity=float(similarities[query_index, i]))
+                for i in top_indices[query_index]
+                if similarities[query_index, i] > 0 and similarities[query_index, i] >= score_cutoff
+            ]
+            query_matches.sort(key=lambda match: match.similarity, reverse=True)
+            matches.append(query_matches)
+        return matches
+
+    def match_column_values(self, phrases: Sequence[str], column_values: Mapping[str, Sequence[str]], k: int = 5,
+                            score_cutoff: float = 0.8) -> Dict[str, List[ColumnValueMatch]]:
+        """
+        Matches phrases against the values of many columns in a single bulk call, e.g. the example
+        values of an MSchema (`MSchema.get_example_values`) or the values of a ValueIndex (`ValueIndex.column_values`).
+
+        Args:
+            phrases (Sequence[str]): The phrases, typically literal values extracted from the question.
+            column_values (Mapping[str, Sequence[str]]): The candidate values, keyed by "table.column".
+            k (int): The maximum number of matches per phrase.
+            score_cutoff (float): The minimum normalized similarity of a match.
+
+        Returns:
+            Dict[str, List[ColumnValueMatch]]: The matching column values of each phrase, most similar first.
+        """
+        choices: List[str] = []
+        choice_columns: List[str] = []
+        for column, values in column_values.items():
+            for value in values:
+                if value is not None:
+                    choices.append(str(value))
+                    choice_columns.append(column)
+
+        matches: Dict[str, List[ColumnValueMatch]] = {}
+        for phrase, phrase_matches in zip(phrases, self.top_k_matches(phrases, choices, k=k, score_cutoff=score_cutoff)):
+            matches[phrase] = [
+                ColumnValueMatch(column=choice_columns[match.index], value=match.choice, similarity=match.similarity)
+                for match in phrase_matches
+            ]
+        return matches
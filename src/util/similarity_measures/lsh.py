@@ -1,17 +1,106 @@
 """
 This module defines the LSHUtil class for Local-Sensitivity Hashing.
 """
+import re
+import zlib
+from typing import List, Set
+
+import numpy as np
+
+from util.constants import ValueIndexConstants
+
+# Mersenne prime used by the universal hash family of the MinHash permutations
+_MERSENNE_PRIME = np.uint64((1 << 61) - 1)
+_MAX_HASH = np.uint64((1 << 32) - 1)
+
 
 class LSHUtil:
     """
     Utility class for Local-Sensitivity Hashing.
-    
-    This class is intended to provide methods for performing LSH on data.
-    Future implementation will include specific LSH algorithms and functionalities.
+
+    Texts are turned into sets of character n-gram shingles and summarized by MinHash signatures,
+    whose agreement rate estimates the Jaccard similarity of the shingle sets. Signatures are split
+    into bands; two texts sharing the hash of at least one band are candidate matches.
     """
-    def __init__(self):
+    def __init__(self, num_perm: int = ValueIndexConstants.DEFAULT_NUM_PERM, bands: int = ValueIndexConstants.DEFAULT_BANDS,
+                 shingle_size: int = ValueIndexConstants.DEFAULT_SHINGLE_SIZE, seed: int = 1):
         """
         Initializes the LSHUtil class.
+
+        Args:
+            num_perm (int): The number of MinHash permutations, i.e. the signature length.
+            bands (int): The number of LSH bands. Must divide num_perm.
+            shingle_size (int): The length of the character n-grams.
+            seed (int): The seed of the permutations. Signatures are only comparable for equal seeds.
+        """
+        if num_perm % bands != 0:
+            raise ValueError(f"The number of bands ({bands}) must divide the number of permutations ({num_perm}).")
+        self.num_perm = num_perm
+        self.bands = bands
+        self.rows_per_band = num_perm // bands
+        self.shingle_size = shingle_size
+
+        rng = np.random.RandomState(seed)
+        self._a = rng.randint(1, 1 << 31, size=num_perm, dtype=np.int64).astype(np.uint64)
+        self._b = rng.randint(0, 1 << 31, size=num_perm, dtype=np.int64).astype(np.uint64)
+        # Odd multipliers combining the rows of a band into one 64 bit band hash
+        self._band_coefficients = (rng.randint(0, 1 << 62, size=self.rows_per_band, dtype=np.int64).astype(np.uint64) * np.uint64(2) + np.uint64(1))
+
+    @staticmethod
+    def normalize(text: str) -> str:
+        return re.sub(r"\s+", " ", str(text).lower()).strip()
+
+    def shingles(self, text: str) -> Set[str]:
+        """
+        Returns the character n-grams of the normalized text. Texts shorter than the shingle size
+        are a single shingle.
+        """
+        normalized = self.normalize(text)
+        if len(normalized) <= self.shingle_size:
+            return {normalized} if normalized else set()
+        return {normalized[i:i + self.shingle_size] for i in range(len(normalized) - self.shingle_size + 1)}
+
+    def signature(self, text: str) -> np.ndarray:
+        """
+        Computes the MinHash signature of a text.
+
+        Returns:
+            np.ndarray: A uint32 vector of length num_perm. Empty texts get an all-max signature.
+        """
+        shingles = self.shingles(text)
+        if not shingles:
+            return np.full(self.num_perm, _MAX_HASH, dtype=np.uint32)
+        hashed = np.fromiter((zlib.crc32(s.encode("utf-8")) for s in shingles), dtype=np.uint64, count=len(shingles))
+        permuted = (self._a[:, None] * hashed[None, :] + self._b[:, None]) % _MERSENNE_PRIME
+        return (permuted & _MAX_HASH).min(axis=1).astype(np.uint32)
+
+    def signatures(self, texts: List[str]) -> np.ndarray:
+        """
+        Computes the MinHash signatures of several texts as a (len(texts) x num_perm) uint32 matrix.
+        """
+        matrix = np.empty((len(texts), self.num_perm), dtype=np.uint32)
+        for i, text in enumerate(texts):
+            matrix[i] = self.signature(text)
+        return matrix
+
+    def band_hashes(self, signatures: np.ndarray) -> np.ndarray:
+        """
+        Hashes every band of the signatures.
+
+        Args:
+            signatures (np.ndarray): A (N x num_perm) signature matrix, or a single signature.
+
+        Returns:
+            np.ndarray: A (N x bands) uint64 matrix of band hashes.
+        """
+        signatures = np.atleast_2d(signatures).astype(np.uint64)
+        banded = signatures.reshape(signatures.shape[0], self.bands, self.rows_per_band)
+        # uint64 arithmetic wraps around, which is the intended modulo 2^64
+        return (banded * self._band_coefficients).sum(axis=2, dtype=np.uint64)
+
+    @staticmethod
+    def estimate_jaccard(signature: np.ndarray, signatures: np.ndarray) -> np.ndarray:
+        """
+        Estimates the Jaccard similarity between one signature and each row of a signature matrix.
         """
-        # TODO: Implement Local-Sensitivity Hashing functionality.
-        pass
\ No newline at end of file
+        return (np.atleast_2d(signatures) == signature).mean(axis=1)
@@ -0,0 +1,29 @@
+"""
+This module defines reciprocal-rank fusion (RRF) of several rankings of the same items.
+"""
+from typing import Dict, Hashable, List, Optional, Sequence, Tuple
+
+from util.constants import LexicalIndexConstants
+
+
+def reciprocal_rank_fusion(rankings: Sequence[Sequence[Hashable]], rrf_k: int = LexicalIndexConstants.DEFAULT_RRF_K,
+                           weights: Optional[Sequence[float]] = None) -> List[Tuple[Hashable, float]]:
+    """
+    Fuses rankings by summing weight / (rrf_k + rank) per item, with ranks starting at 1.
+    Only ranks are used, so rankings with incomparable scores (BM25, cosine) can be combined.
+
+    Args:
+        rankings (Sequence[Sequence[Hashable]]): The rankings, best item first.
+        rrf_k (int): The rank offset. Larger values flatten the contribution of the top ranks.
+        weights (Optional[Sequence[float]]): One weight per ranking. Defaults to 1 for every ranking.
+
+    Returns:
+        List[Tuple[Hashable, float]]: The items and their fused scores, best first. Ties keep the
+                                      order in which the items were first seen.
+    """
+    weights = weights if weights is not None else [1.0] * len(rankings)
+    fused: Dict[Hashable, float] = {}
+    for ranking, weight in zip(rankings, weights):
+        for rank, item in enumerate(ranking, start=1):
+            fused[item] = fused.get(item, 0.0) + weight / (rrf_k + rank)
+    return sorted(fused.items(), key=lambda item: item[1], reverse=True)
@@ -5,31 +5,131 @@ using sentence embeddings.
 import os
 os.environ['PYTORCH_NVML_BASED_CUDA_CHECK'] = "1"
 
+import threading
+from dataclasses import dataclass
+from typing import ClassVar, Dict, List, Sequence
+
 from sentence_transformers import SentenceTransformer
-from sklearn.metrics.pairwise import cosine_similarity
 import numpy as np
 import torch # Often a dependency for sentence-transformers
 
+
+@dataclass
+class SemanticMatch:
+    """
+    A candidate text matching a query, with its cosine similarity.
+    """
+    index: int
+    text: str
+    similarity: float
+
+
 class SemanticSimilarityUtil:
     """
     Utility class for calculating semantic similarity between texts using sentence embeddings.
 
     This class utilizes a pre-trained model from the sentence-transformers library
     to generate embeddings and then computes their cosine similarity.
+    Models are loaded once per process and shared by all instances using the same model name.
     """
-    def __init__(self, model_name: str = 'sentence-transformers/all-MiniLM-L6-v2'):
+    _models: ClassVar[Dict[str, SentenceTransformer]] = {}
+    _models_lock: ClassVar[threading.Lock] = threading.Lock()
+
+    def __init__(self, model_name: str = 'sentence-transformers/all-MiniLM-L6-v2', batch_size: int = 64):
         """
         Initializes the SemanticSimilarityUtil with a specified sentence embedding model.
 
         Args:
             model_name (str): The name of the sentence-transformer model to use.
                               Defaults to 'sentence-transformers/all-MiniLM-L6-v2'.
+            batch_size (int): The batch size used when encoding lists of texts.
         """
         # Check if CUDA is available and set the device accordingly
         self.device = 'cuda' if torch.cuda.is_available() else 'cpu'
-        self.model = SentenceTransformer(model_name, device=self.device)
+        self.model_name = model_name
+        self.batch_size = batch_size
+        self.model = self._get_shared_model(model_name, self.device)
         print(f"SemanticSimilarityUtil initialized with model '{model_name}' on device '{self.device}'.")
 
+    @classmethod
+    def _get_shared_model(cls, model_name: str, device: str) -> SentenceTransformer:
+        with cls._models_lock:
+            if model_name not in cls._models:
+                cls._models[model_name] = SentenceTransformer(model_name, device=device)
+            return cls._models[model_name]
+
+    def encode(self, texts: Sequence[str]) -> np.ndarray:
+        """
+        Encodes texts into L2-normalized embeddings.
+
+        Args:
+            texts (Sequence[str]): The texts to encode.
+
+        Returns:
+            np.ndarray: A (len(texts) x dimension) float32 matrix of unit-length embeddings.
+        """
+        if len(texts) == 0:
+            return np.zeros((0, self.model.get_sentence_embedding_dimension()), dtype=np.float32)
+        return self.model.encode(
+            list(texts),
+            batch_size=self.batch_size,
+            convert_to_numpy=True,
+            normalize_embeddings=True,
+            device=self.device
+        ).astype(np.float32, copy=False)
+
+    def similarity_matrix(self, texts1: Sequence[str], texts2: Sequence[str]) -> np.ndarray:
+        """
+        Calculates the cosine similarity of every text of `texts1` with every text of `texts2`.
+        Each list is encoded once, in batches.
+
+        Args:
+            texts1 (Sequence[str]): The first list of texts (e.g. questions or keywords).
+            texts2 (Sequence[str]): The second list of texts (e.g. column descriptions).
+
+        Returns:
+            np.ndarray: A (len(texts1) x len(texts2)) matrix of similarities in [-1, 1].
+        """
+        return self.encode(texts1) @ self.encode(texts2).T
+
+    def top_k(self, queries: Sequence[str], candidates: Sequence[str], k: int = 5,
+              min_similarity: float = -1.0) -> List[List[SemanticMatch]]:
+        """
+        Finds the k candidates most similar to each query.
+
+        Args:
+            queries (Sequence[str]): The query texts.
+            candidates (Sequence[str]): The candidate texts, e.g. the columns to re-rank.
+            k (int): The maximum number of candidates per query.
+            min_similarity (float): Candidates below this similarity are dropped.
+
+        Returns:
+            List[List[SemanticMatch]]: For each query, its matches, most similar first.
+        """
+        similarities = self.similarity_matrix(queries, candidates)
+        return self.top_k_from_matrix(similarities, candidates, k=k, min_similarity=min_similarity)
+
+    @staticmethod
+    def top_k_from_matrix(similarities: np.ndarray, candidates: Sequence[str], k: int = 5,
+                          min_similarity: float = -1.0) -> List[List[SemanticMatch]]:
+        """
+        Selects the top-k candidates of each row of a precomputed similarity matrix.
+        """
+        if similarities.shape[1] == 0 or k <= 0:
+            return [[] for _ in range(similarities.shape[0])]
+        k = min(k, similarities.shape[1])
+        top_indices = np.argpartition(-similarities, k - 1, axis=1)[:, :k]
+        top_indices = np.take_along_axis(
+            top_indices, np.argsort(-np.take_along_axis(similarities, top_indices, axis=1), axis=1), axis=1
+        )
+        return [
+            [
+                SemanticMatch(index=int(i), text=candidates[i], similarity=float(similarities[row, i]))
+                for i in top_indices[row] if similarities[row, i] >= min_similarity
+            ]
+            for row in range(similarities.shape[0])
+        ]
+
     def calculate_cosine_similarity(self, text1: str, text2: str) -> float:
         """
         Calculates the cosine similarity between the embeddings of two texts.
@@ -45,18 +145,5 @@ class SemanticSimilarityUtil:
         if not text1 or not text2:
             return 0.0
 
-        embeddings = self.model.encode([text1, text2], convert_to_tensor=True, device=self.device)
-        
-        # cosine_similarity expects 2D arrays.
-        # embeddings[0] and embeddings[1] are 1D tensors (vectors).
-        # We need to reshape them to 2D (1, embedding_dim) before passing to cosine_similarity.
-        emb1 = embeddings[0].unsqueeze(0)
-        emb2 = embeddings[1].unsqueeze(0)
-        
-        # Calculate cosine similarity
-        # The result is a 2x2 matrix if we pass both embeddings directly,
-        # or a 1x1 matrix if we pass them as emb1, emb2.
-        # We want the similarity between emb1 and emb2, which is a single value.
-        similarity_matrix = cosine_similarity(emb1.cpu().numpy(), emb2.cpu().numpy())
-        
-        return float(similarity_matrix[0, 0])
\ No newline at end of file
+        embeddings = self.encode([text1, text2])
+        return float(embeddings[0] @ embeddings[1])
@@ -0,0 +1,171 @@
+"""
+This module defines the tracing of the pipeline: compact snapshots of the context after every
+executed step, written as JSON lines by a background thread.
+
+Tracing is configured once per run with `configure_tracing`. While it is disabled `get_tracer`
+returns None and the pipeline steps skip tracing entirely, so it costs nothing. When enabled,
+the step only builds a small snapshot of the selected context fields; encoding and file I/O
+happen on the writer thread. Tasks are sampled by their trace id, so a sampled task is traced
+at every step and an unsampled one at none.
+"""
+import json
+import queue
+import threading
+import time
+import zlib
+from typing import Any, Dict, Optional, Sequence
+
+from util.constants import TracingConstants
+
+_tracer: Optional['Tracer'] = None
+_tracer_lock = threading.Lock()
+_STOP = object()
+
+
+class TraceWriter:
+    """
+    Appends records to a JSONL file from a background thread.
+    Records are dropped, not waited for, when the queue is full, so a slow disk never slows down the pipeline.
+    """
+    def __init__(self, path: str, queue_size: int = TracingConstants.DEFAULT_QUEUE_SIZE):
+        """
+        Args:
+            path (str): The JSONL file, created or appended to.
+            queue_size (int): The maximum number of records waiting to be written.
+        """
+        self.path = path
+        self.dropped_records = 0
+        self._queue: queue.Queue = queue.Queue(maxsize=queue_size)
+        self._file = open(path, "a", encoding="utf-8")
+        self._thread = threading.Thread(target=self._run, name="trace-writer", daemon=True)
+        self._thread.start()
+
+    def write(self, record: Dict[str, Any]) -> bool:
+        """
+        Queues a record for writing.
+
+        Returns:
+            bool: False if the record was dropped because the queue is full.
+        """
+        try:
+            self._queue.put_nowait(record)
+            return True
+        except queue.Full:
+            self.dropped_records += 1
+            return False
+
+    def _run(self) -> None:
+        while True:
+            record = self._queue.get()
+            if record is _STOP:
+                break
+            try:
+                self._file.write(json.dumps(record, default=str) + "\n")
+            except (TypeError, ValueError) as e:
+                self._file.write(json.dumps({"trace_error": str(e), "step": record.get("step")}) + "\n")
+            # Flush once the backlog is written rather than after every record
+            if self._queue.empty():
+                self._file.flush()
+        self._file.flush()
+
+    def close(self) -> None:
+        """
+        Writes the queued records and closes the file.
+        """
+        self._queue.put(_STOP)
+        self._thread.join()
+        self._file.close()
+        if self.dropped_records:
+            print(f"Tracing dropped {self.dropped_records} records, consider a larger queue_size or a lower sample_rate.")
+
+
+class Tracer:
+    """
+    Builds the per-step snapshots of the sampled tasks and hands them to a TraceWriter.
+    """
+    def __init__(self, writer: TraceWriter, sample_rate: float = 1.0, fields: Optional[Sequence[str]] = None,
+                 max_rows: int = TracingConstants.DEFAULT_MAX_ROWS):
+        """
+        Args:
+            writer (TraceWriter): The writer of the records.
+            sample_rate (float): The fraction of the tasks to trace, between 0 and 1.
+            fields (Optional[Sequence[str]]): The context fields of the snapshots, None for the default fields of the context.
+            max_rows (int): The maximum number of result rows rendered per SQL query.
+        """
+        self.writer = writer
+        self.sample_rate = sample_rate
+        self.fields = list(fields) if fields else None
+        self.max_rows = max_rows
+
+    def is_sampled(self, trace_id: Optional[str]) -> bool:
+        """
+        Decides deterministically whether a task is traced, so the decision is the same at every step and across runs.
+        """
+        if self.sample_rate >= 1.0:
+            return True
+        if trace_id is None or self.sample_rate <= 0.0:
+            return False
+        return zlib.crc32(trace_id.encode("utf-8")) / 2 ** 32 < self.sample_rate
+
+    def trace_step(self, context: Any, step_name: str, metrics: Optional[Any] = None) -> None:
+        """
+        Records a snapshot of the context after a step, if the task is sampled.
+
+        Args:
+            context: The pipeline context, providing `trace_id` and `to_trace_dict(fields, max_rows)`.
+            step_name (str): The name of the executed step.
+            metrics (Optional[StepMetrics]): The metrics of the step execution.
+        """
+        trace_id = context.trace_id
+        if not self.is_sampled(trace_id):
+            return
+        record: Dict[str, Any] = {"trace_id": trace_id, "step": step_name, "time": time.time()}
+        if metrics is not None:
+            record["wall_seconds"] = metrics.wall_seconds
+        record.update(context.to_trace_dict(self.fields, self.max_rows))
+        self.writer.write(record)
+
+
+def configure_tracing(tracing_config: Optional[Dict[str, Any]], path: str) -> Optional[Tracer]:
+    """
+    Enables tracing to a file if the configuration enables it, replacing the previous tracer.
+
+    Args:
+        tracing_config (Optional[Dict[str, Any]]): The 'tracing' section of tracing.yaml.
+        path (str): The JSONL file to write the records to.
+
+    Returns:
+        Optional[Tracer]: The tracer, or None if tracing is disabled.
+    """
+    global _tracer
+    shutdown_tracing()
+    if not tracing_config or not tracing_config.get("enabled", False):
+        return None
+    tracer = Tracer(
+        TraceWriter(path, int(tracing_config.get("queue_size", TracingConstants.DEFAULT_QUEUE_SIZE))),
+        sample_rate=float(tracing_config.get("sample_rate", TracingConstants.DEFAULT_SAMPLE_RATE)),
+        fields=tracing_config.get("fields"),
+        max_rows=int(tracing_config.get("max_rows", TracingConstants.DEFAULT_MAX_ROWS))
+    )
+    with _tracer_lock:
+        _tracer = tracer
+    print(f"Tracing {tracer.sample_rate:.0%} of the tasks to {path}")
+    return tracer
+
+
+def get_tracer() -> Optional[Tracer]:
+    """
+    Returns the active tracer, or None if tracing is disabled.
+    """
+    return _tracer
+
+
+def shutdown_tracing() -> None:
+    """
+    Disables tracing and waits until the queued records are written.
+    """
+    global _tracer
+    with _tracer_lock:
+        tracer, _tracer = _tracer, None
+    if tracer is not None:
+        tracer.writer.close()